@@ -0,0 +1,10 @@
+"""Benchmarks for the hot paths of openalea.wlformat.
+
+Run all benchmarks with::
+
+    python -m benchmark.run --help
+
+Compare binary encodings against json with::
+
+    python -m benchmark.bench_binary [nb_nodes]
+"""
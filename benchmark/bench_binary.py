@@ -0,0 +1,42 @@
+"""Compare binary encodings against json on a generated provenance record.
+
+Usage::
+
+    python -m benchmark.bench_binary [nb_nodes]
+"""
+from __future__ import print_function
+
+import json
+import sys
+from timeit import repeat
+
+from openalea.wlformat import binary
+
+from .run import Fixture
+
+
+def best_time(func, nb=5):
+    """Best time out of nb runs, garbage collection disabled."""
+    return min(repeat(func, number=1, repeat=nb))
+
+
+def main(nb_nodes=10000):
+    prov = Fixture(nb_nodes).provenance
+
+    print("provenance of %d executions" % nb_nodes)
+    print("%-8s %12s %10s %10s"
+          % ("format", "size (B)", "dump (s)", "load (s)"))
+    for name, dumps, loads in (
+            ("json", json.dumps, json.loads),
+            ("binary", binary.dumps, binary.loads),
+            ("compact", lambda obj: binary.dumps(obj, compact=True),
+             binary.loads)):
+        data = dumps(prov)
+        assert loads(data) == prov
+        print("%-8s %12d %10.3f %10.3f"
+              % (name, len(data), best_time(lambda: dumps(prov)),
+                 best_time(lambda: loads(data))))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
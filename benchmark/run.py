@@ -0,0 +1,309 @@
+"""Single entry point for all benchmarks.
+
+Usage::
+
+    python -m benchmark.run [--sizes 100 1000] [--cases svg graphviz]
+                            [--output results.json]
+
+For each case and each size (number of nodes in workflow), report the
+number of operations per second, the number of nodes processed per second
+and the peak memory allocated during a single operation (python >= 3.4
+only). Results can be written as json to compare releases.
+"""
+from __future__ import print_function
+
+import argparse
+from copy import deepcopy
+import json
+import platform
+import sys
+from time import time
+from timeit import default_timer as timer
+
+from openalea.wlformat import binary, tools, version
+from openalea.wlformat.convert import graphviz, svg
+from openalea.wlformat.convert.layout import layout_workflow
+from openalea.wlformat.generate import (make_interfaces, make_nodes,
+                                        ProvenanceGenerator, shapes,
+                                        WorkflowGenerator)
+from openalea.wlformat.prov_exe import ProvenanceIndex
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+class Fixture(object):
+    """Benchmark input for a given size, objects are built on first use."""
+
+    def __init__(self, size, shape="layered", seed=0):
+        self.size = size
+        self.shape = shape
+        self.seed = seed
+        self._cache = {}
+
+    def _get(self, name, builder):
+        try:
+            return self._cache[name]
+        except KeyError:
+            self._cache[name] = builder()
+            return self._cache[name]
+
+    def _make_defs(self):
+        idefs = make_interfaces(10, self.seed)
+        return idefs, make_nodes(50, idefs, seed=self.seed)
+
+    @property
+    def defs(self):
+        return self._get("defs", self._make_defs)
+
+    @property
+    def store(self):
+        idefs, ndefs = self.defs
+        return self._get("store", lambda: dict((obj['id'], obj)
+                                               for obj in idefs + ndefs))
+
+    @property
+    def generator(self):
+        return self._get("generator", lambda: WorkflowGenerator(
+            self.defs[1], self.size, self.shape, width=3, seed=self.seed))
+
+    @property
+    def workflow(self):
+        return self._get("workflow", self.generator.workflow)
+
+    @property
+    def provenance(self):
+        return self._get("provenance", ProvenanceGenerator(
+            self.generator, self.seed).provenance)
+
+    @property
+    def prov_json(self):
+        return self._get("prov_json", lambda: json.dumps(self.provenance))
+
+    @property
+    def prov_binary(self):
+        return self._get("prov_binary",
+                         lambda: binary.dumps(self.provenance))
+
+    @property
+    def prov_compact(self):
+        return self._get("prov_compact",
+                         lambda: binary.dumps(self.provenance, compact=True))
+
+
+class _Factory(object):
+    """Stand in for an openalea NodeFactory built from a node definition."""
+
+    def __init__(self, ndef, inames):
+        self.name = ndef['name']
+        self.description = ndef['description']
+        self.nodemodule_name = "bench"
+        self.nodeclass_name = ndef['name']
+        self.inputs = [dict(name=port['name'],
+                            interface=inames[port['interface']])
+                       for port in ndef['inputs']]
+        self.outputs = [dict(name=port['name'],
+                             interface=inames[port['interface']])
+                        for port in ndef['outputs']]
+
+    def get_authors(self):
+        return "bench"
+
+
+def _wralea_case(fix, pkg_size=50):
+    from openalea.wlformat.convert.wralea import convert_packages, Store
+
+    # one factory per workflow node, grouped in packages
+    inames = dict((idef['id'], idef['name']) for idef in fix.defs[0])
+    pkgs = {}
+    for ind in range(fix.size):
+        ndef = dict(fix.generator.node_def(ind), name="n%d" % ind)
+        pkg = pkgs.setdefault("bench%d" % (ind // pkg_size), {})
+        pkg[ndef['name']] = _Factory(ndef, inames)
+
+    pkgnames = sorted(pkgs)
+    return lambda: convert_packages(pkgnames, Store(), loader=pkgs.get)
+
+
+def _layout_case(fix):
+    wkf = deepcopy(fix.workflow)
+    return lambda: layout_workflow(wkf, fix.store)
+
+
+# name -> function(fixture) returning the operation to time,
+# or None if the case can not run in this environment
+cases = dict(
+    validate_workflow=lambda fix: lambda: tools.validate(fix.workflow,
+                                                         "workflow"),
+    validate_provenance=lambda fix: lambda: tools.validate(fix.provenance,
+                                                           "prov_exe"),
+    wralea_convert=_wralea_case,
+    graphviz=lambda fix: lambda: graphviz.export_workflow(fix.workflow,
+                                                          fix.store),
+    svg=lambda fix: lambda: svg.export_workflow(fix.workflow, fix.store),
+    layout=_layout_case,
+    prov_index=lambda fix: lambda: ProvenanceIndex(fix.provenance),
+    json_dumps=lambda fix: lambda: json.dumps(fix.provenance),
+    json_loads=lambda fix: lambda: json.loads(fix.prov_json),
+    binary_dumps=lambda fix: lambda: binary.dumps(fix.provenance),
+    binary_loads=lambda fix: lambda: binary.loads(fix.prov_binary),
+    compact_dumps=lambda fix: lambda: binary.dumps(fix.provenance,
+                                                   compact=True),
+    compact_loads=lambda fix: lambda: binary.loads(fix.prov_compact),
+)
+
+
+def measure(func, repeat=3, min_time=0.2):
+    """Time an operation.
+
+    The operation is called enough times for a measure to last at least
+    min_time. The best of repeat measures is kept.
+
+    Args:
+        func (callable): operation without arguments
+        repeat (int): number of measures
+        min_time (float): min duration of a single measure in seconds
+
+    Returns:
+        (float): number of operations per second
+    """
+    t0 = timer()
+    func()
+    dt = timer() - t0
+    number = max(1, int(min_time / dt)) if dt > 0 else 1000
+
+    best = None
+    for i in range(repeat):
+        t0 = timer()
+        for j in range(number):
+            func()
+        dt = (timer() - t0) / number
+        if best is None or dt < best:
+            best = dt
+
+    return 1. / best if best > 0 else float('inf')
+
+
+def peak_memory(func):
+    """Peak memory allocated by python during a single call.
+
+    Args:
+        func (callable): operation without arguments
+
+    Returns:
+        (int|None): number of bytes, None if tracemalloc is not available
+    """
+    if tracemalloc is None:
+        return None
+
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(case_names, sizes, repeat=3, min_time=0.2, shape="layered", seed=0,
+        out=None):
+    """Run benchmarks.
+
+    Args:
+        case_names (list of str): name of cases to run
+        sizes (list of int): number of nodes in workflows
+        repeat (int): see :func:`measure`
+        min_time (float): see :func:`measure`
+        shape (str): shape of workflows, see :mod:`generate`
+        seed (int): seed used to generate inputs
+        out (file): stream to report progress, None for silent run
+
+    Returns:
+        (list of dict): one result per case and size
+    """
+    results = []
+    for size in sizes:
+        fix = Fixture(size, shape, seed)
+        for name in case_names:
+            func = cases[name](fix)
+            res = dict(case=name, size=size, ops=None, nodes=None,
+                       peak_memory=None)
+            if func is not None:
+                res['ops'] = measure(func, repeat, min_time)
+                res['nodes'] = res['ops'] * size
+                res['peak_memory'] = peak_memory(func)
+
+            results.append(res)
+            if out is not None:
+                print(format_result(res), file=out)
+                out.flush()
+
+    return results
+
+
+def format_result(res):
+    """Format a single result as a table row.
+
+    Args:
+        res (dict): item returned by :func:`run`
+
+    Returns:
+        (str)
+    """
+    if res['ops'] is None:
+        return "%-20s %7d %12s" % (res['case'], res['size'], "skipped")
+
+    if res['peak_memory'] is None:
+        mem = "-"
+    else:
+        mem = "%.1f" % (res['peak_memory'] / 1024.)
+
+    return "%-20s %7d %12.2f %12.0f %12s" % (res['case'], res['size'],
+                                             res['ops'], res['nodes'], mem)
+
+
+def environment():
+    """Describe the environment benchmarks are run in.
+
+    Returns:
+        (dict)
+    """
+    return dict(wlformat=version.__version__,
+                python=platform.python_version(),
+                implementation=platform.python_implementation(),
+                platform=platform.platform(),
+                time=time())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="wlformat benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[100, 1000, 10000],
+                        help="number of nodes in workflows")
+    parser.add_argument("--cases", nargs="+", default=sorted(cases),
+                        choices=sorted(cases), help="benchmarks to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--shape", default="layered", choices=shapes)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None,
+                        help="write results as json in this file")
+    args = parser.parse_args(argv)
+
+    print("%-20s %7s %12s %12s %12s" % ("case", "size", "ops/s",
+                                        "nodes/s", "peak (KiB)"))
+    results = run(args.cases, args.sizes, args.repeat, args.min_time,
+                  args.shape, args.seed, sys.stdout)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(dict(environment=environment(),
+                           parameters=dict(shape=args.shape, seed=args.seed,
+                                           repeat=args.repeat,
+                                           min_time=args.min_time),
+                           results=results), f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""Execution of workflows with asyncio.
+
+Suited to nodes that spend most of their time waiting, e.g. fetching remote
+files. Functions of nodes can be coroutine functions, they are awaited
+concurrently as soon as their inputs are available. Plain functions are run
+in the default executor of the loop so that they do not block other nodes.
+Threads can not be interrupted, a plain function that times out keeps its
+slot among max_workers until it actually returns.
+
+Produce the same provenance records as :class:`executor.Executor`.
+
+Requires python >= 3.7.
+"""
+
+import asyncio
+from time import time
+
+from .executor import Executor, resolve_function
+
+
+def _release_when_done(fut, release):
+    """Call release once a future is done, whoever awaits it.
+
+    Args:
+        fut (Future): result of a function run in a thread
+        release (callable): called without arguments
+
+    Returns:
+        None
+    """
+    def done(fut):
+        if not fut.cancelled():
+            fut.exception()  # nobody else will retrieve it
+        release()
+
+    fut.add_done_callback(done)
+
+
+async def _evaluate(uri, inputs, timeout=None, release=None):
+    """Call the function of a node.
+
+    Args:
+        uri (str): function uri
+        inputs (list): input values in port order
+        timeout (float): max time in seconds, None means no limit
+        release (callable): called without arguments once the function
+                            no longer runs, which for plain functions
+                            may happen after the timeout
+
+    Returns:
+        (float, float, any, str|None): time_init, time_end, result,
+                      description of error if function failed
+    """
+    time_init = time()
+    running = None
+    try:
+        func = resolve_function(uri)
+        if asyncio.iscoroutinefunction(func):
+            aw = func(*inputs)
+        else:
+            loop = asyncio.get_running_loop()
+            running = loop.run_in_executor(None, func, *inputs)
+            aw = asyncio.shield(running)
+
+        res = await asyncio.wait_for(aw, timeout)
+        err = None
+    except asyncio.TimeoutError:
+        res = None
+        err = "timeout after %s s" % timeout
+    except Exception as e:
+        res = None
+        err = "%s: %s" % (e.__class__.__name__, e)
+    finally:
+        if release is not None:
+            if running is None:
+                release()
+            else:
+                _release_when_done(running, release)
+
+    return time_init, time(), res, err
+
+
+class AsyncExecutor(Executor):
+    """Run workflows in an asyncio event loop."""
+
+    def __init__(self, store, max_workers=None, timeout=None,
+                 node_timeouts=None, cache=None):
+        """Constructor.
+
+        Args:
+            store (dict of uid, def): elements definitions
+            max_workers (int): max number of nodes evaluated concurrently,
+                               None means no limit
+            timeout (float): max time in seconds for the evaluation
+                             of a node, None means no limit
+            node_timeouts (dict of int, float): timeout for specific
+                             nodes, overrides timeout
+            cache (ResultCache): results of previous evaluations,
+                                 None means no memoization
+        """
+        Executor.__init__(self, store, max_workers, False, cache)
+        self.timeout = timeout
+        self.node_timeouts = {} if node_timeouts is None else node_timeouts
+
+    async def _evaluate_node(self, state, ind, values, semaphore):
+        uri = state.ndefs[ind]['function']
+        timeout = self.node_timeouts.get(ind, self.timeout)
+        if semaphore is None:
+            return await _evaluate(uri, values, timeout)
+
+        await semaphore.acquire()
+        return await _evaluate(uri, values, timeout, semaphore.release)
+
+    async def run_async(self, workflow, parameters=None, targets=None):
+        """Execute a workflow.
+
+        Raises: UserWarning if a node fails or times out, pending nodes
+                are cancelled
+
+        Args:
+            workflow (dict): workflow definition
+            parameters (dict of (int, str), any): values of unconnected
+                       input ports, port defaults are used for others
+            targets (list of int): nodes whose outputs are requested,
+                                   None means all nodes
+
+        Returns:
+            (dict): provenance record of execution
+        """
+        state = self._start(workflow, parameters, targets)
+        if self.max_workers is None:
+            semaphore = None
+        else:
+            semaphore = asyncio.Semaphore(self.max_workers)
+
+        running = {}  # task -> (node, input ports, cache key)
+        try:
+            while len(state.ready) > 0 or len(running) > 0:
+                while len(state.ready) > 0:
+                    ind = state.pop()
+                    in_ports, values = state.inputs(ind)
+                    key, outcome = state.lookup(ind, values)
+                    if outcome is None:
+                        task = asyncio.ensure_future(
+                            self._evaluate_node(state, ind, values,
+                                                semaphore))
+                        running[task] = (ind, in_ports, key)
+                    else:
+                        state.complete(ind, in_ports, outcome)
+
+                if len(running) == 0:  # all ready nodes found in cache
+                    continue
+
+                done, pending = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    ind, in_ports, key = running.pop(task)
+                    state.complete(ind, in_ports, task.result(), key)
+        finally:
+            for task in running:
+                task.cancel()
+            if len(running) > 0:
+                await asyncio.wait(running)
+
+        return state.finish()
+
+    def run(self, workflow, parameters=None, targets=None):
+        """Execute a workflow in a new event loop.
+
+        Waits for functions still running in threads after a timeout
+        before returning.
+
+        See Also: :meth:`run_async`
+        """
+        return asyncio.run(self.run_async(workflow, parameters, targets))
+
+
+def execute_async(workflow, store, parameters=None, targets=None,
+                  max_workers=None, timeout=None, cache=None):
+    """Execute a workflow with asyncio.
+
+    See Also: :class:`AsyncExecutor`
+
+    Args:
+        workflow (dict): workflow definition
+        store (dict of uid, def): elements definitions
+        parameters (dict of (int, str), any): values of unconnected
+                   input ports
+        targets (list of int): nodes whose outputs are requested,
+                               None means all nodes
+        max_workers (int): max number of nodes evaluated concurrently
+        timeout (float): max time in seconds for the evaluation of a node
+        cache (ResultCache): results of previous evaluations
+
+    Returns:
+        (dict): provenance record of execution
+    """
+    executor = AsyncExecutor(store, max_workers, timeout, cache=cache)
+    return executor.run(workflow, parameters, targets)
@@ -0,0 +1,347 @@
+"""Binary encodings for wlformat objects.
+
+Alternatives to json for storing workflows and provenance records. Two
+formats are available.
+
+The default one is faster to load than json. Equal strings (dict keys,
+ids) are shared before being serialized with the C pickle implementation,
+hence stored once and decoded as a single object. Loading only accepts
+builtin containers and scalars, any reference to a python global (class,
+function) is rejected. Files written by python 3 (pickle protocol 4) can
+not be read by python 2 (protocol 2).
+
+Layout::
+
+    magic 'WLB2' (4 bytes) | pickle stream
+
+The compact one is smaller but slower to load since it is decoded in pure
+python. Dict keys and 32 chars ids (see schema_base.json#/definitions/id)
+are stored once in a string table and referenced by index afterwards. Ids
+made of lowercase hexadecimal digits are stored as 16 raw bytes.
+
+Layout::
+
+    magic 'WLB1' (4 bytes) | nb strings (varint) | strings | root value
+
+In both formats all json values round trip without loss, tuples are
+decoded as lists. Strings are always decoded as text.
+"""
+
+import binascii
+import struct
+
+try:
+    import cPickle as pickle
+    from cStringIO import StringIO as BytesIO
+
+    def _unpickler(stream):
+        unpickler = pickle.Unpickler(stream)
+        unpickler.find_global = None  # reject all globals
+        return unpickler
+except ImportError:  # python 3
+    import pickle
+    from io import BytesIO
+
+    class _unpickler(pickle.Unpickler):
+        def find_class(self, module, name):
+            raise pickle.UnpicklingError("global '%s.%s' is forbidden"
+                                         % (module, name))
+
+magic = b"WLB2"
+compact_magic = b"WLB1"
+
+_protocol = min(pickle.HIGHEST_PROTOCOL, 4)  # framed reads on python 3
+
+# string table entry kinds
+_HEX_ID = 0
+_TEXT = 1
+
+# value tags
+_NONE = 0
+_FALSE = 1
+_TRUE = 2
+_INT = 3
+_FLOAT = 4
+_STR = 5
+_REF = 6
+_LIST = 7
+_DICT = 8
+
+_double = struct.Struct("<d")
+_hexdigits = frozenset("0123456789abcdef")
+
+try:
+    _text_type = unicode
+    _int_types = (int, long)
+except NameError:
+    _text_type = str
+    _int_types = (int,)
+
+
+def _write_varint(buf, val):
+    while val >= 0x80:
+        buf.append((val & 0x7f) | 0x80)
+        val >>= 7
+    buf.append(val)
+
+
+def _read_varint(data, pos):
+    val = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        val |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return val, pos
+        shift += 7
+
+
+def _as_text(txt):
+    if isinstance(txt, bytes):
+        return txt.decode('utf-8')
+    return txt
+
+
+def _share(obj, table):
+    """Copy a json like object, replacing equal strings by a single one.
+
+    Args:
+        obj (any): json like object
+        table (dict of str, str): strings already encountered
+
+    Returns:
+        (any): copy of obj with tuples converted to lists
+    """
+    if obj is None or isinstance(obj, (bool, float) + _int_types):
+        return obj
+    elif isinstance(obj, (bytes, _text_type)):
+        txt = _as_text(obj)
+        return table.setdefault(txt, txt)
+    elif isinstance(obj, (list, tuple)):
+        return [_share(item, table) for item in obj]
+    elif isinstance(obj, dict):
+        ret = {}
+        for key, item in obj.items():
+            if not isinstance(key, (bytes, _text_type)):
+                raise TypeError("keys must be strings, not %r" % (key,))
+            ret[_share(key, table)] = _share(item, table)
+        return ret
+    else:
+        raise TypeError("unable to encode %r" % (obj,))
+
+
+class _Encoder(object):
+    def __init__(self):
+        self.table = {}  # string -> index
+        self.strings = []
+        self.body = bytearray()
+
+    def intern(self, txt):
+        txt = _as_text(txt)
+        try:
+            return self.table[txt]
+        except KeyError:
+            ind = len(self.strings)
+            self.table[txt] = ind
+            self.strings.append(txt)
+            return ind
+
+    def encode(self, obj):
+        buf = self.body
+        if obj is None:
+            buf.append(_NONE)
+        elif obj is False:
+            buf.append(_FALSE)
+        elif obj is True:
+            buf.append(_TRUE)
+        elif isinstance(obj, _int_types):
+            buf.append(_INT)
+            # zigzag encoding of sign
+            _write_varint(buf, obj * 2 if obj >= 0 else -obj * 2 - 1)
+        elif isinstance(obj, float):
+            buf.append(_FLOAT)
+            buf.extend(_double.pack(obj))
+        elif isinstance(obj, (bytes, _text_type)):
+            if len(obj) == 32:
+                buf.append(_REF)
+                _write_varint(buf, self.intern(obj))
+            else:
+                data = _as_text(obj).encode('utf-8')
+                buf.append(_STR)
+                _write_varint(buf, len(data))
+                buf.extend(data)
+        elif isinstance(obj, (list, tuple)):
+            buf.append(_LIST)
+            _write_varint(buf, len(obj))
+            for item in obj:
+                self.encode(item)
+        elif isinstance(obj, dict):
+            buf.append(_DICT)
+            _write_varint(buf, len(obj))
+            for key, item in obj.items():
+                if not isinstance(key, (bytes, _text_type)):
+                    raise TypeError("keys must be strings, not %r" % (key,))
+                _write_varint(buf, self.intern(key))
+                self.encode(item)
+        else:
+            raise TypeError("unable to encode %r" % (obj,))
+
+    def result(self):
+        buf = bytearray(compact_magic)
+        _write_varint(buf, len(self.strings))
+        for txt in self.strings:
+            if len(txt) == 32 and _hexdigits.issuperset(txt):
+                buf.append(_HEX_ID)
+                buf.extend(binascii.unhexlify(txt.encode('ascii')))
+            else:
+                data = txt.encode('utf-8')
+                buf.append(_TEXT)
+                _write_varint(buf, len(data))
+                buf.extend(data)
+
+        buf.extend(self.body)
+        return bytes(buf)
+
+
+class _Decoder(object):
+    def __init__(self, data):
+        self.data = bytearray(data)
+        if self.data[:4] != bytearray(compact_magic):
+            raise ValueError("not a wlformat binary stream")
+
+        nb, pos = _read_varint(self.data, 4)
+        self.strings = []
+        for i in range(nb):
+            kind = self.data[pos]
+            pos += 1
+            if kind == _HEX_ID:
+                raw = bytes(self.data[pos:pos + 16])
+                self.strings.append(binascii.hexlify(raw).decode('ascii'))
+                pos += 16
+            else:
+                size, pos = _read_varint(self.data, pos)
+                txt = bytes(self.data[pos:pos + size]).decode('utf-8')
+                self.strings.append(txt)
+                pos += size
+
+        self.pos = pos
+
+    def varint(self):
+        data = self.data
+        pos = self.pos
+        val = data[pos]
+        if val < 0x80:  # fast path for small values
+            self.pos = pos + 1
+            return val
+
+        val, self.pos = _read_varint(data, pos)
+        return val
+
+    def decode(self):
+        data = self.data
+        tag = data[self.pos]
+        self.pos += 1
+        if tag == _REF:
+            return self.strings[self.varint()]
+        elif tag == _DICT:
+            strings = self.strings
+            varint = self.varint
+            decode = self.decode
+            obj = {}
+            for i in range(varint()):
+                key = strings[varint()]
+                obj[key] = decode()
+            return obj
+        elif tag == _LIST:
+            decode = self.decode
+            return [decode() for i in range(self.varint())]
+        elif tag == _STR:
+            size = self.varint()
+            pos = self.pos
+            self.pos = pos + size
+            return bytes(data[pos:pos + size]).decode('utf-8')
+        elif tag == _INT:
+            val = self.varint()
+            return val // 2 if val % 2 == 0 else -(val + 1) // 2
+        elif tag == _FLOAT:
+            val, = _double.unpack_from(data, self.pos)
+            self.pos += 8
+            return val
+        elif tag == _NONE:
+            return None
+        elif tag == _FALSE:
+            return False
+        elif tag == _TRUE:
+            return True
+        else:
+            raise ValueError("unknown tag %d at position %d"
+                             % (tag, self.pos - 1))
+
+
+def dumps(obj, compact=False):
+    """Encode an object in binary format.
+
+    Args:
+        obj: (dict) any json like object, e.g. a workflow description
+        compact: (bool) use the smaller but slower to load format
+
+    Returns:
+        (bytes)
+    """
+    if compact:
+        enc = _Encoder()
+        enc.encode(obj)
+        return enc.result()
+
+    return magic + pickle.dumps(_share(obj, {}), _protocol)
+
+
+def loads(data):
+    """Decode an object encoded in binary format.
+
+    Args:
+        data: (bytes) result of :func:`dumps`, either format
+
+    Returns:
+        (dict) - decoded object
+    """
+    head = bytes(data[:4])
+    if head == compact_magic:
+        return _Decoder(data).decode()
+
+    if head != magic:
+        raise ValueError("not a wlformat binary stream")
+
+    stream = BytesIO(data)
+    stream.seek(len(magic))
+    try:
+        return _unpickler(stream).load()
+    except Exception as e:
+        raise ValueError("invalid wlformat binary stream: %s" % e)
+
+
+def dump(obj, fs, compact=False):
+    """Write an object in binary format in a file.
+
+    Args:
+        obj: (dict) any json like object, e.g. a workflow description
+        fs: (file) file opened in binary mode
+        compact: (bool) use the smaller but slower to load format
+
+    Returns:
+        None
+    """
+    fs.write(dumps(obj, compact))
+
+
+def load(fs):
+    """Read an object in binary format from a file.
+
+    Args:
+        fs: (file) file opened in binary mode
+
+    Returns:
+        (dict) - decoded object
+    """
+    return loads(fs.read())
@@ -1,21 +1,22 @@
 """Converter (writer only) for graphviz dot files."""
 
 
-def export_workflow(wkf, store):
-    """Construct a graphviz description for a workflow.
+def iter_workflow(wkf, store, node_attrs=None):
+    """Generate a graphviz description for a workflow chunk by chunk.
 
     Args:
         wkf: (WorkflowDef)
         store: (dict of uid, def) elements definitions
+        node_attrs: (dict of int, list of str) additional graphviz
+                    attributes for some nodes, e.g. ['color="red"']
 
     Returns:
-        (dict) - workflow definition
+        (iter of str) - successive pieces of dot text
     """
-    txt = "digraph {\n"
+    yield "digraph {\n"
 
     for ind, node in enumerate(wkf["nodes"]):
         ndef = store.get(node['id'], None)
-        txt += "    node%d [" % ind
 
         label = node.get("label", None)
         if label is None:
@@ -24,21 +25,54 @@ def export_workflow(wkf, store):
             else:
                 label = ndef["name"]
 
-        txt += 'label="%s"' % label
+        attrs = ['label="%s"' % label]
 
         x = node.get("x", None)
         y = node.get("y", None)
         if x is not None and y is not None:
-            txt += ', pos="%f,%f!"' % (x, y)
+            attrs.append('pos="%f,%f!"' % (x, y))
 
-        txt += ', URL="http://127.0.0.1:6543/project_content/%s"' % node['id']
-        txt += "]\n"
+        attrs.append('URL="http://127.0.0.1:6543/project_content/%s"'
+                     % node['id'])
+        if node_attrs is not None:
+            attrs.extend(node_attrs.get(ind, []))
+        yield "    node%d [%s]\n" % (ind, ", ".join(attrs))
 
     for link in wkf['links']:
-        txt += "    node%d -> node%d" % (link['source'], link['target'])
-        txt += ' [taillabel="%s"' % link['source_port']
-        txt += ', headlabel="%s"]\n' % link['target_port']
+        yield ('    node%d -> node%d [taillabel="%s", headlabel="%s"]\n'
+               % (link['source'], link['target'],
+                  link['source_port'], link['target_port']))
+
+    yield "}\n"
+
+
+def write_workflow(wkf, store, stream, node_attrs=None):
+    """Write a graphviz description for a workflow in a stream.
+
+    Args:
+        wkf: (WorkflowDef)
+        store: (dict of uid, def) elements definitions
+        stream: (file like) object with a write method
+        node_attrs: (dict of int, list of str) additional graphviz
+                    attributes for some nodes
 
-    txt += "}\n"
+    Returns:
+        None
+    """
+    for chunk in iter_workflow(wkf, store, node_attrs):
+        stream.write(chunk)
 
-    return txt
+
+def export_workflow(wkf, store, node_attrs=None):
+    """Construct a graphviz description for a workflow.
+
+    Args:
+        wkf: (WorkflowDef)
+        store: (dict of uid, def) elements definitions
+        node_attrs: (dict of int, list of str) additional graphviz
+                    attributes for some nodes
+
+    Returns:
+        (str) - dot text
+    """
+    return "".join(iter_workflow(wkf, store, node_attrs))
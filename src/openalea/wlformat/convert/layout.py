@@ -0,0 +1,214 @@
+"""Automatic layout of workflows for display purpose.
+
+Layered (Sugiyama like) layout:
+
+ - nodes are assigned to layers using the longest path from sources
+ - nodes in each layer are ordered using barycenter sweeps to reduce
+   crossings
+ - nodes are positioned close to the barycenter of their neighbours
+   without overlapping, using widths computed for svg rendering
+"""
+
+from ..workflow import Workflow
+from .svg import node_geometry, port_radius
+
+
+def compute_layers(graph):
+    """Assign each node to a layer.
+
+    Args:
+        graph (Workflow): graph view of workflow
+
+    Returns:
+        (list of int): layer of each node, sources are on layer 0
+    """
+    layers = [0] * graph.nb_nodes()
+    for ind in graph.topological_order():
+        for succ in graph.successors(ind):
+            layers[succ] = max(layers[succ], layers[ind] + 1)
+
+    return layers
+
+
+def _order(layers, sources, targets, nb_sweeps):
+    nb = len(layers)
+    preds = [[] for i in range(nb)]
+    succs = [[] for i in range(nb)]
+    for src, tgt in zip(sources, targets):
+        preds[tgt].append(src)
+        succs[src].append(tgt)
+
+    rank = [0] * nb
+    counts = {}
+    for ind, layer in enumerate(layers):
+        rank[ind] = counts.get(layer, 0)
+        counts[layer] = rank[ind] + 1
+
+    order = sorted(range(nb), key=lambda i: (layers[i], rank[i]))
+    for sweep in range(nb_sweeps):
+        neighbours = preds if sweep % 2 == 0 else succs
+        bary = []
+        for ind in range(nb):
+            neigh = neighbours[ind]
+            if len(neigh) == 0:
+                bary.append(float(rank[ind]))
+            else:
+                bary.append(sum(rank[i] for i in neigh) / float(len(neigh)))
+
+        order = sorted(range(nb), key=lambda i: (layers[i], bary[i], rank[i]))
+        counts = {}
+        for ind in order:
+            rank[ind] = counts.get(layers[ind], 0)
+            counts[layers[ind]] = rank[ind] + 1
+
+    return order, preds, succs
+
+
+def _place(rows, widths, desired, node_spacing, xs):
+    for row in rows:
+        cur = 0.
+        best = None
+        for i, ind in enumerate(row):
+            if i > 0:
+                cur += (widths[row[i - 1]] + widths[ind]) / 2. + node_spacing
+            if best is None or desired[ind] - cur > best:
+                best = desired[ind] - cur
+            xs[ind] = cur + best
+
+        shift = sum(desired[ind] - xs[ind] for ind in row) / float(len(row))
+        for ind in row:
+            xs[ind] += shift
+
+
+def _coordinates(layers, sources, targets, widths, node_spacing, nb_sweeps):
+    nb = len(layers)
+    order, preds, succs = _order(layers, sources, targets, nb_sweeps)
+
+    rows = []
+    for ind in order:
+        if len(rows) == 0 or layers[rows[-1][0]] != layers[ind]:
+            rows.append([])
+        rows[-1].append(ind)
+
+    xs = [0.] * nb
+    _place(rows, widths, [0.] * nb, node_spacing, xs)
+    for sweep in range(nb_sweeps):
+        desired = []
+        for ind in range(nb):
+            neigh = preds[ind] + succs[ind]
+            if len(neigh) == 0:
+                desired.append(xs[ind])
+            else:
+                desired.append(sum(xs[i] for i in neigh) / float(len(neigh)))
+
+        _place(rows, widths, desired, node_spacing, xs)
+
+    return xs
+
+
+def _coordinates_numpy(layers, sources, targets, widths, node_spacing,
+                       nb_sweeps):
+    import numpy as np
+
+    nb = len(layers)
+    layers = np.array(layers, dtype=int)
+    sources = np.array(sources, dtype=int)
+    targets = np.array(targets, dtype=int)
+    widths = np.array(widths, dtype=float)
+
+    # initial rank is index order inside each layer
+    order = np.lexsort((np.arange(nb), layers))
+    sorted_layers = layers[order]
+    starts = np.searchsorted(sorted_layers, sorted_layers)
+    rank = np.empty(nb, dtype=float)
+    rank[order] = np.arange(nb) - starts
+
+    for sweep in range(nb_sweeps):
+        if sweep % 2 == 0:
+            ind, neigh = targets, sources
+        else:
+            ind, neigh = sources, targets
+        cnt = np.bincount(ind, minlength=nb)
+        tot = np.bincount(ind, weights=rank[neigh], minlength=nb)
+        bary = np.where(cnt > 0, tot / np.maximum(cnt, 1), rank)
+        order = np.lexsort((rank, bary, layers))
+        rank[order] = np.arange(nb) - starts
+
+    sorted_widths = widths[order]
+    seps = np.zeros(nb)
+    seps[1:] = (sorted_widths[:-1] + sorted_widths[1:]) / 2. + node_spacing
+    seps[starts == np.arange(nb)] = 0.
+    cum = np.cumsum(seps)
+    cum -= cum[starts]
+    layer_cnt = np.bincount(sorted_layers).astype(float)
+
+    def place(desired):
+        vals = desired[order] - cum
+        big = 2 * (np.abs(vals).max() + 1.)
+        offset = sorted_layers * big
+        best = np.maximum.accumulate(vals + offset) - offset
+        xs_sorted = cum + best
+        shift = np.bincount(sorted_layers, weights=desired[order] - xs_sorted)
+        xs_sorted += (shift / np.maximum(layer_cnt, 1.))[sorted_layers]
+        xs = np.empty(nb)
+        xs[order] = xs_sorted
+        return xs
+
+    xs = place(np.zeros(nb))
+    ends = np.concatenate([sources, targets])
+    others = np.concatenate([targets, sources])
+    cnt = np.bincount(ends, minlength=nb)
+    for sweep in range(nb_sweeps):
+        tot = np.bincount(ends, weights=xs[others], minlength=nb)
+        desired = np.where(cnt > 0, tot / np.maximum(cnt, 1), xs)
+        xs = place(desired)
+
+    return xs.tolist()
+
+
+def layout_workflow(workflow, store, node_spacing=20, layer_spacing=40,
+                    nb_sweeps=4, use_numpy=False):
+    """Assign a position to each node of a workflow.
+
+    Warnings: modify nodes of workflow in place
+
+    Raises: UserWarning if the workflow contains a cycle
+
+    Args:
+        workflow (WorkflowDef)
+        store (dict of uid, def): elements definitions
+        node_spacing (float): min horizontal space between two nodes
+        layer_spacing (float): vertical space between two layers
+        nb_sweeps (int): number of passes used to order and place nodes
+        use_numpy (bool): whether to use vectorized implementation,
+                          requires numpy
+
+    Returns:
+        (WorkflowDef): same workflow, with x and y defined on all nodes
+    """
+    graph = Workflow.from_dict(workflow)
+    if graph.nb_nodes() == 0:
+        return workflow
+
+    widths = []
+    height = 0
+    for ind, node in enumerate(workflow['nodes']):
+        nf = store.get(node['id'], None)
+        label_txt, nw, nh = node_geometry(node, nf, ind)
+        widths.append(nw)
+        height = max(height, nh)
+
+    layers = compute_layers(graph)
+    args = (layers, graph.sources, graph.targets, widths,
+            node_spacing, nb_sweeps)
+    if use_numpy:
+        xs = _coordinates_numpy(*args)
+    else:
+        xs = _coordinates(*args)
+
+    dy = height + 2 * port_radius + layer_spacing
+    for ind, node in enumerate(workflow['nodes']):
+        node['x'] = xs[ind]
+        node['y'] = layers[ind] * dy
+
+    return workflow
@@ -0,0 +1,193 @@
+"""Content addressed cache for rendered drawings.
+
+Drawings are indexed by a hash of the object drawn, the definitions it
+references in the store and the size of the drawing. Hence a drawing is
+reused as long as none of these elements changed.
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+
+
+def referenced_defs(obj, store):
+    """Find all definitions in store used to draw an object.
+
+    Args:
+        obj (dict): either a workflow or a node definition
+        store (dict of uid, def): elements definitions
+
+    Returns:
+        (dict of uid, def): def is None if uid is not in store
+    """
+    if 'nodes' in obj:
+        nfs = []
+        refs = {}
+        for node in obj['nodes']:
+            uid = node['id']
+            if uid not in refs:
+                refs[uid] = store.get(uid, None)
+                if refs[uid] is not None:
+                    nfs.append(refs[uid])
+    else:
+        nfs = [obj]
+        refs = {}
+
+    for nf in nfs:
+        for pdef in nf.get('inputs', []) + nf.get('outputs', []):
+            uid = pdef['interface']
+            if uid not in refs:
+                refs[uid] = store.get(uid, None)
+
+    return refs
+
+
+def content_key(kind, obj, store, size):
+    """Compute a key identifying a drawing.
+
+    Args:
+        kind (str): type of drawing
+        obj (dict): either a workflow or a node definition
+        store (dict of uid, def): elements definitions
+        size (int, int): size of drawing in pixels
+
+    Returns:
+        (str): hexadecimal digest
+    """
+    content = [kind, obj, referenced_defs(obj, store), size]
+    txt = json.dumps(content, sort_keys=True, default=repr)
+    return hashlib.sha1(txt.encode('utf-8')).hexdigest()
+
+
+class MemoryCache(object):
+    """Cache keeping drawings in memory.
+
+    Least recently used drawings are evicted when the cache is full.
+    """
+
+    def __init__(self, max_entries=128):
+        """Constructor.
+
+        Args:
+            max_entries (int): max number of drawings kept in cache
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Retrieve a drawing.
+
+        Args:
+            key (str): content key of drawing
+
+        Returns:
+            (str, tuple): svg text and bounding box, None if not in cache
+        """
+        try:
+            value = self._entries.pop(key)
+        except KeyError:
+            return None
+
+        self._entries[key] = value
+        return value
+
+    def set(self, key, value):
+        """Store a drawing.
+
+        Args:
+            key (str): content key of drawing
+            value (str, tuple): svg text and bounding box
+
+        Returns:
+            None
+        """
+        self._entries.pop(key, None)
+        self._entries[key] = value
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class DirectoryCache(object):
+    """Cache keeping drawings on disk, one file per drawing.
+
+    Last access time is tracked through the modification time of files.
+    Least recently used drawings are evicted when the cache is full.
+    """
+
+    def __init__(self, dirname, max_entries=1024):
+        """Constructor.
+
+        Args:
+            dirname (str): path to directory used to store drawings
+            max_entries (int): max number of drawings kept in cache
+        """
+        self.dirname = dirname
+        self.max_entries = max_entries
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+    def _entries(self):
+        return [name for name in os.listdir(self.dirname)
+                if name.endswith(".json")]
+
+    def __len__(self):
+        return len(self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.dirname, "%s.json" % key)
+
+    def get(self, key):
+        """Retrieve a drawing.
+
+        Args:
+            key (str): content key of drawing
+
+        Returns:
+            (str, tuple): svg text and bounding box, None if not in cache
+        """
+        pth = self._path(key)
+        try:
+            with open(pth, 'r') as f:
+                txt, bb = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+        try:
+            os.utime(pth, None)
+        except OSError:
+            pass
+
+        return txt, tuple(bb)
+
+    def set(self, key, value):
+        """Store a drawing.
+
+        Args:
+            key (str): content key of drawing
+            value (str, tuple): svg text and bounding box
+
+        Returns:
+            None
+        """
+        txt, bb = value
+        pth = self._path(key)
+        tmp = pth + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump([txt, list(bb)], f)
+        os.rename(tmp, pth)
+
+        names = self._entries()
+        nb = len(names) - self.max_entries
+        if nb > 0:
+            paths = [os.path.join(self.dirname, name) for name in names]
+            paths = [old_pth for old_pth in paths if old_pth != pth]
+            paths.sort(key=os.path.getmtime)
+            for old_pth in paths[:nb]:
+                try:
+                    os.remove(old_pth)
+                except OSError:
+                    pass
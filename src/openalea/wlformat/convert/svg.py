@@ -1,6 +1,8 @@
 """Converter (writer only) for svg files."""
 from svgwrite import Drawing
 
+from .render_cache import content_key
+
 node_width = 60
 # node_height = 30
 port_radius = 4
@@ -59,23 +61,17 @@ def compute_node_width(nf, label, port_spacing):
     return nw + 2 * node_padding
 
 
-def draw_node(paper, workflow, store, node, ind):
-    """Draw a single node of a workflow definition.
+def node_geometry(node, nf, ind):
+    """Compute label and size of a single node of a workflow.
 
     Args:
-        paper (svgwrite.Paper):
-        workflow (WorkflowDef)
-        store (dict of uid, def): elements definitions
-        node: current node to draw
+        node: current node
+        nf (dict|None): node definition
         ind (int): index of current node
 
     Returns:
-        (tuple of int): bounding box of drawn element
+        (str, float, float): label, width and height of node in pixels
     """
-    del workflow
-    nf = store.get(node['id'], None)
-
-    # label
     label_txt = None
     if 'label' in node:
         label_txt = node['label']
@@ -86,7 +82,6 @@ def draw_node(paper, workflow, store, node, ind):
         else:
             label_txt = nf['name']
 
-    # node size
     pr = port_radius
     pspace = 4 * pr
     if nf is None:
@@ -96,6 +91,81 @@ def draw_node(paper, workflow, store, node, ind):
 
     nh = label_font_size + 2 * pr + (2 * node_padding) * 0.5
 
+    return label_txt, nw, nh
+
+
+def add_port_positions(ports, node, nf, ind, nh):
+    """Compute absolute position of all ports of a node.
+
+    Args:
+        ports (dict): table of port positions to fill in place
+        node: current node
+        nf (dict): node definition
+        ind (int): index of current node
+        nh (float): height of node in pixels
+
+    Returns:
+        None
+    """
+    pspace = 4 * port_radius
+    for key, py in (('inputs', -nh / 2.), ('outputs', nh / 2.)):
+        nb = len(nf[key])
+        for i, pdef in enumerate(nf[key]):
+            px = i * pspace - pspace * (nb - 1) / 2
+            pkey = (ind, key, pdef['name'])
+            if pkey not in ports:
+                ports[pkey] = (node['x'] + px, node['y'] + py)
+
+
+def compute_layout(workflow, store):
+    """Compute geometry of every node and position of every port.
+
+    Args:
+        workflow (WorkflowDef)
+        store (dict of uid, def): elements definitions
+
+    Returns:
+        (list of (dict|None, str, float, float), dict): for each node its
+                definition, label, width and height. Absolute position
+                of ports, indexed by (node index, 'inputs'|'outputs', name)
+    """
+    geoms = []
+    ports = {}
+    for ind, node in enumerate(workflow['nodes']):
+        nf = store.get(node['id'], None)
+        label_txt, nw, nh = node_geometry(node, nf, ind)
+        geoms.append((nf, label_txt, nw, nh))
+        if nf is not None:
+            add_port_positions(ports, node, nf, ind, nh)
+
+    return geoms, ports
+
+
+def draw_node(paper, workflow, store, node, ind, layout=None):
+    """Draw a single node of a workflow definition.
+
+    Args:
+        paper (svgwrite.Paper):
+        workflow (WorkflowDef)
+        store (dict of uid, def): elements definitions
+        node: current node to draw
+        ind (int): index of current node
+        layout (tuple): precomputed layout of workflow,
+                        see :func:`compute_layout`
+
+    Returns:
+        (tuple of int): bounding box of drawn element
+    """
+    del workflow
+    if layout is None:
+        nf = store.get(node['id'], None)
+        label_txt, nw, nh = node_geometry(node, nf, ind)
+    else:
+        nf, label_txt, nw, nh = layout[0][ind]
+
+    pr = port_radius
+    pspace = 4 * pr
+
     # draw
     g = paper.add(paper.g())
     g.translate(node['x'], node['y'])
@@ -184,7 +254,7 @@ def port_index(ports, port_name):
     return None
 
 
-def draw_link(paper, workflow, store, link, ind):
+def draw_link(paper, workflow, store, link, ind, layout=None):
     """Draw a single node of a workflow definition.
 
     Args:
@@ -193,36 +263,30 @@ def draw_link(paper, workflow, store, link, ind):
         store (dict of uid, def): elements definitions
         link (): actual link to draw
         ind (int): index of current link in list of links
+        layout (tuple): precomputed layout of workflow,
+                        see :func:`compute_layout`
 
     Returns:
         None: add elements to paper in place
     """
-    pr = port_radius
-    pspace = 4 * pr
-    nh = label_font_size + 2 * pr + (2 * node_padding) * 0.5  # see above
+    if layout is None:
+        ports = {}
+        for nind in (link['source'], link['target']):
+            node = workflow['nodes'][nind]
+            nf = store.get(node['id'], None)
+            if nf is not None:
+                label_txt, nw, nh = node_geometry(node, nf, nind)
+                add_port_positions(ports, node, nf, nind, nh)
+    else:
+        ports = layout[1]
 
     src = workflow['nodes'][link['source']]
-    src_x = src['x']
-    src_y = src['y']
-    nf = store.get(src['id'], None)
-    if nf is not None:
-        i = port_index(nf['outputs'], link['source_port'])
-        if i is not None:
-            nb = len(nf['outputs'])
-            src_x += i * pspace - pspace * (nb - 1) / 2
-            src_y += nh / 2.
+    src_x, src_y = ports.get((link['source'], 'outputs', link['source_port']),
+                             (src['x'], src['y']))
 
     tgt = workflow['nodes'][link['target']]
-    tgt_x = tgt['x']
-    tgt_y = tgt['y']
-
-    nf = store.get(tgt['id'], None)
-    if nf is not None:
-        i = port_index(nf['inputs'], link['target_port'])
-        if i is not None:
-            nb = len(nf['inputs'])
-            tgt_x += i * pspace - pspace * (nb - 1) / 2
-            tgt_y -= nh / 2.
+    tgt_x, tgt_y = ports.get((link['target'], 'inputs', link['target_port']),
+                             (tgt['x'], tgt['y']))
 
     pth = paper.polyline([(src_x, src_y), (tgt_x, tgt_y)],
                          stroke='#000000',
@@ -231,13 +295,15 @@ def draw_link(paper, workflow, store, link, ind):
     paper.add(pth)
 
 
-def export_workflow(workflow, store, size=None):
+def export_workflow(workflow, store, size=None, cache=None):
     """Construct a SVG description for a workflow.
 
     Args:
         workflow (WorkflowDef)
         store (dict of uid, def): elements definitions
         size (int, int): size of drawing in pixels
+        cache (MemoryCache|DirectoryCache): if not None, reuse drawings
+              of identical workflows, see :mod:`render_cache`
 
     Returns:
         (str) - SVG description of workflow
@@ -250,6 +316,15 @@ def export_workflow(workflow, store, size=None):
     if size is None:
         size = (600, 600)
 
+    if cache is not None:
+        key = content_key("workflow", workflow, store, size)
+        drawing = cache.get(key)
+        if drawing is None:
+            drawing = export_workflow(workflow, store, size)
+            cache.set(key, drawing)
+
+        return drawing
+
     # draw
     paper = Drawing("workflow.svg", size, id="repr")
 
@@ -273,12 +348,14 @@ def export_workflow(workflow, store, size=None):
     lg.add_stop_color(1, color='#9a9a00')
     paper.defs.add(lg)
 
+    layout = compute_layout(workflow, store)
+
     for i, link in enumerate(workflow['links']):
-        draw_link(paper, workflow, store, link, i)
+        draw_link(paper, workflow, store, link, i, layout)
 
     bbs = []
     for i, node in enumerate(workflow['nodes']):
-        bb = draw_node(paper, workflow, store, node, i)
+        bb = draw_node(paper, workflow, store, node, i, layout)
         bbs.append(bb)
 
     # reformat whole drawing to fit screen
@@ -305,17 +382,28 @@ def export_workflow(workflow, store, size=None):
     return paper.tostring(), (xmin, ymin, xsize, ysize)
 
 
-def export_node(node, store, size=None):
+def export_node(node, store, size=None, cache=None):
     """Construct a SVG description for a workflow node.
 
     Args:
         node (NodeDef)
         store (dict of uid, def): elements definitions
         size (int, int): size of drawing in pixels
+        cache (MemoryCache|DirectoryCache): if not None, reuse drawings
+              of identical nodes, see :mod:`render_cache`
 
     Returns:
         (str) - SVG description of workflow node
     """
+    if cache is not None:
+        key = content_key("node", node, store, size or (600, 600))
+        drawing = cache.get(key)
+        if drawing is None:
+            drawing = export_node(node, store, size)
+            cache.set(key, drawing)
+
+        return drawing
+
     pfs = port_font_size
 
     # node size
@@ -10,6 +10,17 @@
 options are identical to the image/plot/figure directives
 (width, scale, height, ...)
 
+Workflows are rendered once all documents have been read, in a pool of
+processes whose size can be set in your conf.py::
+
+    workflow_render_processes = 4
+
+Drawings can be reused across builds by setting in your conf.py::
+
+    workflow_render_cache = "_build/workflow_cache"
+
+(path relative to the source directory)
+
 .. moduleauthor:: Jerome Chopard
 """
 
@@ -17,7 +28,10 @@ from docutils import nodes
 from docutils.parsers.rst import directives, Directive
 import json
 from openalea.wlformat.convert import svg
+from openalea.wlformat.convert.render_cache import DirectoryCache
+from multiprocessing import Pool
 import os
+import warnings
 
 
 class WorkflowWarning(Warning):
@@ -51,6 +65,137 @@ def out_of_date(original, derived):
              os.stat(derived).st_mtime < os.stat(original).st_mtime))
 
 
+_caches = {}
+
+# empty drawing written while waiting for the actual rendering
+placeholder = ('<svg xmlns="http://www.w3.org/2000/svg" version="1.1" '
+               'width="1" height="1"></svg>')
+
+
+def render_cache(dirname):
+    """Find cache used to store drawings.
+
+    Args:
+        dirname (str): path to cache directory
+
+    Returns:
+        (DirectoryCache|None): None if dirname is None
+    """
+    if dirname is None:
+        return None
+
+    if dirname not in _caches:
+        _caches[dirname] = DirectoryCache(dirname)
+
+    return _caches[dirname]
+
+
+def render_workflow(job):
+    """Render a workflow definition into a svg file.
+
+    Args:
+        job (tuple): wkf_file, svg_file, size, cache_dir
+
+    Returns:
+        (str|None): error message if rendering failed
+    """
+    wkf_file, svg_file, size, cache_dir = job
+    try:
+        with open(wkf_file, 'r') as f:
+            wkf = json.load(f)
+
+        drawing, bb = svg.export_workflow(wkf, {}, size,
+                                          cache=render_cache(cache_dir))
+        del bb
+
+        with open(svg_file, 'w') as f:
+            f.write(drawing)
+    except Exception as e:
+        if os.path.exists(svg_file):
+            os.remove(svg_file)
+        return "unable to render %s: %s" % (wkf_file, e)
+
+    return None
+
+
+def render_jobs(app, env):
+    """Render all workflows registered during reading in a pool of processes.
+
+    Called by sphinx on 'env-updated', before any document is written.
+
+    Args:
+        app (Sphinx): high level object to control sphinx behaviour
+        env (BuildEnvironment): sphinx environment
+
+    Returns:
+        None
+    """
+    jobs = getattr(env, 'workflow_render_jobs', {})
+    if len(jobs) == 0:
+        return
+
+    cache_dir = app.config.workflow_render_cache
+    if cache_dir is not None:
+        cache_dir = os.path.join(env.srcdir, cache_dir)
+
+    todo = [(wkf_file, svg_file, size, cache_dir)
+            for svg_file, (docname, wkf_file, size) in sorted(jobs.items())]
+
+    processes = app.config.workflow_render_processes
+    if len(todo) == 1 or processes == 1:
+        errors = [render_workflow(job) for job in todo]
+    else:
+        pool = Pool(processes)
+        try:
+            errors = pool.map(render_workflow, todo)
+        finally:
+            pool.terminate()
+            pool.join()
+
+    for msg in errors:
+        if msg is not None:
+            warnings.warn(msg, WorkflowWarning)
+
+    jobs.clear()
+
+
+def purge_jobs(app, env, docname):
+    """Remove render jobs registered by a document.
+
+    Args:
+        app (Sphinx): high level object to control sphinx behaviour
+        env (BuildEnvironment): sphinx environment
+        docname (str): name of document
+
+    Returns:
+        None
+    """
+    del app
+    jobs = getattr(env, 'workflow_render_jobs', {})
+    for svg_file, job in list(jobs.items()):
+        if job[0] == docname:
+            del jobs[svg_file]
+
+
+def merge_jobs(app, env, docnames, other):
+    """Merge render jobs registered by parallel readers.
+
+    Args:
+        app (Sphinx): high level object to control sphinx behaviour
+        env (BuildEnvironment): main sphinx environment
+        docnames (list of str): documents read by other
+        other (BuildEnvironment): sub process environment
+
+    Returns:
+        None
+    """
+    del app, docnames
+    if not hasattr(env, 'workflow_render_jobs'):
+        env.workflow_render_jobs = {}
+
+    env.workflow_render_jobs.update(getattr(other, 'workflow_render_jobs', {}))
+
+
 def align(argument):
     """Conversion function for the 'align' option."""
     return directives.choice(argument, ('left', 'center', 'right'))
@@ -80,18 +225,22 @@ class WorkflowPlotDirective(Directive):
         wkf_name = os.path.splitext(wkf_file)[0]
         svg_file = "%s.svg" % wkf_name
         if out_of_date(wkf_file, svg_file):
-            # render the workflow again
-            with open(wkf_file, 'r') as f:
-                wkf = json.load(f)
-
+            # register the workflow to be rendered once all documents
+            # have been read, see render_jobs
             w = self.options.get('width', 600)
             h = self.options.get('height', 600)
 
-            drawing, bb = svg.export_workflow(wkf, {}, (w, h))
-            del bb
+            if not hasattr(env, 'workflow_render_jobs'):
+                env.workflow_render_jobs = {}
+            job = (env.docname, wkf_file, (w, h))
+            env.workflow_render_jobs[svg_file] = job
 
-            with open(svg_file, 'w') as f:
-                f.write(drawing)
+            if not os.path.exists(svg_file):
+                # sphinx expect images to exist when reading
+                with open(svg_file, 'w') as f:
+                    f.write(placeholder)
+                # stays out of date if the build stops before rendering
+                os.utime(svg_file, (0, 0))
 
         self.options['uri'] = svg_file
         node = nodes.image(**self.options)
@@ -109,5 +258,10 @@ def setup(app):
         (dict): optional values like extension version
     """
     app.add_directive('workflow', WorkflowPlotDirective)
+    app.add_config_value('workflow_render_cache', None, 'env')
+    app.add_config_value('workflow_render_processes', None, 'env')
+    app.connect('env-purge-doc', purge_jobs)
+    app.connect('env-merge-info', merge_jobs)
+    app.connect('env-updated', render_jobs)
 
     return {'version': '0.1'}  # identifies the version of the extension
@@ -1,19 +1,118 @@
 """Converter (reader only) for wralea files."""
+from __future__ import print_function
 
 from datetime import datetime
+from multiprocessing import Pool
 from uuid import uuid1
 
 
+class Store(dict):
+    """Dictionary of definitions, uid -> (type, def).
+
+    Maintain a secondary index on the (type, name) of each definition
+    to retrieve them by name in constant time.
+
+    Warnings: the index is updated when items are set in the store,
+              renaming a definition already stored is not tracked.
+    """
+
+    def __init__(self, *args, **kwds):
+        dict.__init__(self)
+        self._names = {}  # (type, name) -> uid
+        self.update(*args, **kwds)
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+    def _index(self, uid, item):
+        typ, elm = item
+        self._names.setdefault((typ, elm['name']), uid)
+
+    def _unindex(self, uid, item):
+        typ, elm = item
+        key = (typ, elm['name'])
+        if self._names.get(key) != uid:
+            return
+
+        del self._names[key]
+        # look for another definition with the same name
+        for other_uid, (other_typ, other_elm) in self.items():
+            if (other_typ, other_elm['name']) == key:
+                self._names[key] = other_uid
+                return
+
+    def __setitem__(self, uid, item):
+        old_item = self.get(uid)
+        dict.__setitem__(self, uid, item)
+        if old_item is not None:
+            self._unindex(uid, old_item)
+        self._index(uid, item)
+
+    def __delitem__(self, uid):
+        item = self[uid]
+        dict.__delitem__(self, uid)
+        self._unindex(uid, item)
+
+    def update(self, *args, **kwds):
+        for uid, item in dict(*args, **kwds).items():
+            self[uid] = item
+
+    def setdefault(self, uid, item=None):
+        if uid not in self:
+            self[uid] = item
+
+        return self[uid]
+
+    def pop(self, uid, *args):
+        if uid not in self:
+            return dict.pop(self, uid, *args)
+
+        item = self[uid]
+        del self[uid]
+        return item
+
+    def popitem(self):
+        uid, item = dict.popitem(self)
+        self._unindex(uid, item)
+        return uid, item
+
+    def clear(self):
+        dict.clear(self)
+        self._names.clear()
+
+    def copy(self):
+        return self.__class__(self)
+
+    def find(self, typ, name):
+        """Find a definition from its name.
+
+        Args:
+            typ: (str) type of definition, either 'data' or 'node'
+            name: (str) name of definition
+
+        Returns:
+            (def|None) - returns None if no such definition exists
+        """
+        try:
+            return self[self._names[(typ, name)]][1]
+        except KeyError:
+            return None
+
+
 def get_interface_by_name(store, name):
     """Find an interface in store from its name.
 
     Args:
-        store: (dict of uid, def)
+        store: (dict of uid, def) use constant time lookup if store
+               is a :class:`Store`
         name: (str) name of interface
 
     Returns:
         (idef|None) - returns None if no such interface exists
     """
+    if isinstance(store, Store):
+        return store.find("data", name)
+
     for typ, idef in store.values():
         if typ == "data":
             if idef["name"] == name:
@@ -51,13 +150,17 @@ def get_node_by_node_desc(store, node_desc):
     """Find a node in store whose name is pkg: func_name.
 
     Args:
-        store: (dict of uid, ndef)
+        store: (dict of uid, ndef) use constant time lookup if store
+               is a :class:`Store`
         node_desc: (str, str) pkg, func_name
 
     Returns:
         (ndef|None) - returns None if no such node exists
     """
     name = "%s: %s" % node_desc
+    if isinstance(store, Store):
+        return store.find("node", name)
+
     for typ, ndef in store.values():
         if typ == "node":
             if ndef["name"] == name:
@@ -336,15 +439,15 @@ def convert_workflow(cnf, store):
             src_typ, src_def = store[wdef['nodes'][ntrans[src]]['id']]
             src_pname = src_def['outputs'][opid]['name']
         except IndexError as e:
-            print src_typ, src_def
-            print "opid", opid
+            print(src_typ, src_def)
+            print("opid", opid)
             raise e
         try:
             tgt_typ, tgt_def = store[wdef['nodes'][ntrans[tgt]]['id']]
             tgt_pname = tgt_def['inputs'][ipid]['name']
         except IndexError as e:
-            print tgt_typ, tgt_def
-            print "ipid", ipid
+            print(tgt_typ, tgt_def)
+            print("ipid", ipid)
             raise e
 
         new_link = dict(source=ntrans[src],
@@ -354,3 +457,179 @@ def convert_workflow(cnf, store):
         wdef['links'].append(new_link)
 
     return wdef
+
+
+_pm = None
+
+
+def load_package(pkgname):
+    """Load an openalea package using the package manager.
+
+    Args:
+        pkgname: (str) name of openalea package
+
+    Returns:
+        (Package) - dict like object of factory name, factory
+    """
+    global _pm
+    if _pm is None:
+        from openalea.core.pkgmanager import PackageManager
+        _pm = PackageManager()
+        _pm.init(verbose=False)
+
+    return _pm[pkgname]
+
+
+def _is_composite(nf):
+    try:
+        from openalea.core.compositenode import CompositeNodeFactory
+    except ImportError:  # no openalea, nf can not be one of its factories
+        return False
+
+    return isinstance(nf, CompositeNodeFactory)
+
+
+def _is_data(nf):
+    try:
+        from openalea.core.data import DataFactory
+    except ImportError:
+        return False
+
+    return isinstance(nf, DataFactory)
+
+
+_worker_store = None
+
+
+def _init_worker(store):
+    """Initialize store of interfaces used by a conversion worker.
+
+    Args:
+        store: (dict of uid, def) elements definitions
+
+    Returns:
+        None
+    """
+    global _worker_store
+    _worker_store = Store(store)
+
+
+def _convert_package_nodes(pkgname, pkg, store):
+    """Convert all non composite factories of a package.
+
+    Interfaces unknown to the store are registered on the fly.
+
+    Args:
+        pkgname: (str) name of openalea package
+        pkg: (Package) dict like object of factory name, factory
+        store: (Store) elements definitions
+
+    Returns:
+        (list of idef, list of ndef, list of CompositeNodeFactory) -
+                 interfaces registered during the conversion, node
+                 definitions, composite factories left to convert
+    """
+    idefs = []
+
+    def ensure_interface(iname):
+        if get_interface_by_name(store, iname) is None:
+            idefs.append(register_interface(store, iname))
+
+    ndefs = []
+    cnfs = []
+    for name, nf in sorted(pkg.items()):
+        if _is_composite(nf):
+            cnfs.append(nf)
+            continue
+
+        if _is_data(nf):
+            ensure_interface("any")
+            ensure_interface("IData")
+            ndefs.append(convert_data_node(nf, store, pkgname))
+        else:
+            for port in list(nf.inputs or []) + list(nf.outputs or []):
+                ensure_interface(str(port.get('interface', "any")))
+            ndefs.append(convert_node(nf, store, pkgname))
+
+    return idefs, ndefs, cnfs
+
+
+def _convert_package_worker(args):
+    """Load and convert a package in a worker process.
+
+    Args:
+        args: (str, callable) pkgname, loader
+
+    Returns:
+        (list of idef, list of ndef, list of CompositeNodeFactory) -
+                 see :func:`_convert_package_nodes`
+    """
+    pkgname, loader = args
+    return _convert_package_nodes(pkgname, loader(pkgname), _worker_store)
+
+
+def convert_packages(pkgnames, store, processes=None, loader=load_package):
+    """Convert all factories of a set of openalea packages.
+
+    Node and data factories are converted first, possibly in a pool of
+    processes. Results are merged in the order of pkgnames, so the first
+    package registering an interface defines it for all others. Composite
+    nodes are converted afterwards, once all node definitions are known.
+
+    Warnings: modify store in place to add interfaces and nodes
+
+    Args:
+        pkgnames: (list of str) names of openalea packages
+        store: (dict of uid, def) elements definitions
+        processes: (int) number of worker processes to use, if None
+                   everything is converted in the current process
+        loader: (callable) function used to load a package from its
+                name, called once per package, must be picklable as
+                well as composite factories if processes is not None
+
+    Returns:
+        (list of ndef, list of wdef) - node and workflow definitions
+    """
+    if processes is None:
+        local_store = Store(store)
+        results = (_convert_package_nodes(pkgname, loader(pkgname),
+                                          local_store)
+                   for pkgname in pkgnames)
+        pool = None
+    else:
+        tasks = [(pkgname, loader) for pkgname in pkgnames]
+        pool = Pool(processes, initializer=_init_worker, initargs=(store,))
+        results = pool.imap(_convert_package_worker, tasks)
+
+    try:
+        trans = {}  # worker interface id -> merged interface id
+        ndefs = []
+        cnfs = []
+        for idefs, pkg_ndefs, pkg_cnfs in results:
+            for idef in idefs:
+                merged = get_interface_by_name(store, idef['name'])
+                if merged is None:
+                    store[idef['id']] = ('data', idef)
+                    merged = idef
+                trans[idef['id']] = merged['id']
+
+            for ndef in pkg_ndefs:
+                for pdef in ndef['inputs'] + ndef['outputs']:
+                    pdef['interface'] = trans.get(pdef['interface'],
+                                                  pdef['interface'])
+                store[ndef['id']] = ('node', ndef)
+                ndefs.append(ndef)
+
+            cnfs.extend(pkg_cnfs)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    wdefs = []
+    for cnf in cnfs:
+        wdef = convert_workflow(cnf, store)
+        if wdef is not None:
+            wdefs.append(wdef)
+
+    return ndefs, wdefs
@@ -0,0 +1,485 @@
+"""Local execution of workflows.
+
+Nodes are evaluated by calling the python function referenced by the
+'function' attribute of their definition, e.g. 'py:module#func'. The
+result of an execution is a provenance record (see schema_prov_exe.json)
+from which values can be retrieved with :func:`prov_exe.data_produced_by`.
+
+Only the nodes needed to compute the requested targets are executed, all
+nodes if no targets are given.
+
+Flags set on workflow nodes are honoured:
+ - block: node is never executed, neither are nodes downstream of it
+ - lazy: (default True) as in OpenAlea, node is not evaluated again if
+         its inputs did not change since a previous evaluation, i.e. its
+         result is found in the :class:`result_cache.ResultCache` given to
+         the executor. Non lazy nodes are evaluated on each execution.
+ - priority: among nodes ready to run, highest priorities start first
+"""
+
+from heapq import heappop, heappush
+from importlib import import_module
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+import sys
+from time import time
+from uuid import uuid1
+
+from .result_cache import execution_key
+from .workflow import Workflow
+
+try:
+    from queue import Queue
+except ImportError:  # python 2
+    from Queue import Queue
+
+_functions = {}  # uri -> python function
+
+_has_error_callback = sys.version_info[0] >= 3
+
+
+def resolve_function(uri):
+    """Find python function associated to a function uri.
+
+    Raises: UserWarning if uri can not be resolved
+
+    Args:
+        uri (str): 'py:module#func', func can be a dotted path
+                   to an attribute of module
+
+    Returns:
+        (callable)
+    """
+    try:
+        return _functions[uri]
+    except KeyError:
+        pass
+
+    if not uri.startswith("py:") or "#" not in uri:
+        raise UserWarning("unsupported function uri '%s'" % uri)
+
+    modname, funcname = uri[3:].split("#", 1)
+    try:
+        func = import_module(modname)
+        for name in funcname.split("."):
+            func = getattr(func, name)
+    except (ImportError, AttributeError) as e:
+        raise UserWarning("unable to resolve '%s': %s" % (uri, e))
+
+    _functions[uri] = func
+    return func
+
+
+def _evaluate(args):
+    """Call the function of a node.
+
+    Run in worker processes, hence only return picklable objects.
+
+    Args:
+        args (str, list): function uri, input values in port order
+
+    Returns:
+        (float, float, any, str|None): time_init, time_end, result,
+                      description of error if function failed
+    """
+    uri, inputs = args
+    time_init = time()
+    try:
+        res = resolve_function(uri)(*inputs)
+        err = None
+    except Exception as e:
+        res = None
+        err = "%s: %s" % (e.__class__.__name__, e)
+
+    return time_init, time(), res, err
+
+
+def _output_values(ndef, res):
+    """Associate the result of a function to the output ports of a node.
+
+    Args:
+        ndef (dict): node definition
+        res (any): result of function
+
+    Returns:
+        (list of (str, any)): port name, value
+    """
+    names = [port['name'] for port in ndef['outputs']]
+    if len(names) == 0:
+        return []
+
+    if len(names) == 1:
+        return [(names[0], res)]
+
+    if not isinstance(res, (list, tuple)) or len(res) != len(names):
+        raise UserWarning("function of '%s' must return %d values"
+                          % (ndef['name'], len(names)))
+
+    return list(zip(names, res))
+
+
+class Executor(object):
+    """Run workflows locally, possibly with a pool of workers."""
+
+    def __init__(self, store, max_workers=None, use_processes=False,
+                 cache=None):
+        """Constructor.
+
+        Args:
+            store (dict of uid, def): elements definitions
+            max_workers (int): number of nodes executed concurrently,
+                               if None nodes are executed one at a time
+                               in the current thread
+            use_processes (bool): whether to use processes instead of
+                                  threads, functions and values must
+                                  be picklable
+            cache (ResultCache): results of previous evaluations,
+                                 None means no memoization
+        """
+        self.store = store
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self.cache = cache
+
+    def _node_defs(self, workflow):
+        ndefs = []
+        for ind, node in enumerate(workflow['nodes']):
+            try:
+                ndefs.append(self.store[node['id']])
+            except KeyError:
+                raise UserWarning("node %d: unknown definition %s"
+                                  % (ind, node['id']))
+
+        return ndefs
+
+    def select(self, workflow, targets=None):
+        """Find nodes to execute.
+
+        Targets and all nodes upstream of them, except blocked nodes and
+        nodes downstream of them.
+
+        Args:
+            workflow (dict): workflow definition
+            targets (list of int): nodes whose outputs are requested,
+                                   None means all nodes
+
+        Returns:
+            (set of int): indices of nodes to execute
+        """
+        graph = Workflow.from_dict(workflow)
+        nodes = workflow['nodes']
+        if targets is None:
+            targets = range(len(nodes))
+
+        front = list(targets)
+        needed = set()
+        while len(front) > 0:
+            ind = front.pop()
+            if ind not in needed:
+                needed.add(ind)
+                front.extend(graph.predecessors(ind))
+
+        # blocked nodes and everything downstream
+        front = [ind for ind, node in enumerate(nodes)
+                 if node.get('block', False)]
+        blocked = set()
+        while len(front) > 0:
+            ind = front.pop()
+            if ind not in blocked:
+                blocked.add(ind)
+                front.extend(graph.successors(ind))
+
+        return needed - blocked
+
+    def _start(self, workflow, parameters=None, targets=None):
+        """Prepare the execution of a workflow.
+
+        Args:
+            workflow (dict): workflow definition
+            parameters (dict of (int, str), any): values of unconnected
+                       input ports
+            targets (list of int): nodes whose outputs are requested
+
+        Returns:
+            (_Execution)
+        """
+        return _Execution(workflow, self._node_defs(workflow),
+                          self.select(workflow, targets), parameters,
+                          self.cache)
+
+    def run(self, workflow, parameters=None, targets=None):
+        """Execute a workflow.
+
+        Raises: UserWarning if a node fails, remaining nodes are not run
+
+        Args:
+            workflow (dict): workflow definition
+            parameters (dict of (int, str), any): values of unconnected
+                       input ports, port defaults are used for others
+            targets (list of int): nodes whose outputs are requested,
+                                   None means all nodes
+
+        Returns:
+            (dict): provenance record of execution
+        """
+        state = self._start(workflow, parameters, targets)
+        if self.max_workers is None:
+            while len(state.ready) > 0:
+                ind = state.pop()
+                in_ports, values = state.inputs(ind)
+                key, outcome = state.lookup(ind, values)
+                if outcome is None:
+                    outcome = _evaluate((state.ndefs[ind]['function'],
+                                         values))
+                state.complete(ind, in_ports, outcome, key)
+        else:
+            self._run_pool(state)
+
+        return state.finish()
+
+    def _run_pool(self, state):
+        if self.use_processes:
+            pool = Pool(self.max_workers)
+        else:
+            pool = ThreadPool(self.max_workers)
+
+        done = Queue()
+        try:
+            nb_running = 0
+            while len(state.ready) > 0 or nb_running > 0:
+                while len(state.ready) > 0 and nb_running < self.max_workers:
+                    ind = state.pop()
+                    in_ports, values = state.inputs(ind)
+                    key, outcome = state.lookup(ind, values)
+                    if outcome is not None:
+                        state.complete(ind, in_ports, outcome)
+                        continue
+
+                    def callback(outcome, ind=ind, in_ports=in_ports,
+                                 key=key):
+                        done.put((ind, in_ports, outcome, key))
+
+                    kwds = dict(callback=callback)
+                    if _has_error_callback:
+                        # e.g. result of function can not be pickled
+                        def error(exc, ind=ind, in_ports=in_ports):
+                            err = "%s: %s" % (exc.__class__.__name__, exc)
+                            done.put((ind, in_ports, (0., 0., None, err),
+                                      None))
+
+                        kwds['error_callback'] = error
+
+                    pool.apply_async(_evaluate,
+                                     ((state.ndefs[ind]['function'],
+                                       values),),
+                                     **kwds)
+                    nb_running += 1
+
+                if nb_running == 0:  # all ready nodes found in cache
+                    continue
+
+                ind, in_ports, outcome, key = done.get()
+                nb_running -= 1
+                state.complete(ind, in_ports, outcome, key)
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+class _Execution(object):
+    """State of a running execution, whatever the scheduler.
+
+    Keep track of values produced so far, of nodes ready to run
+    and of the provenance record being built.
+    """
+
+    def __init__(self, workflow, ndefs, to_run, parameters=None, cache=None):
+        """Constructor.
+
+        Args:
+            workflow (dict): workflow definition
+            ndefs (list of dict): definition of each node
+            to_run (set of int): indices of nodes to execute
+            parameters (dict of (int, str), any): values of unconnected
+                       input ports
+            cache (ResultCache): results of previous evaluations
+        """
+        self.workflow = workflow
+        self.graph = Workflow.from_dict(workflow)
+        self.graph.topological_order()  # check acyclicity
+        self.ndefs = ndefs
+        self.parameters = {} if parameters is None else parameters
+        self.cache = cache
+
+        self.prov = dict(id=uuid1().hex,
+                         name="execution of %s" % workflow.get('name', ""),
+                         owner="executor",
+                         version=0,
+                         description="",
+                         workflow=workflow['id'],
+                         time_init=time(),
+                         data=[],
+                         parameters=[],
+                         executions=[])
+
+        self.produced = {}  # (node, port) -> (data id, value)
+        self.nb_missing = {}
+        self.ready = []  # heap of (-priority, node)
+        for ind in to_run:
+            self.nb_missing[ind] = len(set(self.graph.predecessors(ind)))
+            if self.nb_missing[ind] == 0:
+                self._push(ind)
+
+    def _push(self, ind):
+        priority = self.workflow['nodes'][ind].get('priority', 0)
+        heappush(self.ready, (-priority, ind))
+
+    def pop(self):
+        """Retrieve ready node with highest priority.
+
+        Returns:
+            (int): index of node
+        """
+        return heappop(self.ready)[1]
+
+    def register(self, value):
+        """Add a new data to provenance.
+
+        Args:
+            value (any): value of data
+
+        Returns:
+            (str): id of data
+        """
+        did = uuid1().hex
+        self.prov['data'].append(dict(id=did,
+                                      type=type(value).__name__,
+                                      value=value))
+        return did
+
+    def inputs(self, ind):
+        """Gather values of input ports of a node.
+
+        Args:
+            ind (int): index of node
+
+        Returns:
+            (list of dict, list of any): port descriptions for
+                        provenance, values in port order
+        """
+        ports = []
+        values = []
+        for port in self.ndefs[ind]['inputs']:
+            lids = self.graph.in_port_links(ind, port['name'])
+            if len(lids) > 0:
+                link = self.graph.link(lids[0])
+                did, value = self.produced[(link['source'],
+                                            link['source_port'])]
+            else:
+                value = self.parameters.get((ind, port['name']),
+                                            port.get('default', None))
+                did = self.register(value)
+                self.prov['parameters'].append(dict(node=ind,
+                                                    port=port['name'],
+                                                    data=did))
+            ports.append(dict(port=port['name'], data=did))
+            values.append(value)
+
+        return ports, values
+
+    def lookup(self, ind, values):
+        """Search cache for a previous evaluation of a node.
+
+        Args:
+            ind (int): index of node
+            values (list of any): values of inputs
+
+        Returns:
+            (str|None, tuple|None): key to store the result under,
+                       outcome of evaluation if found in cache
+        """
+        # non lazy nodes are always evaluated
+        if (self.cache is None or
+                not self.workflow['nodes'][ind].get('lazy', True)):
+            return None, None
+
+        key = execution_key(self.ndefs[ind]['function'], values)
+        if key is None:
+            return None, None
+
+        found, res = self.cache.get(key)
+        if found:
+            now = time()
+            return key, (now, now, res, None)
+
+        return key, None
+
+    def complete(self, ind, in_ports, outcome, key=None):
+        """Record the evaluation of a node.
+
+        Raises: UserWarning if evaluation failed
+
+        Args:
+            ind (int): index of node
+            in_ports (list of dict): as returned by :meth:`inputs`
+            outcome (tuple): time_init, time_end, result, error
+            key (str): key to store result in cache, if any
+        """
+        time_init, time_end, res, err = outcome
+        if err is not None:
+            raise UserWarning("node %d failed: %s" % (ind, err))
+
+        outputs = _output_values(self.ndefs[ind], res)
+        if key is not None:  # only results matching node outputs
+            self.cache.set(key, res)
+
+        out_ports = []
+        for name, value in outputs:
+            did = self.register(value)
+            self.produced[(ind, name)] = (did, value)
+            out_ports.append(dict(port=name, data=did))
+
+        self.prov['executions'].append(dict(node=ind,
+                                            time_init=time_init,
+                                            time_end=time_end,
+                                            inputs=in_ports,
+                                            outputs=out_ports))
+
+        for succ in set(self.graph.successors(ind)):
+            if succ in self.nb_missing:
+                self.nb_missing[succ] -= 1
+                if self.nb_missing[succ] == 0:
+                    self._push(succ)
+
+    def finish(self):
+        """Close provenance record.
+
+        Returns:
+            (dict): provenance record of execution
+        """
+        self.prov['time_end'] = time()
+        return self.prov
+
+
+def execute(workflow, store, parameters=None, targets=None,
+            max_workers=None, use_processes=False, cache=None):
+    """Execute a workflow.
+
+    See Also: :class:`Executor`
+
+    Args:
+        workflow (dict): workflow definition
+        store (dict of uid, def): elements definitions
+        parameters (dict of (int, str), any): values of unconnected
+                   input ports
+        targets (list of int): nodes whose outputs are requested,
+                               None means all nodes
+        max_workers (int): number of nodes executed concurrently
+        use_processes (bool): whether to use processes instead of threads
+        cache (ResultCache): results of previous evaluations
+
+    Returns:
+        (dict): provenance record of execution
+    """
+    executor = Executor(store, max_workers, use_processes, cache)
+    return executor.run(workflow, parameters, targets)
@@ -0,0 +1,546 @@
+"""Synthetic wlformat objects for scale testing.
+
+Generate schema valid data interfaces, node definitions, workflows and
+the provenance of their execution. Everything is deterministic for a
+given seed.
+
+Ids and random choices for a node only depend on the seed and the index
+of the node, hence workflows and provenance records can be streamed to
+disk element by element without ever holding them in memory.
+"""
+
+import hashlib
+import json
+import os
+import struct
+
+shapes = ("chain", "fan", "layered")
+
+
+def make_id(*keys):
+    """Compute a deterministic 32 hex chars id.
+
+    Args:
+        keys (list of any): elements identifying the object
+
+    Returns:
+        (str)
+    """
+    txt = ":".join(map(str, keys))
+    return hashlib.md5(txt.encode('utf-8')).hexdigest()
+
+
+class _Draws(object):
+    """Counter based stream of random numbers.
+
+    Much cheaper to create than a new random.Random and identical across
+    python versions. Successive digests of the key and a counter are
+    used as source of randomness.
+    """
+
+    _uint = struct.Struct("<Q")
+
+    def __init__(self, key):
+        self._key = key
+        self._count = 0
+        self._buf = b""
+
+    def random(self):
+        if len(self._buf) < 8:
+            txt = "%s:%d" % (self._key, self._count)
+            self._buf = hashlib.md5(txt.encode('utf-8')).digest()
+            self._count += 1
+
+        val, = self._uint.unpack(self._buf[:8])
+        self._buf = self._buf[8:]
+        return (val >> 11) * (1. / (1 << 53))
+
+    def randrange(self, nb):
+        return int(self.random() * nb)
+
+    def randint(self, vmin, vmax):
+        return vmin + self.randrange(vmax - vmin + 1)
+
+    def choice(self, seq):
+        return seq[self.randrange(len(seq))]
+
+
+def _rng(seed, *keys):
+    return _Draws(make_id(seed, *keys))
+
+
+def make_interfaces(nb, seed=0):
+    """Generate data interfaces.
+
+    Some interfaces derive from previously generated ones.
+
+    Args:
+        nb (int): number of interfaces
+        seed (int): seed of generator
+
+    Returns:
+        (list of dict): interface definitions
+    """
+    rng = _rng(seed, "interfaces")
+    idefs = []
+    for i in range(nb):
+        ancestors = []
+        if i > 0 and rng.random() < 0.3:
+            ancestors.append(idefs[rng.randrange(i)]['id'])
+
+        idefs.append(dict(id=make_id(seed, "interface", i),
+                          name="IType%d" % i,
+                          owner="generator",
+                          version=0,
+                          description="synthetic interface",
+                          schema={},
+                          ancestors=ancestors))
+
+    return idefs
+
+
+def make_nodes(nb, idefs, max_ports=3, seed=0):
+    """Generate node definitions.
+
+    Node i has (i % max_ports) + 1 inputs, hence all numbers of inputs
+    up to max_ports are available as soon as nb >= max_ports.
+
+    Args:
+        nb (int): number of node definitions
+        idefs (list of dict): interfaces used by ports
+        max_ports (int): max number of inputs and outputs of a node
+        seed (int): seed of generator
+
+    Returns:
+        (list of dict): node definitions
+    """
+    rng = _rng(seed, "nodes")
+    ndefs = []
+    for i in range(nb):
+        ports = {}
+        for key, nb_ports in (("inputs", i % max_ports + 1),
+                              ("outputs", rng.randint(1, max_ports))):
+            ports[key] = [dict(name="%s%d" % (key[:-1], j),
+                               interface=rng.choice(idefs)['id'],
+                               description="synthetic port")
+                          for j in range(nb_ports)]
+
+        ndefs.append(dict(id=make_id(seed, "node", i),
+                          name="node%d" % i,
+                          owner="generator",
+                          version=0,
+                          description="synthetic node",
+                          function="py:synthetic#node%d" % i,
+                          inputs=ports["inputs"],
+                          outputs=ports["outputs"]))
+
+    return ndefs
+
+
+def _write_object(stream, attrs, arrays):
+    """Write a json object whose arrays are produced lazily.
+
+    Args:
+        stream (file): text stream
+        attrs (dict): small attributes of object
+        arrays (list of (str, iter)): name and elements of each array
+
+    Returns:
+        None
+    """
+    stream.write("{")
+    first = True
+    for key in sorted(attrs):
+        if not first:
+            stream.write(", ")
+        first = False
+        stream.write("%s: %s" % (json.dumps(key), json.dumps(attrs[key])))
+
+    for key, elms in arrays:
+        if not first:
+            stream.write(", ")
+        first = False
+        stream.write("%s: [" % json.dumps(key))
+        for i, elm in enumerate(elms):
+            if i > 0:
+                stream.write(", ")
+            stream.write(json.dumps(elm, sort_keys=True))
+        stream.write("]")
+
+    stream.write("}")
+
+
+class WorkflowGenerator(object):
+    """Generate workflows of a given shape.
+
+    Shapes:
+     - chain: each node is connected to the previous one
+     - fan: hubs whose outputs fan out to 'width' nodes, whose outputs
+            fan in into the next hub
+     - layered: nodes are organized in layers of 'width' nodes, inputs
+                are connected to random nodes of previous layer
+    """
+
+    def __init__(self, ndefs, nb_nodes, shape="layered", width=10, seed=0):
+        """Constructor.
+
+        Args:
+            ndefs (list of dict): node definitions used by nodes
+            nb_nodes (int): number of nodes in workflow
+            shape (str): one of :data:`shapes`
+            width (int): number of nodes in a layer or in a fan
+            seed (int): seed of generator
+        """
+        if shape not in shapes:
+            raise UserWarning("unknown shape '%s'" % shape)
+
+        self.ndefs = ndefs
+        self.nb_nodes = nb_nodes
+        self.shape = shape
+        self.width = width
+        self.seed = seed
+        self.id = make_id(seed, "workflow", shape, nb_nodes)
+        self._defs = {}  # bounded cache, node index -> def index
+
+        if shape == "fan":
+            hubs = [i for i, ndef in enumerate(ndefs)
+                    if len(ndef['inputs']) == width]
+            if len(hubs) == 0:
+                msg = "no node definition with %d inputs for fan" % width
+                raise UserWarning(msg)
+            self._hubs = hubs
+
+    def attributes(self):
+        """Attributes of workflow other than nodes and links.
+
+        Returns:
+            (dict)
+        """
+        return dict(id=self.id,
+                    name="%s%d" % (self.shape, self.nb_nodes),
+                    owner="generator",
+                    version=0,
+                    description="synthetic %s workflow" % self.shape)
+
+    def _is_hub(self, ind):
+        return self.shape == "fan" and ind % (self.width + 1) == 0
+
+    def node_def(self, ind):
+        """Definition of a node.
+
+        Args:
+            ind (int): index of node in workflow
+
+        Returns:
+            (dict)
+        """
+        try:
+            return self.ndefs[self._defs[ind]]
+        except KeyError:
+            pass
+
+        rng = _rng(self.seed, "def", ind)
+        if self._is_hub(ind) and ind > 0:
+            def_ind = rng.choice(self._hubs)
+        else:
+            def_ind = rng.randrange(len(self.ndefs))
+
+        # nodes are mostly linked to close nodes, a small cache is enough
+        if len(self._defs) > 4096:
+            self._defs.clear()
+        self._defs[ind] = def_ind
+
+        return self.ndefs[def_ind]
+
+    def node(self, ind):
+        """Generate a single node of workflow.
+
+        Args:
+            ind (int): index of node in workflow
+
+        Returns:
+            (dict)
+        """
+        row, col = divmod(ind, self.width)
+        return dict(id=self.node_def(ind)['id'], x=col * 200., y=row * 100.)
+
+    def _sources(self, ind):
+        """Candidate source nodes for the inputs of a node."""
+        if ind == 0:
+            return []
+
+        if self.shape == "chain":
+            return [ind - 1]
+
+        if self.shape == "fan":
+            period = self.width + 1
+            hub = ind - ind % period
+            if ind == hub:  # fan in
+                return list(range(hub - self.width, hub))
+            return [hub]  # fan out
+
+        layer = ind // self.width
+        if layer == 0:
+            return []
+        start = (layer - 1) * self.width
+        return list(range(start, start + self.width))
+
+    def links(self, ind):
+        """Generate links whose target is a given node.
+
+        Args:
+            ind (int): index of node in workflow
+
+        Returns:
+            (list of dict)
+        """
+        sources = self._sources(ind)
+        if len(sources) == 0:
+            return []
+
+        rng = _rng(self.seed, "links", ind)
+        links = []
+        for i, port in enumerate(self.node_def(ind)['inputs']):
+            if self._is_hub(ind):
+                src = sources[i]
+            else:
+                src = rng.choice(sources)
+            src_port = rng.choice(self.node_def(src)['outputs'])
+            links.append(dict(source=src,
+                              source_port=src_port['name'],
+                              target=ind,
+                              target_port=port['name']))
+
+        return links
+
+    def iter_nodes(self):
+        """Iterate on nodes of workflow.
+
+        Returns:
+            (iter of dict)
+        """
+        for ind in range(self.nb_nodes):
+            yield self.node(ind)
+
+    def iter_links(self):
+        """Iterate on links of workflow, sorted by target.
+
+        Returns:
+            (iter of dict)
+        """
+        for ind in range(self.nb_nodes):
+            for link in self.links(ind):
+                yield link
+
+    def workflow(self):
+        """Generate whole workflow in memory.
+
+        Returns:
+            (dict): workflow definition
+        """
+        return dict(self.attributes(),
+                    nodes=list(self.iter_nodes()),
+                    links=list(self.iter_links()))
+
+    def write(self, stream):
+        """Write workflow as json.
+
+        Args:
+            stream (file): text stream
+
+        Returns:
+            None
+        """
+        _write_object(stream, self.attributes(),
+                      [("nodes", self.iter_nodes()),
+                       ("links", self.iter_links())])
+
+
+class ProvenanceGenerator(object):
+    """Generate the record of a sequential execution of a workflow.
+
+    Nodes are executed in the order of their index.
+    """
+
+    def __init__(self, workflow, seed=0):
+        """Constructor.
+
+        Args:
+            workflow (WorkflowGenerator): workflow executed
+            seed (int): seed of generator
+        """
+        self.workflow = workflow
+        self.seed = seed
+        self.id = make_id(seed, "provenance", workflow.id)
+
+    def _times(self, ind):
+        # each node runs in its own one second slot
+        rng = _rng(self.seed, "time", ind)
+        return ind * 1., ind * 1. + rng.random()
+
+    def attributes(self):
+        """Attributes of record other than data, parameters, executions.
+
+        Returns:
+            (dict)
+        """
+        return dict(id=self.id,
+                    name="execution of %s" % self.workflow.id,
+                    owner="generator",
+                    version=0,
+                    description="synthetic provenance",
+                    workflow=self.workflow.id,
+                    time_init=0.,
+                    time_end=float(self.workflow.nb_nodes))
+
+    def output_id(self, ind, port_name):
+        """Id of data produced by a node on a port.
+
+        Args:
+            ind (int): index of node in workflow
+            port_name (str): name of output port
+
+        Returns:
+            (str)
+        """
+        return make_id(self.seed, "out", self.workflow.id, ind, port_name)
+
+    def parameter_id(self, ind, port_name):
+        """Id of data stored on an unconnected input port.
+
+        Args:
+            ind (int): index of node in workflow
+            port_name (str): name of input port
+
+        Returns:
+            (str)
+        """
+        return make_id(self.seed, "param", self.workflow.id, ind, port_name)
+
+    def _inputs(self, ind):
+        links = dict((link['target_port'], link)
+                     for link in self.workflow.links(ind))
+        for port in self.workflow.node_def(ind)['inputs']:
+            link = links.get(port['name'], None)
+            if link is None:
+                yield port['name'], self.parameter_id(ind, port['name']), True
+            else:
+                did = self.output_id(link['source'], link['source_port'])
+                yield port['name'], did, False
+
+    def iter_data(self):
+        """Iterate on data, parameters first then produced data.
+
+        Returns:
+            (iter of dict)
+        """
+        for ind in range(self.workflow.nb_nodes):
+            rng = _rng(self.seed, "param_values", ind)
+            for port_name, did, is_param in self._inputs(ind):
+                if is_param:
+                    yield dict(id=did, type="float", value=rng.random())
+
+        for ind in range(self.workflow.nb_nodes):
+            rng = _rng(self.seed, "values", ind)
+            for port in self.workflow.node_def(ind)['outputs']:
+                yield dict(id=self.output_id(ind, port['name']),
+                           type="float",
+                           value=rng.random())
+
+    def iter_parameters(self):
+        """Iterate on values stored on unconnected input ports.
+
+        Returns:
+            (iter of dict)
+        """
+        for ind in range(self.workflow.nb_nodes):
+            for port_name, did, is_param in self._inputs(ind):
+                if is_param:
+                    yield dict(node=ind, port=port_name, data=did)
+
+    def iter_executions(self):
+        """Iterate on executions of nodes.
+
+        Returns:
+            (iter of dict)
+        """
+        for ind in range(self.workflow.nb_nodes):
+            time_init, time_end = self._times(ind)
+            outputs = [dict(port=port['name'],
+                            data=self.output_id(ind, port['name']))
+                       for port in self.workflow.node_def(ind)['outputs']]
+            yield dict(node=ind,
+                       time_init=time_init,
+                       time_end=time_end,
+                       inputs=[dict(port=port_name, data=did)
+                               for port_name, did, is_param
+                               in self._inputs(ind)],
+                       outputs=outputs)
+
+    def provenance(self):
+        """Generate whole record in memory.
+
+        Returns:
+            (dict): provenance record
+        """
+        return dict(self.attributes(),
+                    data=list(self.iter_data()),
+                    parameters=list(self.iter_parameters()),
+                    executions=list(self.iter_executions()))
+
+    def write(self, stream):
+        """Write record as json.
+
+        Args:
+            stream (file): text stream
+
+        Returns:
+            None
+        """
+        _write_object(stream, self.attributes(),
+                      [("data", self.iter_data()),
+                       ("parameters", self.iter_parameters()),
+                       ("executions", self.iter_executions())])
+
+
+def write_corpus(dirname, nb_records, nb_nodes, shape="layered", width=10,
+                 nb_defs=50, nb_interfaces=10, seed=0):
+    """Write a set of workflows and their provenance on disk.
+
+    Node definitions and interfaces are shared by all workflows and
+    written in 'store.json'. Each record i is made of 'workflow_i.json'
+    and 'provenance_i.json'.
+
+    Args:
+        dirname (str): path to directory, created if needed
+        nb_records (int): number of workflows
+        nb_nodes (int): number of nodes in each workflow
+        shape (str): one of :data:`shapes`
+        width (int): see :class:`WorkflowGenerator`
+        nb_defs (int): number of node definitions
+        nb_interfaces (int): number of data interfaces
+        seed (int): seed of generator
+
+    Returns:
+        (list of str): paths of files written
+    """
+    if not os.path.exists(dirname):
+        os.makedirs(dirname)
+
+    idefs = make_interfaces(nb_interfaces, seed)
+    max_ports = max(3, width) if shape == "fan" else 3
+    ndefs = make_nodes(nb_defs, idefs, max_ports, seed)
+    pths = [os.path.join(dirname, "store.json")]
+    with open(pths[0], 'w') as f:
+        json.dump(idefs + ndefs, f)
+
+    for i in range(nb_records):
+        wgen = WorkflowGenerator(ndefs, nb_nodes, shape, width, seed + i)
+        pgen = ProvenanceGenerator(wgen, seed + i)
+        for name, gen in (("workflow", wgen), ("provenance", pgen)):
+            pth = os.path.join(dirname, "%s_%d.json" % (name, i))
+            with open(pth, 'w') as f:
+                gen.write(f)
+            pths.append(pth)
+
+    return pths
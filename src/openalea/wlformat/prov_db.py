@@ -0,0 +1,264 @@
+"""Query engine over many workflow execution provenance records.
+
+Records are ingested in a SQLite database which keeps, for each execution,
+the node executed, its timing and the data consumed or produced on each
+port. Values of data are not stored, only their ids, so the database stays
+small whatever the size of the records.
+"""
+
+import sqlite3
+
+from .prov_stream import ProvenanceReader
+
+_tables = """
+CREATE TABLE IF NOT EXISTS records (
+    rid INTEGER PRIMARY KEY,
+    id TEXT,
+    workflow TEXT,
+    source TEXT,
+    time_init REAL,
+    time_end REAL
+);
+CREATE TABLE IF NOT EXISTS executions (
+    eid INTEGER PRIMARY KEY,
+    rid INTEGER,
+    ind INTEGER,
+    node INTEGER,
+    time_init REAL,
+    time_end REAL,
+    duration REAL
+);
+CREATE TABLE IF NOT EXISTS ports (
+    eid INTEGER,
+    output INTEGER,
+    port TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS records_id ON records (id);
+CREATE INDEX IF NOT EXISTS records_workflow ON records (workflow);
+CREATE INDEX IF NOT EXISTS executions_node
+    ON executions (node, duration);
+CREATE INDEX IF NOT EXISTS executions_rid ON executions (rid);
+CREATE INDEX IF NOT EXISTS ports_data ON ports (data, output);
+CREATE INDEX IF NOT EXISTS ports_eid ON ports (eid);
+"""
+
+_exe_columns = ("record", "workflow", "index", "node",
+                "time_init", "time_end")
+
+_exe_select = """
+SELECT records.id, records.workflow, executions.ind, executions.node,
+       executions.time_init, executions.time_end
+FROM executions JOIN records ON executions.rid = records.rid
+"""
+
+_port_select = """
+SELECT records.id, records.workflow, executions.ind, executions.node,
+       executions.time_init, executions.time_end, ports.port
+FROM ports
+JOIN executions ON ports.eid = executions.eid
+JOIN records ON executions.rid = records.rid
+WHERE ports.data = ? AND ports.output = ?
+ORDER BY executions.eid
+"""
+
+
+class ProvenanceDB(object):
+    """Indexed store of many provenance records."""
+
+    def __init__(self, path=":memory:"):
+        """Constructor.
+
+        Args:
+            path (str): path to database file, created if needed,
+                        default to a database in memory
+        """
+        self.path = path
+        self._con = sqlite3.connect(path)
+        self._con.executescript(_tables)
+
+    def close(self):
+        """Release database resources."""
+        self._con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _ingest(self, header, executions, source):
+        cur = self._con.cursor()
+        cur.execute("INSERT INTO records (id, workflow, source, "
+                    "time_init, time_end) VALUES (?, ?, ?, ?, ?)",
+                    (header.get('id'), header.get('workflow'), source,
+                     header.get('time_init'), header.get('time_end')))
+        rid = cur.lastrowid
+
+        for ind, exe in enumerate(executions):
+            time_init = exe.get('time_init')
+            time_end = exe.get('time_end')
+            if time_init is None or time_end is None:
+                duration = None
+            else:
+                duration = time_end - time_init
+
+            cur.execute("INSERT INTO executions (rid, ind, node, "
+                        "time_init, time_end, duration) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (rid, ind, exe['node'], time_init, time_end,
+                         duration))
+            eid = cur.lastrowid
+            ports = [(eid, 0, port['port'], port['data'])
+                     for port in exe['inputs']]
+            ports.extend((eid, 1, port['port'], port['data'])
+                         for port in exe['outputs'])
+            cur.executemany("INSERT INTO ports VALUES (?, ?, ?, ?)", ports)
+
+        return rid
+
+    def ingest(self, prov_descr, source=None):
+        """Add a provenance record to the database.
+
+        Args:
+            prov_descr (dict): a valid provenance definition
+            source (str): optional name of file the record comes from
+
+        Returns:
+            (int): internal id of record in database
+        """
+        with self._con:
+            return self._ingest(prov_descr, prov_descr['executions'], source)
+
+    def ingest_file(self, filename):
+        """Add a provenance record stored in a file to the database.
+
+        Data values in file are never decoded.
+
+        Args:
+            filename (str): path to provenance file
+
+        Returns:
+            (int): internal id of record in database
+        """
+        with ProvenanceReader(filename) as reader:
+            with self._con:
+                return self._ingest(reader.header(),
+                                    reader.iter_executions(),
+                                    filename)
+
+    def ingest_files(self, filenames):
+        """Add many provenance files to the database.
+
+        Args:
+            filenames (iter of str): paths to provenance files
+
+        Returns:
+            (int): number of records added
+        """
+        nb = 0
+        for filename in filenames:
+            self.ingest_file(filename)
+            nb += 1
+
+        return nb
+
+    def nb_records(self):
+        """Number of provenance records in database.
+
+        Returns:
+            (int)
+        """
+        cur = self._con.execute("SELECT COUNT(*) FROM records")
+        return cur.fetchone()[0]
+
+    def nb_executions(self):
+        """Number of executions over all records.
+
+        Returns:
+            (int)
+        """
+        cur = self._con.execute("SELECT COUNT(*) FROM executions")
+        return cur.fetchone()[0]
+
+    def executions(self, node=None, workflow=None, record=None,
+                   min_duration=None, max_duration=None):
+        """Find executions matching some criteria.
+
+        Args:
+            node (int): index of node in workflow
+            workflow (str): id of workflow executed
+            record (str): id of provenance record
+            min_duration (float): min runtime of execution (inclusive)
+            max_duration (float): max runtime of execution (inclusive)
+
+        Returns:
+            (iter of dict): executions with keys record, workflow, index
+                            (of execution in record), node, time_init,
+                            time_end
+        """
+        clauses = []
+        args = []
+        for expr, val in (("executions.node = ?", node),
+                          ("records.workflow = ?", workflow),
+                          ("records.id = ?", record),
+                          ("executions.duration >= ?", min_duration),
+                          ("executions.duration <= ?", max_duration)):
+            if val is not None:
+                clauses.append(expr)
+                args.append(val)
+
+        query = _exe_select
+        if len(clauses) > 0:
+            query += "WHERE " + " AND ".join(clauses)
+        query += " ORDER BY executions.eid"
+
+        for row in self._con.execute(query, args):
+            yield dict(zip(_exe_columns, row))
+
+    def _port_executions(self, data_id, output):
+        for row in self._con.execute(_port_select, (data_id, output)):
+            exe = dict(zip(_exe_columns, row))
+            exe['port'] = row[-1]
+            yield exe
+
+    def consumers(self, data_id):
+        """Find all executions that used a given data.
+
+        Args:
+            data_id (str): id of data
+
+        Returns:
+            (iter of dict): executions, same format as :meth:`executions`
+                            with an additional 'port' key
+        """
+        return self._port_executions(data_id, 0)
+
+    def producers(self, data_id):
+        """Find all executions that produced a given data.
+
+        Args:
+            data_id (str): id of data
+
+        Returns:
+            (iter of dict): executions, same format as :meth:`executions`
+                            with an additional 'port' key
+        """
+        return self._port_executions(data_id, 1)
+
+    def records_using(self, data_id):
+        """Find all records in which a given data was consumed.
+
+        Args:
+            data_id (str): id of data
+
+        Returns:
+            (iter of str): ids of provenance records
+        """
+        query = ("SELECT DISTINCT records.id FROM ports "
+                 "JOIN executions ON ports.eid = executions.eid "
+                 "JOIN records ON executions.rid = records.rid "
+                 "WHERE ports.data = ? AND ports.output = 0 "
+                 "ORDER BY records.rid")
+        for row in self._con.execute(query, (data_id,)):
+            yield row[0]
@@ -1,5 +1,8 @@
 """Workflow execution provenance helper functions.
 """
+from bisect import bisect_left
+from collections import deque
+
 from . import tools
 
 
@@ -15,77 +18,421 @@ def validate(prov_descr):
     return tools.validate(prov_descr, "prov_exe")
 
 
-def data_produced_by(prov_descr, node_index, port_name):
+class ProvenanceIndex(object):
+    """Lookup tables built once from a provenance description.
+
+    Allow to answer queries on data produced or used by nodes in
+    constant time instead of scanning the whole description.
+    """
+
+    def __init__(self, prov_descr=None, values=None):
+        """Constructor.
+
+        Args:
+            prov_descr (dict): a valid provenance definition, if None
+                               create an empty index
+            values (ValueStore): store used to fetch values of data
+                                 records which only hold a 'ref'
+        """
+        self.values = values
+        self.executions = []
+        self.node_executions = {}  # node index -> list of exe indices
+        self.exe_inputs = []  # exe index -> {port name: data id}
+        self.exe_outputs = []  # exe index -> {port name: data id}
+        self.data = {}  # data id -> data descr
+        self.producers = {}  # data id -> list of exe indices
+        self.consumers = {}  # data id -> list of exe indices
+        self._timelines = {}  # node index -> (start times, exe indices)
+
+        if prov_descr is not None:
+            for data_descr in prov_descr["data"]:
+                self.add_data(data_descr)
+
+            for exe in prov_descr["executions"]:
+                self.add_execution(exe)
+
+    def add_data(self, data_descr):
+        """Register a data descriptor.
+
+        Args:
+            data_descr (dict): a data descriptor
+
+        Returns:
+            None
+        """
+        self.data[data_descr['id']] = data_descr
+
+    def add_execution(self, exe):
+        """Register an execution.
+
+        Args:
+            exe (dict): an execution descriptor
+
+        Returns:
+            (int): index of execution
+        """
+        exe_ind = len(self.executions)
+        self.executions.append(exe)
+        self.node_executions.setdefault(exe["node"], []).append(exe_ind)
+        self._timelines.pop(exe["node"], None)
+
+        for ports, descrs, users in ((self.exe_inputs, exe["inputs"],
+                                      self.consumers),
+                                     (self.exe_outputs, exe["outputs"],
+                                      self.producers)):
+            ports.append({})
+            for port in descrs:
+                ports[-1].setdefault(port["port"], port["data"])
+                exes = users.setdefault(port["data"], [])
+                if len(exes) == 0 or exes[-1] != exe_ind:
+                    exes.append(exe_ind)
+
+        return exe_ind
+
+    def execution(self, node_index):
+        """Find the single execution of a node.
+
+        Raises: UserWarning if the process has been executed more
+                then once.
+
+        Args:
+            node_index (int): index of node in workflow
+
+        Returns:
+            (int): index of execution
+        """
+        node_executions = self.node_executions.get(node_index, [])
+        if len(node_executions) == 0:
+            raise IndexError("node %d has never been evaluated" % node_index)
+
+        if len(node_executions) > 1:
+            msg = "node %d has been executed more than once" % node_index
+            raise UserWarning(msg)
+
+        exe_ind, = node_executions
+        return exe_ind
+
+    def _timeline(self, node_index):
+        """Executions of a node sorted by start time.
+
+        Computed on first request and kept until a new execution
+        of the node is registered.
+        """
+        try:
+            return self._timelines[node_index]
+        except KeyError:
+            exe_inds = sorted(self.node_executions.get(node_index, []),
+                              key=lambda i: (self.executions[i]["time_init"],
+                                             i))
+            times = [self.executions[i]["time_init"] for i in exe_inds]
+            self._timelines[node_index] = times, exe_inds
+            return times, exe_inds
+
+    def select_executions(self, node_index, iteration=None, latest=False,
+                          start=None, end=None):
+        """Find executions of a node.
+
+        See Also: :func:`select_executions`
+        """
+        if iteration is not None:
+            exe_inds = self.node_executions.get(node_index, [])
+            try:
+                return [exe_inds[iteration]]
+            except IndexError:
+                return []
+
+        times, exe_inds = self._timeline(node_index)
+        first = 0 if start is None else bisect_left(times, start)
+        last = len(times) if end is None else bisect_left(times, end)
+        exe_inds = exe_inds[first:last]
+        if latest:
+            return exe_inds[-1:]
+
+        return exe_inds
+
+    def data_value(self, did):
+        """Retrieve actual value of a data.
+
+        Values stored externally are fetched from the value store
+        only when requested.
+
+        Args:
+            did (str): id of data
+
+        Returns:
+            (any): value of data
+        """
+        try:
+            data_descr = self.data[did]
+        except KeyError:
+            raise UserWarning("Provenance file is not valid")
+
+        if "value" in data_descr:
+            return data_descr["value"]
+
+        if self.values is None:
+            msg = "data %s is stored externally, no value store" % did
+            raise UserWarning(msg)
+
+        return self.values.get(data_descr["ref"])
+
+    def _traverse(self, did, from_data, ports):
+        exe_inds = []
+        dids = []
+        visited_exe = set()
+        visited_data = set([did])
+        front = deque([did])
+        while len(front) > 0:
+            for exe_ind in from_data.get(front.popleft(), ()):
+                if exe_ind not in visited_exe:
+                    visited_exe.add(exe_ind)
+                    exe_inds.append(exe_ind)
+                    for port in self.executions[exe_ind][ports]:
+                        next_did = port["data"]
+                        if next_did not in visited_data:
+                            visited_data.add(next_did)
+                            dids.append(next_did)
+                            front.append(next_did)
+
+        return exe_inds, dids
+
+    def upstream(self, did):
+        """Find all executions and data a data derives from.
+
+        See Also: :func:`upstream`
+        """
+        return self._traverse(did, self.producers, "inputs")
+
+    def downstream(self, did):
+        """Find all executions and data derived from a data.
+
+        See Also: :func:`downstream`
+        """
+        return self._traverse(did, self.consumers, "outputs")
+
+    def data_produced_by(self, node_index, port_name):
+        """Retrieve data produced by a given process.
+
+        See Also: :func:`data_produced_by`
+        """
+        ports = self.exe_outputs[self.execution(node_index)]
+        try:
+            did = ports[port_name]
+        except KeyError:
+            raise KeyError("port %s is not defined" % port_name)
+
+        return did, self.data_value(did)
+
+    def data_used_by(self, node_index, port_name):
+        """Retrieve data used by a given process.
+
+        See Also: :func:`data_used_by`
+        """
+        ports = self.exe_inputs[self.execution(node_index)]
+        try:
+            did = ports[port_name]
+        except KeyError:
+            raise KeyError("port %s is not defined" % port_name)
+
+        return did, self.data_value(did)
+
+    def _port_data(self, exe_ports, exe_inds, port_name):
+        res = []
+        for exe_ind in exe_inds:
+            try:
+                did = exe_ports[exe_ind][port_name]
+            except KeyError:
+                raise KeyError("port %s is not defined" % port_name)
+
+            res.append((exe_ind, did, self.data_value(did)))
+
+        return res
+
+    def all_data_produced_by(self, node_index, port_name, **kwds):
+        """Retrieve data produced by all executions of a process.
+
+        See Also: :func:`all_data_produced_by`
+        """
+        exe_inds = self.select_executions(node_index, **kwds)
+        return self._port_data(self.exe_outputs, exe_inds, port_name)
+
+    def all_data_used_by(self, node_index, port_name, **kwds):
+        """Retrieve data used by all executions of a process.
+
+        See Also: :func:`all_data_used_by`
+        """
+        exe_inds = self.select_executions(node_index, **kwds)
+        return self._port_data(self.exe_inputs, exe_inds, port_name)
+
+
+def _index(prov_descr, values=None):
+    """Index provenance description if needed.
+
+    Args:
+        prov_descr (dict|ProvenanceIndex): provenance
+        values (ValueStore): store of externalized data values
+
+    Returns:
+        (ProvenanceIndex)
+    """
+    if isinstance(prov_descr, ProvenanceIndex):
+        return prov_descr
+
+    return ProvenanceIndex(prov_descr, values)
+
+
+def data_produced_by(prov_descr, node_index, port_name, values=None):
     """Retrieve data produced by a given process.
 
     Raises: UserWarning if the process has been executed more
             then once.
 
     Args:
-        prov_descr (dict): a valid provenance definition
+        prov_descr (dict|ProvenanceIndex): a valid provenance definition
+                   or an index built on it to answer in constant time
         node_index (int): index of node in workflow
         port_name (str): name of output port to look for data
+        values (ValueStore): store of externalized data values, only
+                             used if prov_descr is not already an index
 
     Returns:
         (str, any): tuple data id, actual value of the data
     """
-    node_executions = [i for i, exe in enumerate(prov_descr["executions"])
-                       if exe["node"] == node_index]
-    if len(node_executions) == 0:
-        raise IndexError("node %d has never been evaluated" % node_index)
+    return _index(prov_descr, values).data_produced_by(node_index, port_name)
 
-    if len(node_executions) > 1:
-        msg = "node %d has been executed more than once" % node_index
-        raise UserWarning(msg)
 
-    exe_ind, = node_executions
-    outputs = prov_descr["executions"][exe_ind]["outputs"]
+def data_used_by(prov_descr, node_index, port_name, values=None):
+    """Retrieve data used by a given process.
 
-    for output in outputs:
-        if output["port"] == port_name:
-            did = output["data"]
-            for data_descr in prov_descr["data"]:
-                if data_descr['id'] == did:
-                    return did, data_descr["value"]
+    Raises: UserWarning if the process has been executed more
+            then once.
 
-            raise UserWarning("Provenance file is not valid")
+    Args:
+        prov_descr (dict|ProvenanceIndex): a valid provenance definition
+                   or an index built on it to answer in constant time
+        node_index (int): index of node in workflow
+        port_name (str): name of input port to look for data
+        values (ValueStore): store of externalized data values, only
+                             used if prov_descr is not already an index
 
-    raise KeyError("port %s is not defined" % port_name)
+    Returns:
+        (str, any): tuple data id, actual value of the data
+    """
+    return _index(prov_descr, values).data_used_by(node_index, port_name)
 
 
-def data_used_by(prov_descr, node_index, port_name):
-    """Retrieve data used by a given process.
+def select_executions(prov_descr, node_index, iteration=None, latest=False,
+                      start=None, end=None):
+    """Find executions of a node.
 
-    Raises: UserWarning if the process has been executed more
-            then once.
+    Executions are selected either by iteration, i.e. rank of execution
+    in record, or by start time. Executions selected by time are sorted
+    by start time.
+
+    Args:
+        prov_descr (dict|ProvenanceIndex): a valid provenance definition
+                   or an index built on it to answer without rescans
+        node_index (int): index of node in workflow
+        iteration (int): rank of execution among executions of this node,
+                         negative values count from the end
+        latest (bool): whether to keep only the last started execution
+        start (float): keep only executions started at or after start
+        end (float): keep only executions started strictly before end
+
+    Returns:
+        (list of int): indices of executions, empty if none match
+    """
+    return _index(prov_descr).select_executions(node_index, iteration,
+                                                latest, start, end)
+
+
+def all_data_produced_by(prov_descr, node_index, port_name, iteration=None,
+                         latest=False, start=None, end=None, values=None):
+    """Retrieve data produced by each execution of a given process.
+
+    Contrary to :func:`data_produced_by`, processes executed
+    more than once are supported.
+
+    Args:
+        prov_descr (dict|ProvenanceIndex): a valid provenance definition
+                   or an index built on it to answer without rescans
+        node_index (int): index of node in workflow
+        port_name (str): name of output port to look for data
+        iteration (int): see :func:`select_executions`
+        latest (bool): see :func:`select_executions`
+        start (float): see :func:`select_executions`
+        end (float): see :func:`select_executions`
+        values (ValueStore): store of externalized data values, only
+                             used if prov_descr is not already an index
+
+    Returns:
+        (list of (int, str, any)): index of execution, data id,
+                                   actual value of the data
+    """
+    return _index(prov_descr, values).all_data_produced_by(
+        node_index, port_name, iteration=iteration, latest=latest,
+        start=start, end=end)
+
+
+def all_data_used_by(prov_descr, node_index, port_name, iteration=None,
+                     latest=False, start=None, end=None, values=None):
+    """Retrieve data used by each execution of a given process.
+
+    Contrary to :func:`data_used_by`, processes executed
+    more than once are supported.
 
     Args:
-        prov_descr (dict): a valid provenance definition
+        prov_descr (dict|ProvenanceIndex): a valid provenance definition
+                   or an index built on it to answer without rescans
         node_index (int): index of node in workflow
         port_name (str): name of input port to look for data
+        iteration (int): see :func:`select_executions`
+        latest (bool): see :func:`select_executions`
+        start (float): see :func:`select_executions`
+        end (float): see :func:`select_executions`
+        values (ValueStore): store of externalized data values, only
+                             used if prov_descr is not already an index
 
     Returns:
-        (str, any): tuple data id, actual value of the data
+        (list of (int, str, any)): index of execution, data id,
+                                   actual value of the data
     """
-    node_executions = [i for i, exe in enumerate(prov_descr["executions"])
-                       if exe["node"] == node_index]
-    if len(node_executions) == 0:
-        raise IndexError("node %d has never been evaluated" % node_index)
+    return _index(prov_descr, values).all_data_used_by(
+        node_index, port_name, iteration=iteration, latest=latest,
+        start=start, end=end)
 
-    if len(node_executions) > 1:
-        msg = "node %d has been executed more than once" % node_index
-        raise UserWarning(msg)
 
-    exe_ind, = node_executions
-    inputs = prov_descr["executions"][exe_ind]["inputs"]
+def upstream(prov_descr, data_id):
+    """Find the whole chain of executions which produced a data.
 
-    for input in inputs:
-        if input["port"] == port_name:
-            did = input["data"]
-            for data_descr in prov_descr["data"]:
-                if data_descr['id'] == did:
-                    return did, data_descr["value"]
+    Traversal is done breadth first, hence executions and data
+    closest to data_id come first.
 
-            raise UserWarning("Provenance file is not valid")
+    Args:
+        prov_descr (dict|ProvenanceIndex): a valid provenance definition
+                   or an index built on it
+        data_id (str): id of data
+
+    Returns:
+        (list of int, list of str): indices of executions involved in
+                    the production of data, ids of data they used
+    """
+    return _index(prov_descr).upstream(data_id)
 
-    raise KeyError("port %s is not defined" % port_name)
+
+def downstream(prov_descr, data_id):
+    """Find all executions and data derived from a data.
+
+    Traversal is done breadth first, hence executions and data
+    closest to data_id come first.
+
+    Args:
+        prov_descr (dict|ProvenanceIndex): a valid provenance definition
+                   or an index built on it
+        data_id (str): id of data
+
+    Returns:
+        (list of int, list of str): indices of executions which used data
+                    directly or indirectly, ids of data they produced
+    """
+    return _index(prov_descr).downstream(data_id)
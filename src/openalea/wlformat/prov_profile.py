@@ -0,0 +1,281 @@
+"""Timing profile of workflow executions.
+
+Use time_init and time_end of each execution stored in a provenance record
+to find where time is spent when running a workflow.
+"""
+
+from .convert.graphviz import export_workflow
+from .workflow import Workflow
+
+
+def node_durations(prov_descr):
+    """Compute statistics on execution times of each node.
+
+    Executions without timing information are ignored.
+
+    Args:
+        prov_descr (dict): a valid provenance definition
+
+    Returns:
+        (dict of int, dict): node index -> dict with keys count, total,
+                             mean and max duration of its executions
+    """
+    stats = {}
+    for exe in prov_descr['executions']:
+        if 'time_init' not in exe or 'time_end' not in exe:
+            continue
+
+        dt = exe['time_end'] - exe['time_init']
+        try:
+            stat = stats[exe['node']]
+        except KeyError:
+            stat = stats[exe['node']] = dict(count=0, total=0., max=dt)
+
+        stat['count'] += 1
+        stat['total'] += dt
+        stat['max'] = max(stat['max'], dt)
+
+    for stat in stats.values():
+        stat['mean'] = stat['total'] / stat['count']
+
+    return stats
+
+
+def busy_time(prov_descr):
+    """Compute time during which at least one execution was running.
+
+    Args:
+        prov_descr (dict): a valid provenance definition
+
+    Returns:
+        (float)
+    """
+    intervals = sorted((exe['time_init'], exe['time_end'])
+                       for exe in prov_descr['executions']
+                       if 'time_init' in exe and 'time_end' in exe)
+    busy = 0.
+    cur_start = cur_end = None
+    for start, end in intervals:
+        if cur_end is None or start > cur_end:
+            if cur_end is not None:
+                busy += cur_end - cur_start
+            cur_start, cur_end = start, end
+        else:
+            cur_end = max(cur_end, end)
+
+    if cur_end is not None:
+        busy += cur_end - cur_start
+
+    return busy
+
+
+def wall_time(prov_descr):
+    """Compute total duration of a workflow execution.
+
+    Use time_init and time_end of the record if defined, the first start
+    and last end of executions otherwise.
+
+    Args:
+        prov_descr (dict): a valid provenance definition
+
+    Returns:
+        (float)
+    """
+    exes = [exe for exe in prov_descr['executions']
+            if 'time_init' in exe and 'time_end' in exe]
+    start = prov_descr.get('time_init', None)
+    if start is None:
+        start = min([exe['time_init'] for exe in exes] or [0.])
+
+    end = prov_descr.get('time_end', None)
+    if end is None:
+        end = max([exe['time_end'] for exe in exes] or [start])
+
+    return end - start
+
+
+def critical_path(workflow_descr, durations):
+    """Find the longest chain of dependent nodes in a workflow.
+
+    Raises: UserWarning if the workflow contains a cycle
+
+    Args:
+        workflow_descr (dict): workflow definition
+        durations (dict of int, float): time spent in each node, nodes not
+                                        in dict are assumed instantaneous
+
+    Returns:
+        (list of int, float): indices of nodes along the path, total time
+                              spent on the path
+    """
+    graph = Workflow.from_dict(workflow_descr)
+    if graph.nb_nodes() == 0:
+        return [], 0.
+
+    finish = [0.] * graph.nb_nodes()
+    best_pred = [None] * graph.nb_nodes()
+    for ind in graph.topological_order():
+        start = 0.
+        for pred in graph.predecessors(ind):
+            if best_pred[ind] is None or finish[pred] > start:
+                start = finish[pred]
+                best_pred[ind] = pred
+
+        finish[ind] = start + durations.get(ind, 0.)
+
+    last = max(range(graph.nb_nodes()), key=lambda i: finish[i])
+    path = [last]
+    while best_pred[path[-1]] is not None:
+        path.append(best_pred[path[-1]])
+
+    path.reverse()
+    return path, finish[last]
+
+
+def profile(prov_descr, workflow_descr=None):
+    """Construct a timing report for a workflow execution.
+
+    Args:
+        prov_descr (dict): a valid provenance definition
+        workflow_descr (dict): definition of workflow executed, if None
+                               the critical path is not computed
+
+    Returns:
+        (dict): report with keys:
+                 - nodes: result of :func:`node_durations`
+                 - work: sum of time spent in all executions
+                 - wall_time: total duration of execution
+                 - idle_time: time during which nothing was running
+                 - parallelism: average number of executions running
+                 - critical_path: list of nodes or None
+                 - critical_time: time spent on critical path or None
+    """
+    nodes = node_durations(prov_descr)
+    work = sum(stat['total'] for stat in nodes.values())
+    wall = wall_time(prov_descr)
+
+    report = dict(nodes=nodes,
+                  work=work,
+                  wall_time=wall,
+                  idle_time=max(0., wall - busy_time(prov_descr)),
+                  parallelism=work / wall if wall > 0 else 0.,
+                  critical_path=None,
+                  critical_time=None)
+
+    if workflow_descr is not None:
+        durations = dict((node, stat['total'])
+                         for node, stat in nodes.items())
+        path, tot = critical_path(workflow_descr, durations)
+        report['critical_path'] = path
+        report['critical_time'] = tot
+
+    return report
+
+
+def _node_label(workflow_descr, store, ind):
+    if workflow_descr is not None and ind < len(workflow_descr['nodes']):
+        node = workflow_descr['nodes'][ind]
+        label = node.get('label', None)
+        if label is not None:
+            return label
+
+        ndef = (store or {}).get(node['id'], None)
+        if ndef is not None:
+            return ndef['name']
+
+    return "node%d" % ind
+
+
+def format_table(report, workflow_descr=None, store=None):
+    """Format a timing report as a text table.
+
+    Nodes are sorted by decreasing total time. Nodes on the critical
+    path are flagged with a '*'.
+
+    Args:
+        report (dict): result of :func:`profile`
+        workflow_descr (dict): workflow definition used to label nodes
+        store (dict of uid, def): elements definitions
+
+    Returns:
+        (str)
+    """
+    crit = set(report['critical_path'] or [])
+    rows = [("", "node", "count", "total", "mean", "max", "%work")]
+    nodes = sorted(report['nodes'].items(),
+                   key=lambda item: (-item[1]['total'], item[0]))
+    for ind, stat in nodes:
+        if report['work'] > 0:
+            ratio = 100. * stat['total'] / report['work']
+        else:
+            ratio = 0.
+        rows.append(("*" if ind in crit else "",
+                     "%d %s" % (ind, _node_label(workflow_descr, store, ind)),
+                     "%d" % stat['count'],
+                     "%.3f" % stat['total'],
+                     "%.3f" % stat['mean'],
+                     "%.3f" % stat['max'],
+                     "%.1f" % ratio))
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    lines = []
+    for row in rows:
+        cells = [row[0].ljust(widths[0]), row[1].ljust(widths[1])]
+        cells.extend(cell.rjust(w) for cell, w in zip(row[2:], widths[2:]))
+        lines.append(" ".join(cells).rstrip())
+
+    lines.append("")
+    lines.append("wall time: %.3f" % report['wall_time'])
+    lines.append("idle time: %.3f" % report['idle_time'])
+    lines.append("parallelism: %.2f" % report['parallelism'])
+    if report['critical_time'] is not None:
+        lines.append("critical path: %.3f" % report['critical_time'])
+
+    return "\n".join(lines) + "\n"
+
+
+def time_color(val, vmax):
+    """Color encoding a duration, from white (0) to red (vmax).
+
+    Args:
+        val (float): duration
+        vmax (float): max duration
+
+    Returns:
+        (str): color as '#rrggbb'
+    """
+    if vmax <= 0:
+        return "#ffffff"
+
+    comp = int(round(255 * (1. - min(1., max(0., val / vmax)))))
+    return "#ff%02x%02x" % (comp, comp)
+
+
+def export_profile(workflow_descr, store, report):
+    """Construct a graphviz description of a workflow colored by time.
+
+    Fill color of each node encodes the total time spent in it, nodes
+    on the critical path get a thick border.
+
+    Args:
+        workflow_descr (dict): workflow definition
+        store (dict of uid, def): elements definitions
+        report (dict): result of :func:`profile`
+
+    Returns:
+        (str): dot text
+    """
+    vmax = max([stat['total'] for stat in report['nodes'].values()] or [0.])
+    crit = set(report['critical_path'] or [])
+    node_attrs = {}
+    for ind in range(len(workflow_descr['nodes'])):
+        stat = report['nodes'].get(ind, None)
+        total = 0. if stat is None else stat['total']
+        attrs = ['style="filled"',
+                 'fillcolor="%s"' % time_color(total, vmax),
+                 'tooltip="%.3f s"' % total]
+        if ind in crit:
+            attrs.append('penwidth="3"')
+        node_attrs[ind] = attrs
+
+    return export_workflow(workflow_descr, store, node_attrs)
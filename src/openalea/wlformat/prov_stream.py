@@ -0,0 +1,366 @@
+"""Streaming reader for workflow execution provenance files.
+
+Provenance files embed the actual value of each data and can grow too big
+to be loaded at once with json. The reader defined here walks the file
+lazily, decoding only the elements requested, and records the position of
+data values in the file so they can be fetched later on demand.
+"""
+
+import json
+import mmap
+import re
+
+from .prov_exe import ProvenanceIndex
+
+_ws = re.compile(br'[ \t\n\r]*')
+_string = re.compile(br'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_container = re.compile(br'["\[\]{}]')
+_scalar_end = re.compile(br'[,\]} \t\n\r]')
+
+_containers = ("data", "parameters", "executions")
+
+
+def load_value(filename, offset, length):
+    """Load a single json value stored in a file.
+
+    Args:
+        filename (str): path to file
+        offset (int): position of first byte of value in file
+        length (int): number of bytes used to store value
+
+    Returns:
+        (any): decoded value
+    """
+    with open(filename, 'rb') as f:
+        f.seek(offset)
+        return json.loads(f.read(length).decode('utf-8'))
+
+
+class ProvenanceReader(object):
+    """Event based parser for provenance files.
+
+    Each iteration walks the file from the start, decoding only the
+    elements it yields, hence memory usage stays bounded whatever the
+    size of the file.
+    """
+
+    def __init__(self, filename):
+        """Constructor.
+
+        Args:
+            filename (str): path to provenance file, an empty file
+                            is read as a provenance without any element
+        """
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        try:
+            self._buf = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except ValueError:  # empty files can not be mapped
+            self._buf = b""
+
+    def close(self):
+        """Release file resources."""
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _skip_ws(self, pos):
+        return _ws.match(self._buf, pos).end()
+
+    def _expect(self, pos, char):
+        pos = self._skip_ws(pos)
+        if self._buf[pos:pos + 1] != char:
+            msg = "expected '%s' at position %d" % (char.decode('ascii'), pos)
+            raise ValueError(msg)
+
+        return pos + 1
+
+    def _skip_string(self, pos):
+        match = _string.match(self._buf, pos)
+        if match is None:
+            raise ValueError("unterminated string at position %d" % pos)
+
+        return match.end()
+
+    def _skip_value(self, pos):
+        """Find end of json value starting at pos.
+
+        Args:
+            pos (int): position of first char of value
+
+        Returns:
+            (int): position just after last char of value
+        """
+        buf = self._buf
+        char = buf[pos:pos + 1]
+        if char == b'"':
+            return self._skip_string(pos)
+
+        if char not in (b'{', b'['):
+            match = _scalar_end.search(buf, pos)
+            if match is None:
+                return len(buf)
+            return match.start()
+
+        depth = 0
+        while True:
+            match = _container.search(buf, pos)
+            if match is None:
+                raise ValueError("unterminated container")
+
+            char = match.group()
+            if char == b'"':
+                pos = self._skip_string(match.start())
+            else:
+                pos = match.end()
+                if char in (b'{', b'['):
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return pos
+
+    def _decode(self, start, end):
+        return json.loads(self._buf[start:end].decode('utf-8'))
+
+    def _first(self, pos, opening, closing):
+        """Enter a json array or object.
+
+        Args:
+            pos (int): position of opening char
+            opening (bytes): either '[' or '{'
+            closing (bytes): either ']' or '}'
+
+        Returns:
+            (int|None): position of first element, None if empty
+        """
+        pos = self._skip_ws(self._expect(pos, opening))
+        if self._buf[pos:pos + 1] == closing:
+            return None
+
+        return pos
+
+    def _next(self, end, closing):
+        """Move to the next element of a json array or object.
+
+        Args:
+            end (int): position just after previous element
+            closing (bytes): either ']' or '}'
+
+        Returns:
+            (int|None): position of next element, None if no more elements
+        """
+        pos = self._skip_ws(end)
+        char = self._buf[pos:pos + 1]
+        if char == closing:
+            return None
+
+        if char != b',':
+            raise ValueError("expected ',' at position %d" % pos)
+
+        return self._skip_ws(pos + 1)
+
+    def _member(self, pos):
+        """Decode key of a json object member.
+
+        Args:
+            pos (int): position of member
+
+        Returns:
+            (str, int): key, position of value
+        """
+        end = self._skip_value(pos)
+        key = self._decode(pos, end)
+        return key, self._skip_ws(self._expect(end, b':'))
+
+    def _find_member(self, name):
+        """Find position of a top level member.
+
+        Args:
+            name (str): key of member
+
+        Returns:
+            (int|None): position of value, None if member does not exist
+        """
+        if len(self._buf) == 0:
+            return None
+
+        pos = self._first(self._skip_ws(0), b'{', b'}')
+        while pos is not None:
+            key, vpos = self._member(pos)
+            if key == name:
+                return vpos
+
+            pos = self._next(self._skip_value(vpos), b'}')
+
+        return None
+
+    def _iter_elements(self, name):
+        """Iterate on the decoded elements of a top level array.
+
+        Args:
+            name (str): key of array
+
+        Returns:
+            (iter of any)
+        """
+        pos = self._find_member(name)
+        if pos is not None:
+            pos = self._first(pos, b'[', b']')
+
+        while pos is not None:
+            end = self._skip_value(pos)
+            yield self._decode(pos, end)
+            pos = self._next(end, b']')
+
+    def header(self):
+        """Decode top level attributes of provenance.
+
+        Large containers (data, parameters, executions) are skipped.
+
+        Returns:
+            (dict): attribute name, value
+        """
+        attrs = {}
+        if len(self._buf) == 0:
+            return attrs
+
+        pos = self._first(self._skip_ws(0), b'{', b'}')
+        while pos is not None:
+            key, vpos = self._member(pos)
+            end = self._skip_value(vpos)
+            if key not in _containers:
+                attrs[key] = self._decode(vpos, end)
+
+            pos = self._next(end, b'}')
+
+        return attrs
+
+    def iter_executions(self):
+        """Iterate on all executions in provenance.
+
+        Returns:
+            (iter of dict): execution descriptions
+        """
+        return self._iter_elements("executions")
+
+    def iter_parameters(self):
+        """Iterate on all parameters in provenance.
+
+        Returns:
+            (iter of dict): parameter descriptions
+        """
+        return self._iter_elements("parameters")
+
+    def iter_data(self):
+        """Iterate on all data in provenance without decoding their value.
+
+        Returns:
+            (iter of (dict, (int, int))): data description without its
+                      value, (offset, length) of value in file
+        """
+        pos = self._find_member("data")
+        if pos is not None:
+            pos = self._first(pos, b'[', b']')
+
+        while pos is not None:
+            data_descr = {}
+            span = None
+            mpos = self._first(pos, b'{', b'}')
+            end = pos + 1
+            while mpos is not None:
+                key, vpos = self._member(mpos)
+                end = self._skip_value(vpos)
+                if key == "value":
+                    span = (vpos, end - vpos)
+                else:
+                    data_descr[key] = self._decode(vpos, end)
+
+                mpos = self._next(end, b'}')
+
+            yield data_descr, span
+            pos = self._next(self._expect(end, b'}'), b']')
+
+    def load_value(self, offset, length):
+        """Decode a single value stored in file.
+
+        Args:
+            offset (int): position of first byte of value in file
+            length (int): number of bytes used to store value
+
+        Returns:
+            (any): decoded value
+        """
+        return self._decode(offset, offset + length)
+
+    def build_index(self, values=None):
+        """Construct an index on this provenance file.
+
+        Data values are not loaded in memory but fetched on demand.
+
+        Args:
+            values (ValueStore): store of externalized data values
+
+        Returns:
+            (ProvenanceFileIndex)
+        """
+        index = ProvenanceFileIndex(self, values)
+        for data_descr, span in self.iter_data():
+            index.add_data(data_descr, span)
+
+        for exe in self.iter_executions():
+            index.add_execution(exe)
+
+        return index
+
+
+class ProvenanceFileIndex(ProvenanceIndex):
+    """Provenance index whose data values stay in the file."""
+
+    def __init__(self, reader, values=None):
+        """Constructor.
+
+        Args:
+            reader (ProvenanceReader): opened provenance file
+            values (ValueStore): store of externalized data values
+        """
+        ProvenanceIndex.__init__(self, values=values)
+        self.reader = reader
+        self.spans = {}  # data id -> (offset, length) of value
+
+    def add_data(self, data_descr, span=None):
+        """Register a data descriptor.
+
+        Args:
+            data_descr (dict): a data descriptor, possibly without value
+            span (int, int): offset, length of value in file
+
+        Returns:
+            None
+        """
+        ProvenanceIndex.add_data(self, data_descr)
+        if span is not None:
+            self.spans[data_descr['id']] = span
+
+    def data_value(self, did):
+        """Retrieve actual value of a data from file.
+
+        Args:
+            did (str): id of data
+
+        Returns:
+            (any): value of data
+        """
+        try:
+            span = self.spans[did]
+        except KeyError:
+            return ProvenanceIndex.data_value(self, did)
+
+        return self.reader.load_value(*span)
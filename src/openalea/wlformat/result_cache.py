@@ -0,0 +1,262 @@
+"""Cache of node results used to avoid recomputations.
+
+Results are indexed by a hash of the function of a node and of the content
+of its inputs. When a workflow is executed again with some parameters
+changed, only the nodes downstream of these parameters see new inputs,
+all the others are answered by the cache.
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+
+from .prov_exe import ProvenanceIndex
+
+try:
+    import cPickle as pickle
+except ImportError:  # python 3
+    import pickle
+
+_scalars = (type(None), bool, int, float, str, type(u""))
+try:
+    _scalars += (long, )  # noqa: F821
+except NameError:  # python 3
+    pass
+
+_text_types = ("str", "unicode")
+
+
+def _canonical(value):
+    """Json serializable description of a value that keeps its type.
+
+    Unlike plain json, (1, 2) and [1, 2] or {1: 2} and {"1": 2} are
+    described differently. Descriptions of dict and set do not depend
+    on the order of their items.
+
+    Raises: TypeError if value contains unsupported types
+
+    Args:
+        value (any): None, bool, number, str or containers of them
+
+    Returns:
+        (list): type name, description of content
+    """
+    name = type(value).__name__
+    if isinstance(value, _scalars):
+        return [name, value]
+
+    if isinstance(value, (list, tuple)):
+        return [name, [_canonical(item) for item in value]]
+
+    if isinstance(value, (set, frozenset)):
+        items = [_canonical(item) for item in value]
+        return [name, sorted(items, key=json.dumps)]
+
+    if isinstance(value, dict):
+        items = [(_canonical(k), _canonical(v)) for k, v in value.items()]
+        return [name, sorted(items, key=lambda item: json.dumps(item[0]))]
+
+    raise TypeError("unsupported type '%s'" % name)
+
+
+def _json_exact(value, typ):
+    """Check that a value read from json is the one recorded.
+
+    Json has no tuples and only string keys, hence a list could have been
+    a tuple and a dict could have had int keys, even nested. Only scalars
+    and lists of scalars whose recorded type is list are unambiguous.
+
+    Args:
+        value (any): value as found in provenance
+        typ (str): type name recorded in provenance for this value
+
+    Returns:
+        (bool)
+    """
+    name = type(value).__name__
+    if name != typ and not (name in _text_types and typ in _text_types):
+        return False
+
+    if isinstance(value, list):
+        return all(isinstance(item, _scalars) for item in value)
+
+    return isinstance(value, _scalars)
+
+
+def execution_key(uri, inputs):
+    """Compute the key identifying a node evaluation.
+
+    Args:
+        uri (str): function of node
+        inputs (list of any): values of inputs in port order
+
+    Returns:
+        (str|None): hexadecimal digest, None if some inputs can not
+                    be described, see :func:`_canonical`
+    """
+    try:
+        txt = json.dumps([uri, [_canonical(value) for value in inputs]])
+    except (TypeError, ValueError):
+        return None
+
+    return hashlib.sha1(txt.encode('utf-8')).hexdigest()
+
+
+class ResultCache(object):
+    """Results of node evaluations kept in memory.
+
+    Results are stored pickled, which allows to bound the memory they
+    use and returns a fresh copy of the same type on each hit. Least
+    recently used results are evicted when the cache is full.
+    """
+
+    def __init__(self, max_entries=1024, max_size=None):
+        """Constructor.
+
+        Args:
+            max_entries (int): max number of results kept in cache
+            max_size (int): max number of bytes used by pickled results,
+                            None for no limit
+        """
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> pickled result
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """Retrieve result of a node evaluation.
+
+        Args:
+            key (str): see :func:`execution_key`
+
+        Returns:
+            (bool, any): whether result was found, decoded result
+        """
+        try:
+            blob = self._entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return False, None
+
+        self._entries[key] = blob
+        self.hits += 1
+        return True, pickle.loads(blob)
+
+    def set(self, key, result):
+        """Store result of a node evaluation.
+
+        Results that can not be pickled are ignored.
+
+        Args:
+            key (str): see :func:`execution_key`
+            result (any): value returned by function of node
+
+        Returns:
+            (bool): whether result has been stored
+        """
+        try:
+            blob = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return False
+
+        if self.max_size is not None and len(blob) > self.max_size:
+            return False
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+
+        self._entries[key] = blob
+        self.size += len(blob)
+        while (len(self._entries) > self.max_entries or
+               (self.max_size is not None and self.size > self.max_size)):
+            key, blob = self._entries.popitem(last=False)
+            self.size -= len(blob)
+
+        return True
+
+    @staticmethod
+    def _recorded_value(index, did):
+        """Retrieve a value from a provenance record.
+
+        Raises: ValueError if value is missing or its type ambiguous
+
+        Args:
+            index (ProvenanceIndex): provenance record
+            did (str): id of data
+
+        Returns:
+            (any)
+        """
+        try:
+            value = index.data_value(did)
+        except UserWarning as e:  # e.g. external value without store
+            raise ValueError(str(e))
+
+        if not _json_exact(value, index.data[did].get('type')):
+            raise ValueError("ambiguous type for data %s" % did)
+
+        return value
+
+    def add_provenance(self, prov_descr, workflow, store):
+        """Fill cache with results recorded in a provenance record.
+
+        Records may have been read back from json files which lose some
+        types (tuples become lists, dict keys strings). Hence executions
+        are used only if their input and output values are unambiguous
+        (scalars or lists of scalars, see :func:`_json_exact`) so that a
+        hit never returns something else than a live evaluation. Values
+        stored externally are used only if the index has a value store.
+
+        Args:
+            prov_descr (dict|ProvenanceIndex): provenance of an
+                       execution of workflow
+            workflow (dict): workflow definition
+            store (dict of uid, def): elements definitions
+
+        Returns:
+            (int): number of results added
+        """
+        if isinstance(prov_descr, ProvenanceIndex):
+            index = prov_descr
+        else:
+            index = ProvenanceIndex(prov_descr)
+
+        nb = 0
+        for exe_ind, exe in enumerate(index.executions):
+            ndef = store.get(workflow['nodes'][exe['node']]['id'], None)
+            if ndef is None:
+                continue
+
+            ins = index.exe_inputs[exe_ind]
+            outs = index.exe_outputs[exe_ind]
+            try:
+                inputs = [self._recorded_value(index, ins[port['name']])
+                          for port in ndef['inputs']]
+                outputs = [self._recorded_value(index, outs[port['name']])
+                           for port in ndef['outputs']]
+            except KeyError:  # record does not match definition
+                continue
+            except ValueError:  # value can not be trusted
+                continue
+
+            if len(outputs) == 0:
+                result = None
+            elif len(outputs) == 1:
+                result = outputs[0]
+            else:
+                result = outputs
+
+            key = execution_key(ndef['function'], inputs)
+            if key is not None and self.set(key, result):
+                nb += 1
+
+        return nb
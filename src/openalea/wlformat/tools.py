@@ -1,11 +1,101 @@
 """Simple tools reused in different parts."""
 
+from collections import deque
+from itertools import islice
 import json
 from jsonschema import Draft4Validator, RefResolver
+from multiprocessing import Pool
 import os
+import threading
 
 here = os.path.dirname(__file__)
 
+if here.startswith("/"):
+    base_uri = "file:///%s/" % (here[1:])
+else:
+    base_uri = "file:///%s/" % here
+
+# process wide registry of loaded schemas, schema_name -> schema
+_schemas = {}
+
+# validators are not thread safe, their resolver keeps a scope stack
+# modified during validation, hence one registry per thread
+_local = threading.local()
+
+
+def load_schema(schema_name):
+    """Load the json schema associated with a type of object.
+
+    Args:
+        schema_name: (str) name of object
+
+    Returns:
+        (dict) - json schema
+    """
+    with open(os.path.join(here, "schema_%s.json" % schema_name), 'r') as fs:
+        return json.load(fs)
+
+
+def _get_schema(schema_name):
+    """Retrieve a schema from the registry, loading it if needed.
+
+    Args:
+        schema_name: (str) name of object
+
+    Returns:
+        (dict) - json schema
+    """
+    try:
+        return _schemas[schema_name]
+    except KeyError:
+        return _schemas.setdefault(schema_name, load_schema(schema_name))
+
+
+def get_validator(schema_name):
+    """Retrieve the validator associated with a type of object.
+
+    Schemas are loaded only once and validators compiled only once per
+    thread. Their resolver store is pre-seeded with the base schema so
+    no file access occurs once the validator has been created.
+
+    Args:
+        schema_name: (str) name of object
+
+    Returns:
+        (Draft4Validator)
+    """
+    schema = _get_schema(schema_name)
+    try:
+        validators = _local.validators
+    except AttributeError:
+        validators = _local.validators = {}
+
+    val = validators.get(schema_name)
+    if val is None or val.schema is not schema:  # schema cleared since
+        store = {base_uri + "schema_base.json": _get_schema("base")}
+        refres = RefResolver(base_uri, schema, store=store)
+        val = Draft4Validator(schema, resolver=refres)
+        validators[schema_name] = val
+
+    return val
+
+
+def clear_validators(schema_name=None):
+    """Remove validators from registry.
+
+    They will be compiled again on next access, in all threads.
+
+    Args:
+        schema_name: (str) name of object, if None clear all validators
+
+    Returns:
+        None
+    """
+    if schema_name is None:
+        _schemas.clear()
+    else:
+        _schemas.pop(schema_name, None)
+
 
 def validate(obj_descr, schema_name):
     """Check that the description is a valid data interface description.
@@ -17,13 +107,130 @@ def validate(obj_descr, schema_name):
     Returns:
         (bool) - true if description match node json schema
     """
-    with open(os.path.join(here, "schema_%s.json" % schema_name), 'r') as fs:
-        schema = json.load(fs)
+    return get_validator(schema_name).is_valid(obj_descr)
 
-    if here.startswith("/"):
-        base_uri = "file:///%s/" % (here[1:])
-    else:
-        base_uri = "file:///%s/" % here
-    refres = RefResolver(base_uri, schema)
-    val = Draft4Validator(schema, resolver=refres)
-    return val.is_valid(obj_descr)
+
+def diagnostic(kind, path, message):
+    """Construct a structured diagnostic.
+
+    Args:
+        kind: (str) type of problem
+        path: (list of str|int) location of problem in description
+        message: (str) human readable explanation
+
+    Returns:
+        (dict)
+    """
+    return dict(kind=kind, path=path, message=message)
+
+
+def _diagnostic(err):
+    """Convert a jsonschema error into a structured diagnostic.
+
+    Args:
+        err: (ValidationError)
+
+    Returns:
+        (dict) - see :func:`diagnostic`
+    """
+    return diagnostic(err.validator, list(err.path), err.message)
+
+
+def validate_report(obj_descr, schema_name, max_errors=None,
+                    fail_fast=False):
+    """Explain why a description does not match its schema.
+
+    Errors are produced lazily by the validator, hence capping their
+    number bounds the time spent on hopelessly broken descriptions. If
+    the cap is reached while more errors remain, a last diagnostic of
+    kind 'too_many_errors' is appended.
+
+    Args:
+        obj_descr: (dict)
+        schema_name: (str) name of object
+        max_errors: (int) max number of errors reported, None for all
+        fail_fast: (bool) stop on first error, same as max_errors=1
+
+    Returns:
+        (list of dict) - diagnostics with kind (name of failed schema
+                   keyword), path (location in description) and message,
+                   empty if description is valid
+    """
+    if fail_fast:
+        max_errors = 1
+
+    errors = get_validator(schema_name).iter_errors(obj_descr)
+    if max_errors is None:
+        return [_diagnostic(err) for err in errors]
+
+    diags = [_diagnostic(err) for err in islice(errors, max_errors)]
+    for err in errors:
+        msg = "more than %d errors, remaining ones skipped" % max_errors
+        diags.append(diagnostic("too_many_errors", [], msg))
+        break
+
+    return diags
+
+
+def _validate_batch(args):
+    """Validate a batch of descriptions in a worker process.
+
+    Args:
+        args: (str, list of dict) schema_name, descriptions
+
+    Returns:
+        (list of list of str) - errors associated to each description
+    """
+    schema_name, batch = args
+    val = get_validator(schema_name)
+    return [[err.message for err in val.iter_errors(obj_descr)]
+            for obj_descr in batch]
+
+
+def validate_many(obj_descrs, schema_name, processes=None, batch_size=1000):
+    """Check a stream of descriptions against the same schema.
+
+    The input is consumed lazily and results are yielded in order, one
+    per description.
+
+    Args:
+        obj_descrs: (iterable of dict)
+        schema_name: (str) name of object
+        processes: (int) number of worker processes to use, if None
+                   descriptions are validated in the current process
+        batch_size: (int) number of descriptions sent at once to a worker
+
+    Returns:
+        (iter of (int, bool, list of str)) - index of description in input,
+                    true if description is valid, list of error messages
+    """
+    if processes is None:
+        val = get_validator(schema_name)
+        for i, obj_descr in enumerate(obj_descrs):
+            errors = [err.message for err in val.iter_errors(obj_descr)]
+            yield i, len(errors) == 0, errors
+
+        return
+
+    obj_descrs = iter(obj_descrs)
+    batches = iter(lambda: list(islice(obj_descrs, batch_size)), [])
+    pool = Pool(processes)
+    try:
+        ind = 0
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.apply_async(_validate_batch,
+                                            ((schema_name, batch),)))
+            # bound number of batches in flight
+            while len(pending) > 2 * processes:
+                for errors in pending.popleft().get():
+                    yield ind, len(errors) == 0, errors
+                    ind += 1
+
+        while len(pending) > 0:
+            for errors in pending.popleft().get():
+                yield ind, len(errors) == 0, errors
+                ind += 1
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,254 @@
+"""External stores for the values of provenance data.
+
+Instead of inlining its value, a data record in a provenance description
+can reference a blob in a value store through its 'ref' attribute. Blobs
+are addressed by a hash of their content, hence identical values produced
+by different executions are stored only once.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+
+def _encode(value):
+    txt = json.dumps(value, sort_keys=True, separators=(',', ':'))
+    return txt.encode('utf-8')
+
+
+def value_key(value):
+    """Compute the content key of a value.
+
+    Args:
+        value (any): json serializable value
+
+    Returns:
+        (str): hexadecimal digest
+    """
+    return hashlib.sha1(_encode(value)).hexdigest()
+
+
+class MemoryValueStore(object):
+    """Value store keeping blobs in memory."""
+
+    def __init__(self):
+        self._blobs = {}
+
+    def __len__(self):
+        return len(self._blobs)
+
+    def __contains__(self, key):
+        return key in self._blobs
+
+    def put(self, value):
+        """Store a value.
+
+        Args:
+            value (any): json serializable value
+
+        Returns:
+            (str): key of value
+        """
+        key = value_key(value)
+        if key not in self._blobs:
+            self._blobs[key] = _encode(value)
+
+        return key
+
+    def get(self, key):
+        """Retrieve a value.
+
+        Args:
+            key (str): key of value
+
+        Returns:
+            (any): decoded value
+        """
+        return json.loads(self._blobs[key].decode('utf-8'))
+
+
+class DirectoryValueStore(object):
+    """Value store keeping one file per blob in a directory."""
+
+    def __init__(self, dirname):
+        """Constructor.
+
+        Args:
+            dirname (str): path to directory, created if needed
+        """
+        self.dirname = dirname
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+    def _path(self, key):
+        return os.path.join(self.dirname, key[:2], key[2:])
+
+    def __len__(self):
+        nb = 0
+        for name in os.listdir(self.dirname):
+            fnames = os.listdir(os.path.join(self.dirname, name))
+            # skip leftovers of interrupted puts
+            nb += sum(1 for fname in fnames if not fname.endswith(".tmp"))
+
+        return nb
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def put(self, value):
+        """Store a value.
+
+        Args:
+            value (any): json serializable value
+
+        Returns:
+            (str): key of value
+        """
+        key = value_key(value)
+        pth = self._path(key)
+        if not os.path.exists(pth):
+            if not os.path.exists(os.path.dirname(pth)):
+                os.makedirs(os.path.dirname(pth))
+
+            tmp = pth + ".tmp"
+            with open(tmp, 'wb') as f:
+                f.write(_encode(value))
+            os.rename(tmp, pth)
+
+        return key
+
+    def get(self, key):
+        """Retrieve a value.
+
+        Args:
+            key (str): key of value
+
+        Returns:
+            (any): decoded value
+        """
+        try:
+            with open(self._path(key), 'rb') as f:
+                return json.loads(f.read().decode('utf-8'))
+        except IOError:
+            raise KeyError(key)
+
+
+class PackValueStore(object):
+    """Value store keeping all blobs in a single memory mapped file.
+
+    The pack is append only. Each record is made of the key (40 bytes),
+    the size of the blob (8 bytes) and the blob itself.
+    """
+
+    _header = struct.Struct("<40sQ")
+
+    def __init__(self, filename):
+        """Constructor.
+
+        Args:
+            filename (str): path to pack file, created if needed
+        """
+        self.filename = filename
+        self._file = open(filename, 'a+b')
+        self._buf = None
+        self._spans = {}  # key -> (offset, size)
+
+        # index existing records
+        self._file.seek(0, os.SEEK_END)
+        end = self._file.tell()
+        self._file.seek(0)
+        pos = 0
+        while pos + self._header.size <= end:
+            key, size = self._header.unpack(self._file.read(self._header.size))
+            if pos + self._header.size + size > end:
+                break
+            pos += self._header.size
+            self._spans[key.decode('ascii')] = (pos, size)
+            pos += size
+            self._file.seek(pos)
+
+        if pos < end:
+            # last record partly written, e.g. crash during put
+            self._file.truncate(pos)
+
+    def close(self):
+        """Release file resources."""
+        if self._buf is not None:
+            self._buf.close()
+            self._buf = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return len(self._spans)
+
+    def __contains__(self, key):
+        return key in self._spans
+
+    def put(self, value):
+        """Store a value.
+
+        Args:
+            value (any): json serializable value
+
+        Returns:
+            (str): key of value
+        """
+        key = value_key(value)
+        if key not in self._spans:
+            blob = _encode(value)
+            self._file.seek(0, os.SEEK_END)
+            pos = self._file.tell() + self._header.size
+            self._file.write(self._header.pack(key.encode('ascii'), len(blob)))
+            self._file.write(blob)
+            self._file.flush()
+            self._spans[key] = (pos, len(blob))
+
+        return key
+
+    def get(self, key):
+        """Retrieve a value.
+
+        Args:
+            key (str): key of value
+
+        Returns:
+            (any): decoded value
+        """
+        pos, size = self._spans[key]
+        if self._buf is None or len(self._buf) < pos + size:
+            # map again since pack grew
+            if self._buf is not None:
+                self._buf.close()
+            self._buf = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+
+        return json.loads(self._buf[pos:pos + size].decode('utf-8'))
+
+
+def externalize(prov_descr, store):
+    """Move the values of all data of a provenance in a value store.
+
+    Args:
+        prov_descr (dict): a valid provenance definition
+        store (MemoryValueStore|DirectoryValueStore|PackValueStore):
+
+    Returns:
+        (dict): a new provenance definition whose data records reference
+                values in the store instead of inlining them
+    """
+    data = []
+    for data_descr in prov_descr['data']:
+        if 'value' in data_descr:
+            data_descr = dict(data_descr)
+            data_descr['ref'] = store.put(data_descr.pop('value'))
+        data.append(data_descr)
+
+    return dict(prov_descr, data=data)
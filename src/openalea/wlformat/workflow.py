@@ -1,6 +1,9 @@
 """Workflow helper functions.
 """
+from array import array
+
 from . import tools
+from .tools import diagnostic
 
 
 def validate(workflow_descr):
@@ -13,3 +16,351 @@ def validate(workflow_descr):
         (bool) - true if description match workflow json schema
     """
     return tools.validate(workflow_descr, "workflow")
+
+
+class Workflow(object):
+    """Graph view of a workflow description.
+
+    Links are stored in arrays and indexed by node and by port so
+    connectivity queries run in O(degree) instead of scanning all links.
+    """
+
+    def __init__(self, attributes=None):
+        """Constructor.
+
+        Args:
+            attributes (dict): workflow attributes other than
+                               nodes and links (id, name, ...)
+        """
+        self.attributes = dict(attributes or {})
+        self.nodes = []
+        self.sources = array('l')
+        self.targets = array('l')
+        self.source_ports = []
+        self.target_ports = []
+        self._in_links = []  # node -> link indices
+        self._out_links = []  # node -> link indices
+        self._in_port_links = {}  # (node, port) -> link indices
+        self._out_port_links = {}  # (node, port) -> link indices
+
+    @classmethod
+    def from_dict(cls, workflow_descr):
+        """Construct a graph from a workflow description.
+
+        Args:
+            workflow_descr: (dict) valid workflow description
+
+        Returns:
+            (Workflow)
+        """
+        attributes = dict((key, val) for key, val in workflow_descr.items()
+                          if key not in ('nodes', 'links'))
+        wkf = cls(attributes)
+        for node in workflow_descr['nodes']:
+            wkf.add_node(node)
+
+        for link in workflow_descr['links']:
+            wkf.add_link(link['source'], link['source_port'],
+                         link['target'], link['target_port'])
+
+        return wkf
+
+    def to_dict(self):
+        """Construct the workflow description associated to this graph.
+
+        Returns:
+            (dict) - workflow description
+        """
+        descr = dict(self.attributes)
+        descr['nodes'] = list(self.nodes)
+        descr['links'] = [self.link(i) for i in range(self.nb_links())]
+        return descr
+
+    def nb_nodes(self):
+        """Number of nodes in graph."""
+        return len(self.nodes)
+
+    def nb_links(self):
+        """Number of links in graph."""
+        return len(self.sources)
+
+    def add_node(self, node):
+        """Add a new node in the graph.
+
+        Args:
+            node: (dict) node description, must at least have an id
+
+        Returns:
+            (int) - index of node
+        """
+        self.nodes.append(node)
+        self._in_links.append([])
+        self._out_links.append([])
+        return len(self.nodes) - 1
+
+    def add_link(self, source, source_port, target, target_port):
+        """Connect an output port to an input port.
+
+        Args:
+            source: (int) index of source node
+            source_port: (str) name of output port on source
+            target: (int) index of target node
+            target_port: (str) name of input port on target
+
+        Returns:
+            (int) - index of link
+        """
+        for ind in (source, target):
+            if not 0 <= ind < len(self.nodes):
+                raise IndexError("node %d does not exist" % ind)
+
+        lid = len(self.sources)
+        self.sources.append(source)
+        self.targets.append(target)
+        self.source_ports.append(source_port)
+        self.target_ports.append(target_port)
+        self._out_links[source].append(lid)
+        self._in_links[target].append(lid)
+        self._out_port_links.setdefault((source, source_port), []).append(lid)
+        self._in_port_links.setdefault((target, target_port), []).append(lid)
+
+        return lid
+
+    def link(self, lid):
+        """Description of a link.
+
+        Args:
+            lid: (int) index of link
+
+        Returns:
+            (dict) - source, source_port, target, target_port
+        """
+        return dict(source=self.sources[lid],
+                    source_port=self.source_ports[lid],
+                    target=self.targets[lid],
+                    target_port=self.target_ports[lid])
+
+    def in_links(self, node):
+        """Indices of links entering a node.
+
+        Args:
+            node: (int) index of node
+
+        Returns:
+            (list of int)
+        """
+        return list(self._in_links[node])
+
+    def out_links(self, node):
+        """Indices of links leaving a node.
+
+        Args:
+            node: (int) index of node
+
+        Returns:
+            (list of int)
+        """
+        return list(self._out_links[node])
+
+    def in_port_links(self, node, port):
+        """Indices of links connected to an input port.
+
+        Args:
+            node: (int) index of node
+            port: (str) name of input port
+
+        Returns:
+            (list of int)
+        """
+        return list(self._in_port_links.get((node, port), []))
+
+    def out_port_links(self, node, port):
+        """Indices of links connected to an output port.
+
+        Args:
+            node: (int) index of node
+            port: (str) name of output port
+
+        Returns:
+            (list of int)
+        """
+        return list(self._out_port_links.get((node, port), []))
+
+    def is_connected(self, node, port, output=False):
+        """Check whether a port is connected to at least one link.
+
+        Args:
+            node: (int) index of node
+            port: (str) name of port
+            output: (bool) whether port is an output or an input port
+
+        Returns:
+            (bool)
+        """
+        if output:
+            return (node, port) in self._out_port_links
+        else:
+            return (node, port) in self._in_port_links
+
+    def predecessors(self, node):
+        """Nodes connected to the inputs of a node.
+
+        Args:
+            node: (int) index of node
+
+        Returns:
+            (list of int) - without duplicates, in order of links
+        """
+        sources = self.sources
+        nodes = []
+        seen = set()
+        for lid in self._in_links[node]:
+            ind = sources[lid]
+            if ind not in seen:
+                seen.add(ind)
+                nodes.append(ind)
+
+        return nodes
+
+    def successors(self, node):
+        """Nodes connected to the outputs of a node.
+
+        Args:
+            node: (int) index of node
+
+        Returns:
+            (list of int) - without duplicates, in order of links
+        """
+        targets = self.targets
+        nodes = []
+        seen = set()
+        for lid in self._out_links[node]:
+            ind = targets[lid]
+            if ind not in seen:
+                seen.add(ind)
+                nodes.append(ind)
+
+        return nodes
+
+    def topological_order(self):
+        """Order nodes such that each node comes after its predecessors.
+
+        Raises: UserWarning if the workflow contains a cycle
+
+        Returns:
+            (list of int) - indices of nodes
+        """
+        targets = self.targets
+        degrees = [len(lids) for lids in self._in_links]
+        order = [ind for ind, deg in enumerate(degrees) if deg == 0]
+        i = 0
+        while i < len(order):
+            for lid in self._out_links[order[i]]:
+                tgt = targets[lid]
+                degrees[tgt] -= 1
+                if degrees[tgt] == 0:
+                    order.append(tgt)
+            i += 1
+
+        if len(order) < len(self.nodes):
+            raise UserWarning("workflow contains a cycle")
+
+        return order
+
+
+def check_workflow(workflow_descr, store):
+    """Check references and acyclicity of a workflow.
+
+    Complements :func:`validate` which only checks the json structure.
+    All checks are performed in a single sweep over nodes and links.
+
+    Args:
+        workflow_descr: (dict) workflow description valid against schema
+        store: (dict of uid, def) elements definitions
+
+    Returns:
+        (list of dict) - diagnostics, empty if workflow is correct.
+                 each one has a kind, a path and a message
+    """
+    diags = []
+
+    # port names of each node, None if node definition is unknown
+    ports = {}
+    node_ports = []
+    for ind, node in enumerate(workflow_descr['nodes']):
+        uid = node['id']
+        if uid not in ports:
+            ndef = store.get(uid, None)
+            if ndef is None:
+                ports[uid] = None
+            else:
+                ports[uid] = (set(pdef['name'] for pdef in ndef['inputs']),
+                              set(pdef['name'] for pdef in ndef['outputs']))
+
+        if ports[uid] is None:
+            diags.append(diagnostic("unknown_node", ['nodes', ind, 'id'],
+                                    "node %d: unknown definition %s"
+                                    % (ind, uid)))
+        node_ports.append(ports[uid])
+
+    nb = len(node_ports)
+    successors = [[] for i in range(nb)]
+    degrees = [0] * nb
+    fed = set()
+    for lid, link in enumerate(workflow_descr['links']):
+        src = link['source']
+        tgt = link['target']
+        valid = True
+        for end, ind in (('source', src), ('target', tgt)):
+            if not 0 <= ind < nb:
+                valid = False
+                diags.append(diagnostic("invalid_%s" % end,
+                                        ['links', lid, end],
+                                        "link %d: no node %d" % (lid, ind)))
+
+        if not valid:
+            continue
+
+        successors[src].append(tgt)
+        degrees[tgt] += 1
+
+        if node_ports[src] is not None:
+            if link['source_port'] not in node_ports[src][1]:
+                msg = ("link %d: node %d has no output port '%s'"
+                       % (lid, src, link['source_port']))
+                diags.append(diagnostic("unknown_source_port",
+                                        ['links', lid, 'source_port'], msg))
+
+        if node_ports[tgt] is not None:
+            if link['target_port'] not in node_ports[tgt][0]:
+                msg = ("link %d: node %d has no input port '%s'"
+                       % (lid, tgt, link['target_port']))
+                diags.append(diagnostic("unknown_target_port",
+                                        ['links', lid, 'target_port'], msg))
+
+        key = (tgt, link['target_port'])
+        if key in fed:
+            msg = ("link %d: input port '%s' of node %d already fed"
+                   % (lid, link['target_port'], tgt))
+            diags.append(diagnostic("multiple_inputs",
+                                    ['links', lid, 'target_port'], msg))
+        else:
+            fed.add(key)
+
+    # acyclicity
+    order = [ind for ind, deg in enumerate(degrees) if deg == 0]
+    i = 0
+    while i < len(order):
+        for tgt in successors[order[i]]:
+            degrees[tgt] -= 1
+            if degrees[tgt] == 0:
+                order.append(tgt)
+        i += 1
+
+    if len(order) < nb:
+        remaining = sorted(set(range(nb)) - set(order))
+        msg = ("workflow contains a cycle, nodes %s are part of it "
+               "or downstream of it" % ", ".join(str(i) for i in remaining))
+        diags.append(diagnostic("cycle", ['links'], msg))
+
+    return diags
@@ -0,0 +1,15 @@
+"""Coroutine functions used as nodes in test_async_executor.
+
+Kept apart since python 2 can not parse them.
+"""
+import asyncio
+
+
+async def fetch(val):
+    await asyncio.sleep(0.2)
+    return val
+
+
+async def hang(val):
+    await asyncio.sleep(10)
+    return val
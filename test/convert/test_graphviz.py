@@ -231,3 +231,44 @@ def test_export_workflow_handle_position():
     txt = graphviz.export_workflow(wkf, store)
     assert "digraph" in txt
     assert "pos=" in txt
+
+
+def test_write_workflow_in_stream():
+    wkf = {
+        "id": "workflowead211e586286003089581fc",
+        "version": 0,
+        "name": "Test Workflow",
+        "description": "test workflow",
+        "author": "unknown",
+        "nodes": [
+            {
+                "id": "nodeab8cead211e586286003089581fc"
+            },
+            {
+                "id": "nodeab8cead211e586286003089581fc",
+                "x": 0.,
+                "y": -10.
+            }
+        ],
+        "links": [
+            {
+                "source": 0,
+                "source_port": "out",
+                "target": 1,
+                "target_port": "in1"
+            }
+        ]
+    }
+
+    class Stream(object):
+        def __init__(self):
+            self.chunks = []
+
+        def write(self, txt):
+            self.chunks.append(txt)
+
+    stream = Stream()
+    graphviz.write_workflow(wkf, {}, stream)
+    assert len(stream.chunks) == 5
+    assert "".join(stream.chunks) == graphviz.export_workflow(wkf, {})
+    assert "node0 -> node1" in stream.chunks[3]
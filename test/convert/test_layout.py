@@ -0,0 +1,112 @@
+from nose.tools import assert_raises
+
+from openalea.wlformat.convert.layout import compute_layers, layout_workflow
+from openalea.wlformat.workflow import Workflow
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+node = {
+    "id": "nodeab8cead211e586286003089581fc",
+    "version": 0,
+    "name": "some node",
+    "description": "test node",
+    "author": "unknown",
+    "function": "func",
+    "inputs": [
+        {
+            "default": "0",
+            "interface": "int",
+            "description": "some input",
+            "name": "in1"
+        },
+        {
+            "default": "1",
+            "interface": "int",
+            "description": "some other input",
+            "name": "in2"
+        }
+    ],
+    "outputs": [
+        {
+            "default": "",
+            "interface": "any",
+            "description": "result",
+            "name": "out"
+        }
+    ]}
+
+
+def get_workflow():
+    nodes = [dict(id=node['id']) for i in range(6)]
+    nodes[4]['id'] = "nodefailead211e586286003089581fc"
+    links = [(0, 2), (1, 2), (2, 3), (0, 3), (1, 4), (5, 4)]
+    return {
+        "id": "workflowead211e586286003089581fc",
+        "version": 0,
+        "name": "Test Workflow",
+        "description": "test workflow",
+        "author": "unknown",
+        "nodes": nodes,
+        "links": [dict(source=src, source_port="out",
+                       target=tgt, target_port="in1")
+                  for src, tgt in links]
+    }
+
+
+def check_layout(wkf):
+    rows = {}
+    for ind, nd in enumerate(wkf['nodes']):
+        rows.setdefault(nd['y'], []).append(nd['x'])
+
+    for xs in rows.values():
+        xs.sort()
+        for x1, x2 in zip(xs[:-1], xs[1:]):
+            assert x2 - x1 >= 20
+
+    for link in wkf['links']:
+        src = wkf['nodes'][link['source']]
+        tgt = wkf['nodes'][link['target']]
+        assert src['y'] < tgt['y']
+
+
+def test_compute_layers():
+    wkf = get_workflow()
+    assert compute_layers(Workflow.from_dict(wkf)) == [0, 0, 1, 2, 1, 0]
+
+
+def test_layout_workflow():
+    wkf = get_workflow()
+    assert layout_workflow(wkf, {node['id']: node}) is wkf
+    check_layout(wkf)
+
+    wkf = get_workflow()
+    layout_workflow(wkf, {})
+    check_layout(wkf)
+
+
+def test_layout_workflow_handle_empty_workflow():
+    wkf = dict(get_workflow(), nodes=[], links=[])
+    layout_workflow(wkf, {})
+
+
+def test_layout_workflow_raise_error_if_cycle():
+    wkf = get_workflow()
+    wkf['links'].append(dict(source=3, source_port="out",
+                             target=0, target_port="in1"))
+    assert_raises(UserWarning, lambda: layout_workflow(wkf, {}))
+
+
+def test_layout_workflow_numpy():
+    if numpy is None:
+        return
+
+    store = {node['id']: node}
+    wkf = layout_workflow(get_workflow(), store)
+    nwkf = layout_workflow(get_workflow(), store, use_numpy=True)
+    check_layout(nwkf)
+    for nd, nnd in zip(wkf['nodes'], nwkf['nodes']):
+        assert abs(nd['x'] - nnd['x']) < 1e-6
+        assert nd['y'] == nnd['y']
@@ -0,0 +1,98 @@
+import os
+import shutil
+from tempfile import mkdtemp
+
+from openalea.wlformat.convert.render_cache import (content_key,
+                                                    DirectoryCache,
+                                                    MemoryCache)
+
+node = {
+    "id": "nodeab8cead211e586286003089581fc",
+    "version": 0,
+    "name": "some node",
+    "description": "test node",
+    "author": "unknown",
+    "function": "func",
+    "inputs": [
+        {
+            "default": "0",
+            "interface": "idef1b8cead211e586286003089581fc",
+            "description": "some input",
+            "name": "in1"
+        }
+    ],
+    "outputs": []
+}
+
+idef = {
+    "id": "idef1b8cead211e586286003089581fc",
+    "name": "IInt",
+    "url": "my_pretty_url1"
+}
+
+wkf = {
+    "id": "workflowead211e586286003089581fc",
+    "version": 0,
+    "name": "Test Workflow",
+    "description": "test workflow",
+    "author": "unknown",
+    "nodes": [
+        {
+            "id": "nodeab8cead211e586286003089581fc",
+            "x": 0,
+            "y": 0
+        }
+    ],
+    "links": []
+}
+
+
+def test_content_key_depends_on_referenced_defs_only():
+    store = {node['id']: node, idef['id']: idef}
+    key = content_key("workflow", wkf, store, (600, 600))
+
+    assert content_key("workflow", wkf, dict(store), [600, 600]) == key
+    assert content_key("workflow", wkf, store, (600, 400)) != key
+    assert content_key("workflow", wkf, {node['id']: node}, (600, 600)) != key
+
+    ustore = dict(store, unused={"name": "toto"})
+    assert content_key("workflow", wkf, ustore, (600, 600)) == key
+
+    mstore = dict(store)
+    mstore[idef['id']] = dict(idef, url="other_url")
+    assert content_key("workflow", wkf, mstore, (600, 600)) != key
+    assert content_key("node", node, mstore, (600, 600)) != content_key(
+        "node", node, store, (600, 600))
+
+
+def test_memory_cache_evict_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", ("svga", (0, 0, 1, 1)))
+    cache.set("b", ("svgb", (0, 0, 1, 1)))
+    assert cache.get("a") == ("svga", (0, 0, 1, 1))
+    cache.set("c", ("svgc", (0, 0, 1, 1)))
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_directory_cache_evict_least_recently_used():
+    dirname = mkdtemp()
+    try:
+        cache = DirectoryCache(os.path.join(dirname, "cache"), max_entries=2)
+        cache.set("a", ("svga", (0, 0, 1, 1)))
+        cache.set("b", ("svgb", (0, 0, 1, 1)))
+        os.utime(os.path.join(cache.dirname, "b.json"), (0, 0))
+        assert cache.get("a") == ("svga", (0, 0, 1, 1))
+        cache.set("c", ("svgc", (0, 0, 1, 1)))
+
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("c") == ("svgc", (0, 0, 1, 1))
+
+        cache = DirectoryCache(os.path.join(dirname, "cache"), max_entries=2)
+        assert cache.get("a") == ("svga", (0, 0, 1, 1))
+    finally:
+        shutil.rmtree(dirname)
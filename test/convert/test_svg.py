@@ -495,3 +495,118 @@ if run_test:
         txt, bb = svg.export_node(node, store)
         assert "my_pretty_url1" in txt
         assert "my_pretty_url2" in txt
+
+
+    def test_compute_layout():
+        node = {
+            "id": "nodeab8cead211e586286003089581fc",
+            "version": 0,
+            "name": "some node",
+            "description": "test node",
+            "author": "unknown",
+            "function": "func",
+            "inputs": [
+                {
+                    "default": "0",
+                    "interface": "int",
+                    "description": "some input",
+                    "name": "in1"
+                },
+                {
+                    "default": "1",
+                    "interface": "int",
+                    "description": "some other input",
+                    "name": "in2"
+                }
+            ],
+            "outputs": [
+                {
+                    "default": "",
+                    "interface": "any",
+                    "description": "result",
+                    "name": "out"
+                }
+            ]}
+
+        wkf = {
+            "id": "workflowead211e586286003089581fc",
+            "version": 0,
+            "name": "Test Workflow",
+            "description": "test workflow",
+            "author": "unknown",
+            "nodes": [
+                {
+                    "id": "nodeab8cead211e586286003089581fc",
+                    "x": 0,
+                    "y": 0
+                },
+                {
+                    "id": "nodefailead211e586286003089581fc",
+                    "x": 0,
+                    "y": 100
+                }
+            ],
+            "links": []
+        }
+
+        store = {node['id']: node}
+        geoms, ports = svg.compute_layout(wkf, store)
+
+        assert len(geoms) == 2
+        nf, label, nw, nh = geoms[0]
+        assert nf is node
+        assert label == "some node"
+        assert geoms[1][0] is None
+        assert geoms[1][1] == "node1"
+
+        assert len(ports) == 3
+        x1, y1 = ports[(0, 'inputs', 'in1')]
+        x2, y2 = ports[(0, 'inputs', 'in2')]
+        x, y = ports[(0, 'outputs', 'out')]
+        assert x1 < x == 0 < x2
+        assert y1 == y2 == -nh / 2.
+        assert y == nh / 2.
+
+
+    def test_export_reuse_cached_drawings():
+        from openalea.wlformat.convert.render_cache import MemoryCache
+
+        node = {
+            "id": "nodeab8cead211e586286003089581fc",
+            "version": 0,
+            "name": "some node",
+            "description": "test node",
+            "author": "unknown",
+            "function": "func",
+            "inputs": [],
+            "outputs": []
+        }
+
+        wkf = {
+            "id": "workflowead211e586286003089581fc",
+            "version": 0,
+            "name": "Test Workflow",
+            "description": "test workflow",
+            "author": "unknown",
+            "nodes": [
+                {
+                    "id": "nodeab8cead211e586286003089581fc",
+                    "x": 0,
+                    "y": 0
+                }
+            ],
+            "links": []
+        }
+
+        store = {node['id']: node}
+        cache = MemoryCache()
+
+        drawing = svg.export_workflow(wkf, store, cache=cache)
+        assert drawing == svg.export_workflow(wkf, store)
+        assert len(cache) == 1
+        assert svg.export_workflow(wkf, store, cache=cache) is drawing
+
+        drawing = svg.export_node(node, store, cache=cache)
+        assert drawing[1] == svg.export_node(node, store)[1]
+        assert len(cache) == 2
+        assert svg.export_node(node, store, cache=cache) is drawing
@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+from tempfile import mkdtemp
+import warnings
+
+try:
+    import docutils
+    run_test = True
+except ImportError:
+    docutils = None
+    run_test = False
+
+if run_test:
+    from openalea.wlformat.convert.workflow_directive import (
+        merge_jobs, out_of_date, placeholder, purge_jobs, render_jobs,
+        WorkflowWarning)
+
+    class Namespace(object):
+        """Stand in for sphinx app and env objects."""
+
+        def __init__(self, **kwds):
+            self.__dict__.update(kwds)
+
+    wkf = dict(id="wkf56789012345678901234567890123",
+               name="test",
+               nodes=[dict(id="node5678901234567890123456789012", x=0, y=0)],
+               links=[])
+
+    def make_app(cache_dir=None, processes=1):
+        cfg = Namespace(workflow_render_cache=cache_dir,
+                        workflow_render_processes=processes)
+        return Namespace(config=cfg)
+
+    def make_jobs(dname):
+        good = os.path.join(dname, "good.json")
+        with open(good, 'w') as f:
+            json.dump(wkf, f)
+
+        bad = os.path.join(dname, "bad.json")
+        with open(bad, 'w') as f:
+            f.write("not json")
+
+        jobs = {}
+        for docname, wkf_file in (("doc1", good), ("doc2", bad)):
+            svg_file = wkf_file[:-5] + ".svg"
+            with open(svg_file, 'w') as f:
+                f.write(placeholder)
+            jobs[svg_file] = (docname, wkf_file, (100, 100))
+
+        return jobs
+
+    def test_render_jobs():
+        for processes in (1, 2):
+            dname = mkdtemp()
+            try:
+                env = Namespace(srcdir=dname,
+                                workflow_render_jobs=make_jobs(dname))
+                app = make_app("cache", processes)
+                with warnings.catch_warnings(record=True) as ws:
+                    warnings.simplefilter("always")
+                    render_jobs(app, env)
+
+                ws = [w for w in ws if w.category is WorkflowWarning]
+                assert len(ws) == 1
+                assert "bad.json" in str(ws[0].message)
+
+                with open(os.path.join(dname, "good.svg"), 'r') as f:
+                    assert f.read().startswith("<svg")
+                assert not os.path.exists(os.path.join(dname, "bad.svg"))
+                assert len(os.listdir(os.path.join(dname, "cache"))) > 0
+                assert env.workflow_render_jobs == {}
+            finally:
+                shutil.rmtree(dname)
+
+    def test_render_jobs_without_jobs():
+        render_jobs(make_app(), Namespace(srcdir="."))
+
+    def test_placeholder_out_of_date():
+        dname = mkdtemp()
+        try:
+            jobs = make_jobs(dname)
+            for svg_file, (docname, wkf_file, size) in jobs.items():
+                assert not out_of_date(wkf_file, svg_file)
+                os.utime(svg_file, (0, 0))
+                assert out_of_date(wkf_file, svg_file)
+        finally:
+            shutil.rmtree(dname)
+
+    def test_purge_jobs():
+        jobs = {"a.svg": ("doc1", "a.json", (1, 1)),
+                "b.svg": ("doc2", "b.json", (1, 1)),
+                "c.svg": ("doc1", "c.json", (1, 1))}
+        env = Namespace(workflow_render_jobs=jobs)
+        purge_jobs(make_app(), env, "doc1")
+        assert jobs == {"b.svg": ("doc2", "b.json", (1, 1))}
+
+        purge_jobs(make_app(), Namespace(), "doc1")
+
+    def test_merge_jobs():
+        env = Namespace()
+        other = Namespace(workflow_render_jobs={"a.svg": ("doc1", "a.json",
+                                                          (1, 1))})
+        merge_jobs(make_app(), env, ["doc1"], other)
+        assert env.workflow_render_jobs == other.workflow_render_jobs
+
+        other = Namespace(workflow_render_jobs={"b.svg": ("doc2", "b.json",
+                                                          (1, 1))})
+        merge_jobs(make_app(), env, ["doc2"], other)
+        assert sorted(env.workflow_render_jobs) == ["a.svg", "b.svg"]
+
+        merge_jobs(make_app(), env, [], Namespace())
+        assert len(env.workflow_render_jobs) == 2
@@ -1,3 +1,13 @@
+from copy import deepcopy
+import pickle
+
+from openalea.wlformat.convert import wralea
+from openalea.wlformat.convert.wralea import (convert_packages,
+                                              get_interface_by_name,
+                                              get_node_by_node_desc,
+                                              register_interface,
+                                              register_node, Store)
+
 try:
     from openalea import core
     run_test = True
@@ -5,10 +15,141 @@ except ImportError:
     core = None
     run_test = False
 
+
+def test_store_is_a_dict():
+    store = Store()
+    idef = register_interface(store, "IInt")
+    assert isinstance(store, dict)
+    assert store[idef['id']] == ('data', idef)
+    assert Store(store) == store
+    assert store.copy() == store
+    assert isinstance(store.copy(), Store)
+
+
+def test_store_index_registered_definitions():
+    store = Store()
+    assert get_interface_by_name(store, "IInt") is None
+    assert get_node_by_node_desc(store, ("pkg", "func")) is None
+
+    idef = register_interface(store, "IInt")
+    ndef = register_node(store, ("pkg", "func"))
+
+    assert get_interface_by_name(store, "IInt") is idef
+    assert get_node_by_node_desc(store, ("pkg", "func")) is ndef
+    assert get_interface_by_name(store, "pkg: func") is None
+    assert store.find("node", "pkg: func") is ndef
+
+
+def test_store_lookups_match_dict_lookups():
+    store = {}
+    register_interface(store, "IInt")
+    register_node(store, ("pkg", "func"))
+    istore = Store(store)
+
+    assert (get_interface_by_name(istore, "IInt") ==
+            get_interface_by_name(store, "IInt"))
+    assert (get_node_by_node_desc(istore, ("pkg", "func")) ==
+            get_node_by_node_desc(store, ("pkg", "func")))
+
+
+def test_store_update_index_on_removal():
+    store = Store()
+    idef1 = register_interface(store, "IInt")
+    idef2 = register_interface(store, "IInt")
+    first = get_interface_by_name(store, "IInt")
+    assert first in (idef1, idef2)
+
+    del store[first['id']]
+    assert get_interface_by_name(store, "IInt") in (idef1, idef2)
+    assert get_interface_by_name(store, "IInt") is not first
+
+    store.pop(get_interface_by_name(store, "IInt")['id'])
+    assert get_interface_by_name(store, "IInt") is None
+
+    idef = register_interface(store, "IInt")
+    store[idef['id']] = ('data', dict(idef, name="IFloat"))
+    assert get_interface_by_name(store, "IInt") is None
+    assert get_interface_by_name(store, "IFloat")['id'] == idef['id']
+
+    store.clear()
+    assert get_interface_by_name(store, "IFloat") is None
+
+
+def test_store_can_be_copied():
+    store = Store()
+    idef = register_interface(store, "IInt")
+
+    for cstore in (pickle.loads(pickle.dumps(store)), deepcopy(store)):
+        assert isinstance(cstore, Store)
+        assert cstore == store
+        assert get_interface_by_name(cstore, "IInt") == idef
+
+
+
+class StubFactory(object):
+    """Minimal stand in for openalea NodeFactory."""
+
+    def __init__(self, name, inputs=(), outputs=()):
+        self.name = name
+        self.description = "stub %s" % name
+        self.nodemodule_name = "stub"
+        self.nodeclass_name = name
+        self.inputs = [dict(name="in%d" % i, interface=iname)
+                       for i, iname in enumerate(inputs)]
+        self.outputs = [dict(name="out%d" % i, interface=iname)
+                        for i, iname in enumerate(outputs)]
+
+    def get_authors(self):
+        return "moi"
+
+
+loaded = []
+
+
+def load_stub_package(pkgname):
+    loaded.append(pkgname)
+    if pkgname == "pkg1":
+        return {"color": StubFactory("color", ["triplet"], ["rgb"])}
+
+    return {"gray": StubFactory("gray", ["rgb"], ["IInt"]),
+            "black": StubFactory("black", [], ["rgb"])}
+
+
+def test_convert_packages_merge_interfaces():
+    for processes in (None, 2):
+        store = Store()
+        idef = register_interface(store, "triplet")
+        del loaded[:]
+        ndefs, wdefs = convert_packages(["pkg1", "pkg2"], store,
+                                        processes=processes,
+                                        loader=load_stub_package)
+        if processes is None:
+            assert loaded == ["pkg1", "pkg2"]
+            assert wralea._worker_store is None
+
+        assert wdefs == []
+        assert [ndef['name'] for ndef in ndefs] == ["pkg1: color",
+                                                    "pkg2: black",
+                                                    "pkg2: gray"]
+        # triplet + rgb + IInt, each registered once
+        inames = sorted(elm['name'] for typ, elm in store.values()
+                        if typ == 'data')
+        assert inames == ["IInt", "rgb", "triplet"]
+        assert len(store) == 3 + 3
+
+        color, black, gray = ndefs
+        assert color['inputs'][0]['interface'] == idef['id']
+        rgb = get_interface_by_name(store, "rgb")['id']
+        assert color['outputs'][0]['interface'] == rgb
+        assert black['outputs'][0]['interface'] == rgb
+        assert gray['inputs'][0]['interface'] == rgb
+        for ndef in ndefs:
+            assert store[ndef['id']] == ('node', ndef)
+
+
 if run_test:
     from openalea.core import Factory as NF
     from openalea.core import CompositeNodeFactory as CNF
-    from openalea.wlformat.convert import wralea
 
 
     def test_convert_node():
@@ -245,3 +386,68 @@ if run_test:
         store = {}
         wdef = wralea.convert_workflow(cnf, store)
         assert wdef is None
+
+
+    def load_fake_package(pkgname):
+        pkg = {}
+        if pkgname == "pkg1":
+            pkg["color"] = NF(name="color",
+                              authors="moi",
+                              description="edit color",
+                              category="datatype, image",
+                              nodemodule="openalea.color.py_color",
+                              nodeclass="ColorNode",
+                              inputs=(dict(name="RGB",
+                                           interface="triplet",
+                                           value=(0, 0, 0)),),
+                              outputs=(dict(name="RGB", interface="rgb"),),
+                              )
+        else:
+            pkg["gray"] = NF(name="gray",
+                             authors="moi",
+                             description="convert to gray",
+                             category="image",
+                             nodemodule="openalea.color.py_color",
+                             nodeclass="GrayNode",
+                             inputs=(dict(name="RGB", interface="rgb"),),
+                             outputs=(dict(name="gray", interface="IInt"),),
+                             )
+            pkg["wkf"] = CNF(name='wkf',
+                             authors="moi",
+                             description='Some description',
+                             category='doofus',
+                             doc='Some Documentation',
+                             inputs=[],
+                             outputs=[],
+                             elt_factory={2: ('pkg1', 'color'),
+                                          3: ('pkg2', 'gray')},
+                             elt_connections={4297110208: (2, 0, 3, 0)},
+                             )
+
+        return pkg
+
+
+    def test_convert_packages():
+        for processes in (None, 2):
+            store = wralea.Store()
+            idef = wralea.register_interface(store, "triplet")
+            ndefs, wdefs = wralea.convert_packages(["pkg1", "pkg2"], store,
+                                                   processes=processes,
+                                                   loader=load_fake_package)
+
+            assert [ndef['name'] for ndef in ndefs] == ["pkg1: color",
+                                                        "pkg2: gray"]
+            assert len(store) == 1 + 2 + 2  # interfaces + nodes
+            iids = set(uid for uid, (typ, elm) in store.items()
+                       if typ == 'data')
+            for ndef in ndefs:
+                for pdef in ndef['inputs'] + ndef['outputs']:
+                    assert pdef['interface'] in iids
+
+            assert ndefs[0]['inputs'][0]['interface'] == idef['id']
+            assert (ndefs[0]['outputs'][0]['interface'] ==
+                    ndefs[1]['inputs'][0]['interface'])
+
+            wdef, = wdefs
+            assert len(wdef['nodes']) == 2
+            assert len(wdef['links']) == 1
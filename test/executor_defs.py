@@ -0,0 +1,29 @@
+"""Factories of node and workflow definitions shared by executor tests."""
+
+
+def ndef(name, func, inputs, outputs, default=1):
+    return dict(id=name.ljust(32, "0"),
+                name=name,
+                owner="test",
+                version=0,
+                description="",
+                function=func,
+                inputs=[dict(name=port, interface="any", description="",
+                             default=default) for port in inputs],
+                outputs=[dict(name=port, interface="any", description="")
+                         for port in outputs])
+
+
+def link(source, source_port, target, target_port):
+    return dict(source=source, source_port=source_port,
+                target=target, target_port=target_port)
+
+
+def workflow(nodes, links):
+    return dict(id="wkf56789012345678901234567890123",
+                name="test",
+                owner="test",
+                version=0,
+                description="",
+                nodes=nodes,
+                links=links)
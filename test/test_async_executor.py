@@ -0,0 +1,116 @@
+from nose import SkipTest
+from nose.tools import assert_raises
+import threading
+from time import time
+
+from openalea.wlformat.prov_exe import data_produced_by, data_used_by, validate
+from openalea.wlformat.result_cache import ResultCache
+
+from .executor_defs import link, ndef, workflow
+from .test_executor import add, dmod, store, wait_id, wdef
+
+try:
+    from openalea.wlformat.async_executor import (_evaluate, AsyncExecutor,
+                                                  execute_async)
+    import asyncio
+except SyntaxError:  # python 2
+    raise SkipTest("asyncio execution requires python >= 3.5")
+
+ndefs = [ndef("fetch", "py:test.async_nodes#fetch", ["val"], ["ret"]),
+         ndef("hang", "py:test.async_nodes#hang", ["val"], ["ret"])]
+astore = dict(store)
+astore.update((nd["id"], nd) for nd in ndefs)
+fetch_id, hang_id = [nd["id"] for nd in ndefs]
+
+
+def test_execute_produce_valid_provenance():
+    params = {(0, "a"): 5, (0, "b"): 2, (1, "b"): 3, (2, "b"): 4}
+    prov = execute_async(wdef, astore, params)
+    assert validate(prov)
+    assert len(prov["executions"]) == 3
+    assert data_produced_by(prov, 1, "ret")[1] == 21
+    assert data_produced_by(prov, 2, "mod")[1] == 3
+    assert data_used_by(prov, 1, "a") == data_produced_by(prov, 0, "ret")
+
+
+def test_execute_await_coroutines_concurrently():
+    wkf = workflow([dict(id=fetch_id) for i in range(4)] + [dict(id=add)],
+                   [link(0, "ret", 4, "a"), link(1, "ret", 4, "b")])
+    params = dict(((i, "val"), i) for i in range(4))
+    t0 = time()
+    prov = execute_async(wkf, astore, params)
+    assert time() - t0 < 0.6
+    assert data_produced_by(prov, 4, "ret")[1] == 1
+    assert data_used_by(prov, 4, "b") == data_produced_by(prov, 1, "ret")
+
+
+def test_execute_limit_concurrency():
+    wkf = workflow([dict(id=fetch_id) for i in range(4)], [])
+    prov = AsyncExecutor(astore, max_workers=2).run(wkf)
+    assert len(prov["executions"]) == 4
+    starts = sorted(exe["time_init"] for exe in prov["executions"])
+    ends = sorted(exe["time_end"] for exe in prov["executions"])
+    # third fetch starts only once a slot is released
+    assert starts[2] >= ends[0]
+
+
+def test_execute_timeout():
+    wkf = workflow([dict(id=fetch_id), dict(id=hang_id)], [])
+    t0 = time()
+    assert_raises(UserWarning,
+                  lambda: execute_async(wkf, astore, timeout=0.5))
+    assert time() - t0 < 2
+
+    ex = AsyncExecutor(astore, node_timeouts={1: 0.1})
+    assert_raises(UserWarning, lambda: ex.run(wkf))
+
+    wkf = workflow([dict(id=fetch_id), dict(id=dmod)], [])
+    ex = AsyncExecutor(astore, timeout=0.1)
+    assert_raises(UserWarning, lambda: ex.run(wkf))
+    ex = AsyncExecutor(astore, timeout=0.1, node_timeouts={0: 1.})
+    prov = ex.run(wkf)
+    assert data_produced_by(prov, 0, "ret")[1] == 1
+
+
+def test_execute_use_cache():
+    cache = ResultCache()
+    execute_async(wdef, astore, cache=cache)
+    assert cache.misses == 3
+    prov = execute_async(wdef, astore, cache=cache)
+    assert cache.hits == 3
+    assert data_produced_by(prov, 1, "ret")[1] == 2
+
+
+def test_evaluate_release_slot_once_thread_returns():
+    released = []
+
+    loop = asyncio.new_event_loop()
+    try:
+        outcome = loop.run_until_complete(
+            _evaluate("py:test.test_executor#wait", [1], 0.05,
+                      lambda: released.append(time())))
+        assert len(released) == 0
+        loop.run_until_complete(asyncio.sleep(0.3))
+    finally:
+        loop.close()
+
+    time_init, time_end, res, err = outcome
+    assert err.startswith("timeout")
+    assert len(released) == 1
+    assert released[0] >= time_init + 0.2
+
+    outcome = asyncio.run(_evaluate("py:operator#add", [1, 2], 1.,
+                                    lambda: released.append(time())))
+    assert outcome[2] == 3
+    assert len(released) == 2
+
+
+def test_execute_timeout_do_not_exceed_max_workers():
+    wkf = workflow([dict(id=wait_id), dict(id=fetch_id)], [])
+    ex = AsyncExecutor(astore, max_workers=1, node_timeouts={0: 0.05})
+    nb = threading.active_count()
+    t0 = time()
+    assert_raises(UserWarning, lambda: ex.run(wkf))
+    # run waits for the thread still evaluating node 0
+    assert time() - t0 >= 0.2
+    assert threading.active_count() == nb
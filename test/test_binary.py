@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from copy import deepcopy
+from nose.tools import assert_raises
+import os
+import pickle
+from tempfile import mkstemp
+
+from openalea.wlformat import binary
+
+from .test_prov_exe import pdef
+
+
+def test_round_trip_json_values():
+    for obj in (None, True, False, 0, 1, -1, 127, 128, -129, 2 ** 70,
+                -2 ** 70, 0., -1.5, 1e300, "", "toto", u"\xe9t\xe9",
+                [], {}, [1, [2, [3]]], {"a": {"b": None}}):
+        for compact in (False, True):
+            res = binary.loads(binary.dumps(obj, compact))
+            assert res == obj
+            assert type(res) is type(obj) or isinstance(obj, str)
+
+
+def test_round_trip_provenance():
+    for compact in (False, True):
+        assert binary.loads(binary.dumps(pdef, compact)) == pdef
+
+
+def test_strings_are_shared():
+    ldef = deepcopy(pdef)
+    for i in range(10):
+        ldef["executions"].append(deepcopy(ldef["executions"][0]))
+
+    data = binary.dumps(ldef)
+    assert data.startswith(binary.magic)
+    did = ldef["data"][0]["id"]
+    assert data.count(did.encode('ascii')) == 1
+
+    res = binary.loads(data)
+    assert res == ldef
+    ports = [exe["inputs"][0] for exe in res["executions"]]
+    assert all(port["data"] is ports[0]["data"] for port in ports)
+
+
+def test_reject_python_globals():
+    for obj in (os.path.join, pickle.Pickler, deepcopy):
+        data = binary.magic + pickle.dumps(obj, 2)
+        assert_raises(ValueError, lambda: binary.loads(data))
+
+    assert_raises(ValueError, lambda: binary.loads(binary.magic + b"toto"))
+
+
+def test_ids_are_stored_once_in_compact_format():
+    ldef = deepcopy(pdef)
+    for i in range(10):
+        ldef["executions"].append(deepcopy(ldef["executions"][0]))
+
+    data = binary.dumps(ldef, compact=True)
+    assert data.startswith(binary.compact_magic)
+    assert binary.loads(data) == ldef
+    raw = bytes(bytearray.fromhex(ldef["data"][0]["id"]))
+    assert data.count(raw) == 1
+    assert data.count(ldef["data"][0]["id"].encode('ascii')) == 0
+
+    # non hexadecimal ids are kept as text
+    assert data.count(ldef["workflow"].encode('ascii')) == 1
+
+
+def test_tuples_are_decoded_as_lists():
+    for compact in (False, True):
+        res = binary.loads(binary.dumps((1, (2, 3)), compact))
+        assert res == [1, [2, 3]]
+
+
+def test_raise_error_on_unsupported_values():
+    for compact in (False, True):
+        assert_raises(TypeError, lambda: binary.dumps(object(), compact))
+        assert_raises(TypeError, lambda: binary.dumps({1: 2}, compact))
+    assert_raises(ValueError, lambda: binary.loads(b"toto"))
+
+
+def test_dump_load_file():
+    fid, pth = mkstemp(suffix=".wlb")
+    os.close(fid)
+    try:
+        for compact in (False, True):
+            with open(pth, 'wb') as f:
+                binary.dump(pdef, f, compact)
+
+            with open(pth, 'rb') as f:
+                assert binary.load(f) == pdef
+    finally:
+        os.remove(pth)
@@ -0,0 +1,133 @@
+from nose.tools import assert_raises
+import os.path
+from time import sleep
+
+from openalea.wlformat.executor import Executor, execute, resolve_function
+from openalea.wlformat.prov_exe import data_produced_by, data_used_by, validate
+
+from .executor_defs import link, ndef, workflow
+
+
+def wait(val):
+    sleep(0.2)
+    return val
+
+
+def fail(val):
+    raise ValueError("fail on %s" % val)
+
+
+def split(a, b):
+    return divmod(a, b)
+
+
+ndefs = [ndef("add", "py:operator#add", ["a", "b"], ["ret"]),
+         ndef("mul", "py:operator#mul", ["a", "b"], ["ret"]),
+         ndef("split", "py:test.test_executor#split", ["a", "b"],
+              ["div", "mod"]),
+         ndef("wait", "py:test.test_executor#wait", ["val"], ["ret"]),
+         ndef("fail", "py:test.test_executor#fail", ["val"], ["ret"])]
+store = dict((nd["id"], nd) for nd in ndefs)
+add, mul, dmod, wait_id, fail_id = [nd["id"] for nd in ndefs]
+
+
+# (x + y) * z, divmod(x + y, z)
+wdef = workflow([dict(id=add), dict(id=mul), dict(id=dmod)],
+                [link(0, "ret", 1, "a"), link(0, "ret", 2, "a")])
+
+
+def test_resolve_function():
+    assert resolve_function("py:os.path#join") is os.path.join
+    assert resolve_function("py:os#path.join") is os.path.join
+    assert_raises(UserWarning, lambda: resolve_function("null"))
+    assert_raises(UserWarning, lambda: resolve_function("py:os.path"))
+    assert_raises(UserWarning, lambda: resolve_function("py:toto#func"))
+    assert_raises(UserWarning, lambda: resolve_function("py:os#toto"))
+
+
+def test_execute_produce_valid_provenance():
+    params = {(0, "a"): 5, (0, "b"): 2, (1, "b"): 3, (2, "b"): 4}
+    prov = execute(wdef, store, params)
+    assert validate(prov)
+    assert prov["workflow"] == wdef["id"]
+    assert len(prov["executions"]) == 3
+    assert len(prov["parameters"]) == 4
+    for exe in prov["executions"]:
+        assert prov["time_init"] <= exe["time_init"] <= exe["time_end"]
+        assert exe["time_end"] <= prov["time_end"]
+
+    assert data_produced_by(prov, 0, "ret")[1] == 7
+    assert data_produced_by(prov, 1, "ret")[1] == 21
+    assert data_produced_by(prov, 2, "div")[1] == 1
+    assert data_produced_by(prov, 2, "mod")[1] == 3
+    assert data_used_by(prov, 1, "a") == data_produced_by(prov, 0, "ret")
+
+
+def test_execute_use_port_defaults():
+    prov = execute(wdef, store)
+    assert data_produced_by(prov, 1, "ret")[1] == 2
+
+
+def test_execute_independent_branches_concurrently():
+    wkf = workflow([dict(id=wait_id), dict(id=wait_id), dict(id=add)],
+                   [link(0, "ret", 2, "a"), link(1, "ret", 2, "b")])
+    prov = execute(wkf, store, max_workers=2)
+    assert data_produced_by(prov, 2, "ret")[1] == 2
+    exe0, exe1 = sorted(prov["executions"][:2], key=lambda exe: exe["node"])
+    assert exe0["time_init"] < exe1["time_end"]
+    assert exe1["time_init"] < exe0["time_end"]
+
+
+def test_execute_with_processes():
+    params = {(0, "a"): 5, (0, "b"): 2, (1, "b"): 3, (2, "b"): 4}
+    prov = execute(wdef, store, params, max_workers=2, use_processes=True)
+    assert validate(prov)
+    assert data_produced_by(prov, 1, "ret")[1] == 21
+    assert data_produced_by(prov, 2, "mod")[1] == 3
+
+
+def test_execute_raise_error_if_node_fails():
+    wkf = workflow([dict(id=add), dict(id=fail_id)],
+                   [link(0, "ret", 1, "val")])
+    for max_workers in (None, 2):
+        assert_raises(UserWarning,
+                      lambda: execute(wkf, store, max_workers=max_workers))
+
+    wkf = workflow([dict(id=add), dict(id="unknown".ljust(32, "0"))], [])
+    assert_raises(UserWarning, lambda: execute(wkf, store))
+
+
+def test_execute_honour_block_flag():
+    wkf = workflow([dict(id=add, block=True), dict(id=mul), dict(id=dmod)],
+                   wdef["links"])
+    prov = execute(wkf, store)
+    assert prov["executions"] == []
+
+    wkf = workflow([dict(id=add), dict(id=mul, block=True), dict(id=dmod)],
+                   wdef["links"])
+    prov = execute(wkf, store)
+    assert sorted(exe["node"] for exe in prov["executions"]) == [0, 2]
+
+
+def test_execute_only_nodes_needed_by_targets():
+    executor = Executor(store)
+    assert executor.select(wdef, targets=[1]) == set([0, 1])
+    assert executor.select(wdef) == set([0, 1, 2])
+    prov = executor.run(wdef, targets=[1])
+    assert sorted(exe["node"] for exe in prov["executions"]) == [0, 1]
+
+    # lazy flag does not force execution
+    wkf = workflow([dict(id=add), dict(id=mul), dict(id=dmod, lazy=False)],
+                   wdef["links"])
+    assert executor.select(wkf, targets=[1]) == set([0, 1])
+
+
+def test_execute_honour_priority_flag():
+    wkf = workflow([dict(id=add), dict(id=mul, priority=1),
+                    dict(id=dmod, priority=2)], wdef["links"])
+    prov = execute(wkf, store)
+    assert [exe["node"] for exe in prov["executions"]] == [0, 2, 1]
+
+    wkf["nodes"][1]["priority"] = 3
+    prov = execute(wkf, store)
+    assert [exe["node"] for exe in prov["executions"]] == [0, 1, 2]
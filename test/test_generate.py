@@ -0,0 +1,127 @@
+import json
+from nose.tools import assert_raises
+import os
+import shutil
+from tempfile import mkdtemp
+
+from openalea.wlformat import data_interface, node, prov_exe, workflow
+from openalea.wlformat.generate import (make_id, make_interfaces,
+                                        make_nodes, ProvenanceGenerator,
+                                        shapes, write_corpus,
+                                        WorkflowGenerator)
+from openalea.wlformat.workflow import check_workflow, Workflow
+
+idefs = make_interfaces(5)
+ndefs = make_nodes(20, idefs, max_ports=4)
+store = dict((ndef['id'], ndef) for ndef in ndefs)
+
+
+def test_ids_are_deterministic():
+    assert make_id(0, "node", 1) == make_id(0, "node", 1)
+    assert make_id(0, "node", 1) != make_id(1, "node", 1)
+    assert len(make_id("toto")) == 32
+
+
+def test_definitions_are_valid():
+    for idef in idefs:
+        assert data_interface.validate(idef)
+
+    for ndef in ndefs:
+        assert node.validate(ndef)
+
+    assert sorted(set(len(ndef['inputs']) for ndef in ndefs)) == [1, 2, 3, 4]
+    assert make_nodes(20, idefs, max_ports=4) == ndefs
+    assert make_nodes(20, idefs, max_ports=4, seed=1) != ndefs
+
+
+def test_workflows_are_valid_for_all_shapes():
+    for shape in shapes:
+        wdef = WorkflowGenerator(ndefs, 50, shape, width=4).workflow()
+        assert workflow.validate(wdef)
+        assert check_workflow(wdef, store) == []
+        assert len(wdef['nodes']) == 50
+        assert all(link['source'] < link['target']
+                   for link in wdef['links'])
+
+
+def test_workflow_shapes():
+    wdef = WorkflowGenerator(ndefs, 10, "chain").workflow()
+    assert all(link['source'] == link['target'] - 1
+               for link in wdef['links'])
+
+    graph = Workflow.from_dict(WorkflowGenerator(ndefs, 11, "fan",
+                                                 width=4).workflow())
+    assert sorted(graph.successors(0)) == [1, 2, 3, 4]
+    assert sorted(graph.predecessors(5)) == [1, 2, 3, 4]
+    assert sorted(graph.successors(5)) == [6, 7, 8, 9]
+
+    assert_raises(UserWarning, lambda: WorkflowGenerator(ndefs, 10, "fan",
+                                                         width=5))
+    assert_raises(UserWarning, lambda: WorkflowGenerator(ndefs, 10, "toto"))
+
+
+def test_generation_is_deterministic():
+    wdef1 = WorkflowGenerator(ndefs, 30, seed=3).workflow()
+    wdef2 = WorkflowGenerator(ndefs, 30, seed=3).workflow()
+    wdef3 = WorkflowGenerator(ndefs, 30, seed=4).workflow()
+    assert wdef1 == wdef2
+    assert wdef1 != wdef3
+
+
+def test_provenance_match_workflow():
+    wgen = WorkflowGenerator(ndefs, 30, "layered", width=5)
+    prov = ProvenanceGenerator(wgen).provenance()
+    assert prov_exe.validate(prov)
+    assert prov['workflow'] == wgen.id
+    assert len(prov['executions']) == 30
+
+    dids = set(data['id'] for data in prov['data'])
+    assert len(dids) == len(prov['data'])
+    for exe in prov['executions']:
+        for port in exe['inputs'] + exe['outputs']:
+            assert port['data'] in dids
+
+    for link in wgen.iter_links():
+        did, val = prov_exe.data_produced_by(prov, link['source'],
+                                             link['source_port'])
+        assert prov_exe.data_used_by(prov, link['target'],
+                                     link['target_port']) == (did, val)
+
+
+def test_write_stream_same_objects():
+    wgen = WorkflowGenerator(ndefs, 20, "fan", width=3)
+    pgen = ProvenanceGenerator(wgen)
+    dname = mkdtemp()
+    try:
+        for name, gen, ref in (("wkf.json", wgen, wgen.workflow()),
+                               ("prov.json", pgen, pgen.provenance())):
+            pth = os.path.join(dname, name)
+            with open(pth, 'w') as f:
+                gen.write(f)
+            with open(pth, 'r') as f:
+                assert json.load(f) == ref
+    finally:
+        shutil.rmtree(dname)
+
+
+def test_write_corpus():
+    dname = mkdtemp()
+    try:
+        pths = write_corpus(os.path.join(dname, "corpus"), 2, 15)
+        assert len(pths) == 5
+        with open(pths[0], 'r') as f:
+            defs = json.load(f)
+        corpus_store = dict((obj['id'], obj) for obj in defs)
+        wdefs = []
+        for pth in pths[1:]:
+            with open(pth, 'r') as f:
+                obj = json.load(f)
+            if 'nodes' in obj:
+                assert check_workflow(obj, corpus_store) == []
+                wdefs.append(obj)
+            else:
+                assert prov_exe.validate(obj)
+
+        assert wdefs[0]['id'] != wdefs[1]['id']
+    finally:
+        shutil.rmtree(dname)
@@ -0,0 +1,86 @@
+from copy import deepcopy
+import os
+
+from openalea.wlformat.prov_db import ProvenanceDB
+
+from .test_prov_stream import dump, ldef
+
+did_in = "46793ee1dbdb11e5bd1eace010ea24cf"
+did_out = "467435d1dbdb11e599adace010ea24ce"
+
+
+def records():
+    prov1 = deepcopy(ldef)
+    prov2 = deepcopy(ldef)
+    prov2["id"] = "bb060be1da2c11e5a216ace010ea24c0"
+    prov2["workflow"] = "wkf60be1da2c11e5a216ace010ea24c0"
+    prov2["executions"][1]["time_end"] = 11.
+    return prov1, prov2
+
+
+def test_db_ingest_records():
+    prov1, prov2 = records()
+    db = ProvenanceDB()
+    db.ingest(prov1)
+    db.ingest(prov2)
+    assert db.nb_records() == 2
+    assert db.nb_executions() == 4
+
+    exes = list(db.executions(record=prov1["id"]))
+    assert [exe["index"] for exe in exes] == [0, 1]
+    assert exes[1]["node"] == 1
+    assert exes[1]["workflow"] == prov1["workflow"]
+    assert exes[1]["time_init"] == 1.
+    assert exes[1]["time_end"] == 2.
+
+
+def test_db_select_executions_by_node_and_duration():
+    prov1, prov2 = records()
+    db = ProvenanceDB()
+    db.ingest(prov1)
+    db.ingest(prov2)
+
+    assert len(list(db.executions(node=1))) == 2
+    assert len(list(db.executions(node=0))) == 2
+    exes = list(db.executions(node=1, min_duration=5.))
+    assert len(exes) == 1
+    assert exes[0]["record"] == prov2["id"]
+    assert len(list(db.executions(max_duration=1.))) == 3
+    assert len(list(db.executions(node=1, workflow=prov1["workflow"]))) == 1
+    assert list(db.executions(node=2)) == []
+
+
+def test_db_find_consumers_and_producers_of_data():
+    prov1, prov2 = records()
+    db = ProvenanceDB()
+    db.ingest(prov1)
+    db.ingest(prov2)
+
+    cons = list(db.consumers(did_in))
+    assert [(exe["record"], exe["port"]) for exe in cons] == [
+        (prov1["id"], "a"), (prov2["id"], "a")]
+    assert list(db.records_using(did_in)) == [prov1["id"], prov2["id"]]
+
+    prods = list(db.producers(did_out))
+    assert len(prods) == 2
+    assert all(exe["node"] == 1 and exe["port"] == "out" for exe in prods)
+    assert list(db.consumers(did_out)) == []
+    assert list(db.records_using(did_out)) == []
+
+
+def test_db_ingest_files_and_persist():
+    pths = [dump(prov, indent=2) for prov in records()]
+    db_pth = pths[0] + ".db"
+    try:
+        with ProvenanceDB(db_pth) as db:
+            assert db.ingest_files(pths) == 2
+
+        with ProvenanceDB(db_pth) as db:
+            assert db.nb_records() == 2
+            exes = list(db.executions(node=1, min_duration=5.))
+            assert len(exes) == 1
+            assert len(list(db.producers(did_out))) == 2
+    finally:
+        for pth in pths + [db_pth]:
+            if os.path.exists(pth):
+                os.remove(pth)
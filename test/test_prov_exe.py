@@ -1,7 +1,11 @@
 from copy import deepcopy
 from nose.tools import assert_raises
 
-from openalea.wlformat.prov_exe import data_produced_by, data_used_by
+from openalea.wlformat.prov_exe import (all_data_produced_by,
+                                        all_data_used_by,
+                                        data_produced_by, data_used_by,
+                                        downstream, ProvenanceIndex,
+                                        select_executions, upstream)
 
 pdef = {
     "id": "bb060be1da2c11e5a216ace010ea24cf",
@@ -93,3 +97,132 @@ def test_data_used_retrieve_data_associated_with_output_port():
 
     assert did == "46793ee1dbdb11e5bd1eace010ea24cf"
     assert val == "toto"
+
+
+def test_data_prod_raise_error_if_data_not_defined():
+    ldef = deepcopy(pdef)
+    del ldef["data"][0]
+    assert_raises(UserWarning, lambda: data_produced_by(ldef, 0, "ret"))
+
+
+def test_index_answer_same_queries():
+    index = ProvenanceIndex(pdef)
+
+    res = data_produced_by(pdef, 0, "ret")
+    assert data_produced_by(index, 0, "ret") == res
+    assert data_used_by(index, 0, "a") == data_used_by(pdef, 0, "a")
+    assert_raises(IndexError, lambda: data_produced_by(index, 10, "ret"))
+    assert_raises(KeyError, lambda: data_used_by(index, 0, "totutita"))
+
+
+def test_index_can_be_filled_incrementally():
+    index = ProvenanceIndex()
+    for exe in pdef["executions"]:
+        index.add_execution(exe)
+
+    assert_raises(UserWarning, lambda: index.data_produced_by(0, "ret"))
+
+    for data_descr in pdef["data"]:
+        index.add_data(data_descr)
+
+    assert index.data_produced_by(0, "ret") == data_produced_by(pdef, 0, "ret")
+    assert index.execution(0) == 0
+    index.add_execution(pdef["executions"][0])
+    assert_raises(UserWarning, lambda: index.execution(0))
+
+
+def chain(nb):
+    """Provenance where execution i uses data i and produces data i + 1."""
+    exes = []
+    for i in range(nb):
+        exes.append({"node": i, "time_init": i, "time_end": i + 1,
+                     "inputs": [{"port": "in", "data": "d%d" % i}],
+                     "outputs": [{"port": "out", "data": "d%d" % (i + 1)}]})
+
+    return dict(pdef, executions=exes, data=[], parameters=[])
+
+
+def test_lineage_follow_chain_of_executions():
+    prov = chain(4)
+    prov["executions"].append({"node": 4, "time_init": 0, "time_end": 1,
+                               "inputs": [{"port": "in", "data": "d1"},
+                                          {"port": "in2", "data": "e0"}],
+                               "outputs": [{"port": "out", "data": "e1"}]})
+
+    assert upstream(prov, "d0") == ([], [])
+    assert upstream(prov, "d3") == ([2, 1, 0], ["d2", "d1", "d0"])
+    assert upstream(prov, "e1") == ([4, 0], ["d1", "e0", "d0"])
+    assert downstream(prov, "d4") == ([], [])
+    exe_inds, dids = downstream(prov, "d1")
+    assert sorted(exe_inds) == [1, 2, 3, 4]
+    assert sorted(dids) == ["d2", "d3", "d4", "e1"]
+    assert downstream(prov, "unknown") == ([], [])
+
+
+def test_lineage_handle_executions_reusing_data():
+    index = ProvenanceIndex(pdef)
+    did = "46793ee1dbdb11e5bd1eace010ea24cf"
+    assert index.upstream(did) == ([0], [])
+    assert index.downstream(did) == ([0], [])
+
+
+def test_lineage_scale_to_long_chains():
+    index = ProvenanceIndex(chain(20000))
+    exe_inds, dids = index.upstream("d20000")
+    assert len(exe_inds) == 20000
+    assert dids[-1] == "d0"
+    exe_inds, dids = index.downstream("d0")
+    assert len(dids) == 20000
+
+
+def loop(times):
+    """Provenance where node 0 is executed once for each time in times."""
+    data = [{"id": "d%d" % i, "type": "int", "value": i}
+            for i in range(len(times) + 1)]
+    exes = []
+    for i, time_init in enumerate(times):
+        exes.append({"node": 0, "time_init": time_init,
+                     "time_end": time_init + 0.5,
+                     "inputs": [{"port": "in", "data": "d%d" % i}],
+                     "outputs": [{"port": "out", "data": "d%d" % (i + 1)}]})
+
+    return dict(pdef, executions=exes, data=data, parameters=[])
+
+
+def test_select_executions():
+    prov = loop([2., 0., 1.])
+    assert select_executions(prov, 0) == [1, 2, 0]
+    assert select_executions(prov, 1) == []
+    assert select_executions(prov, 0, iteration=0) == [0]
+    assert select_executions(prov, 0, iteration=-1) == [2]
+    assert select_executions(prov, 0, iteration=3) == []
+    assert select_executions(prov, 0, latest=True) == [0]
+    assert select_executions(prov, 0, start=1.) == [2, 0]
+    assert select_executions(prov, 0, start=0.5, end=2.) == [2]
+    assert select_executions(prov, 0, end=2., latest=True) == [2]
+
+    index = ProvenanceIndex(prov)
+    assert index.select_executions(0, latest=True) == [0]
+    index.add_execution(dict(prov["executions"][0], time_init=3.))
+    assert index.select_executions(0, latest=True) == [3]
+
+
+def test_all_data_support_repeated_executions():
+    prov = loop([2., 0., 1.])
+    assert_raises(UserWarning, lambda: data_produced_by(prov, 0, "out"))
+    assert all_data_produced_by(prov, 0, "out") == [(1, "d2", 2),
+                                                    (2, "d3", 3),
+                                                    (0, "d1", 1)]
+    assert all_data_used_by(prov, 0, "in", iteration=1) == [(1, "d1", 1)]
+    assert all_data_used_by(prov, 0, "in", latest=True) == [(0, "d0", 0)]
+    assert all_data_produced_by(prov, 0, "out", start=0.5) == [(2, "d3", 3),
+                                                               (0, "d1", 1)]
+    assert all_data_produced_by(prov, 1, "out") == []
+    assert_raises(KeyError, lambda: all_data_used_by(prov, 0, "out"))
+
+
+def test_all_data_scale_to_many_executions():
+    index = ProvenanceIndex(loop([float(i) for i in range(5000)]))
+    for i in range(0, 5000, 10):
+        res = index.all_data_produced_by(0, "out", start=i, end=i + 1)
+        assert res == [(i, "d%d" % (i + 1), i + 1)]
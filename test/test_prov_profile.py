@@ -0,0 +1,109 @@
+from nose.tools import assert_raises
+
+from openalea.wlformat.prov_profile import (busy_time, critical_path,
+                                            export_profile, format_table,
+                                            node_durations, profile,
+                                            time_color)
+
+did = "46793ee1dbdb11e5bd1eace010ea24cf"
+
+wdef = {
+    "id": "bb060be1da2c11e5a216ace010ea24cf",
+    "name": "Test Workflow",
+    "owner": "revesansparole",
+    "version": 0,
+    "description": "debug purpose only",
+    "nodes": [{"id": did, "label": "n%d" % i} for i in range(4)],
+    "links": [
+        {"source": 0, "source_port": "ret", "target": 1, "target_port": "a"},
+        {"source": 0, "source_port": "ret", "target": 2, "target_port": "a"},
+        {"source": 1, "source_port": "ret", "target": 3, "target_port": "a"},
+        {"source": 2, "source_port": "ret", "target": 3, "target_port": "b"}
+    ]
+}
+
+
+def execution(node, time_init, time_end):
+    return {"node": node, "time_init": time_init, "time_end": time_end,
+            "inputs": [], "outputs": []}
+
+
+pdef = {
+    "id": "bb060be1da2c11e5a216ace010ea24cf",
+    "name": "Test Workflow Prov",
+    "owner": "revesansparole",
+    "version": 0,
+    "description": "debug purpose only",
+    "workflow": "bb060be1da2c11e5a216ace010ea24cf",
+    "time_init": 0.,
+    "time_end": 6.,
+    "data": [],
+    "parameters": [],
+    "executions": [execution(0, 0., 1.),
+                   execution(1, 1., 4.),
+                   execution(2, 1., 2.),
+                   execution(3, 5., 5.5),
+                   execution(3, 5.5, 6.)]
+}
+
+
+def test_node_durations():
+    stats = node_durations(pdef)
+    assert sorted(stats) == [0, 1, 2, 3]
+    assert stats[1]["total"] == 3.
+    assert stats[3]["count"] == 2
+    assert stats[3]["total"] == 1.
+    assert stats[3]["mean"] == 0.5
+    assert stats[3]["max"] == 0.5
+
+
+def test_busy_time_merge_overlapping_executions():
+    assert busy_time(pdef) == 5.
+    assert busy_time(dict(pdef, executions=[])) == 0.
+
+
+def test_critical_path():
+    path, tot = critical_path(wdef, {0: 1., 1: 3., 2: 1., 3: 1.})
+    assert path == [0, 1, 3]
+    assert tot == 5.
+    path, tot = critical_path(wdef, {2: 10., 3: 1.})
+    assert path == [0, 2, 3]
+    assert tot == 11.
+
+    cycle = dict(wdef, links=wdef["links"] + [
+        {"source": 3, "source_port": "ret", "target": 0, "target_port": "a"}])
+    assert_raises(UserWarning, lambda: critical_path(cycle, {}))
+
+
+def test_profile_report():
+    report = profile(pdef)
+    assert report["critical_path"] is None
+    assert report["work"] == 6.
+    assert report["wall_time"] == 6.
+    assert report["idle_time"] == 1.
+    assert report["parallelism"] == 1.
+
+    report = profile(pdef, wdef)
+    assert report["critical_path"] == [0, 1, 3]
+    assert report["critical_time"] == 5.
+
+
+def test_format_table():
+    txt = format_table(profile(pdef, wdef), wdef)
+    lines = txt.splitlines()
+    assert "node" in lines[0]
+    assert lines[1].startswith("*") and "1 n1" in lines[1]
+    assert "2 n2" in lines[3] and not lines[3].startswith("*")
+    assert "idle time: 1.000" in txt
+
+
+def test_export_profile_color_nodes():
+    assert time_color(0., 1.) == "#ffffff"
+    assert time_color(1., 1.) == "#ff0000"
+    assert time_color(1., 0.) == "#ffffff"
+
+    dot = export_profile(wdef, {}, profile(pdef, wdef))
+    lines = dot.splitlines()
+    assert 'fillcolor="#ff0000"' in lines[2]
+    assert 'penwidth="3"' in lines[2]
+    assert 'penwidth="3"' not in lines[3]
@@ -0,0 +1,135 @@
+from copy import deepcopy
+import json
+from nose.tools import assert_raises
+import os
+from tempfile import mkstemp
+
+from openalea.wlformat.prov_exe import data_produced_by, data_used_by
+from openalea.wlformat.prov_stream import (load_value, ProvenanceFileIndex,
+                                           ProvenanceReader)
+from openalea.wlformat.value_store import externalize, MemoryValueStore
+
+from .test_prov_exe import pdef
+
+ldef = deepcopy(pdef)
+ldef["data"].append({"id": "467435d1dbdb11e599adace010ea24ce",
+                     "value": {"a": [1, "b]}\"", None, True, {}], "c": []},
+                     "type": "dict"})
+ldef["executions"].append({"node": 1,
+                           "time_init": 1.,
+                           "time_end": 2.,
+                           "inputs": [],
+                           "outputs": [
+                               {
+                                   "port": "out",
+                                   "data": "467435d1dbdb11e599adace010ea24ce"
+                               }
+                           ]})
+
+
+def dump(prov, **kwds):
+    fid, pth = mkstemp(suffix=".json")
+    with os.fdopen(fid, 'w') as f:
+        json.dump(prov, f, **kwds)
+
+    return pth
+
+
+def test_reader_iterate_on_elements():
+    for kwds in ({}, {"indent": 2}, {"separators": (',', ':')}):
+        pth = dump(ldef, **kwds)
+        try:
+            with ProvenanceReader(pth) as reader:
+                assert list(reader.iter_executions()) == ldef["executions"]
+                assert list(reader.iter_parameters()) == ldef["parameters"]
+                header = reader.header()
+                assert header["workflow"] == ldef["workflow"]
+                assert "data" not in header
+                assert "executions" not in header
+
+                for (ddescr, span), ref in zip(reader.iter_data(),
+                                               ldef["data"]):
+                    assert "value" not in ddescr
+                    assert ddescr["id"] == ref["id"]
+                    assert ddescr["type"] == ref["type"]
+                    assert reader.load_value(*span) == ref["value"]
+                    assert load_value(pth, *span) == ref["value"]
+        finally:
+            os.remove(pth)
+
+
+def test_reader_handle_empty_containers():
+    prov = dict(pdef, data=[], parameters=[], executions=[])
+    pth = dump(prov, indent=2)
+    try:
+        with ProvenanceReader(pth) as reader:
+            assert list(reader.iter_data()) == []
+            assert list(reader.iter_executions()) == []
+    finally:
+        os.remove(pth)
+
+
+def test_reader_handle_empty_file():
+    fid, pth = mkstemp(suffix=".json")
+    os.close(fid)
+    try:
+        with ProvenanceReader(pth) as reader:
+            assert reader.header() == {}
+            assert list(reader.iter_data()) == []
+            assert list(reader.iter_executions()) == []
+            assert reader.build_index().executions == []
+    finally:
+        os.remove(pth)
+
+
+def test_reader_raise_error_on_malformed_file():
+    for txt in ('{"executions": [{"node": 0} {"node": 1}]}',
+                '{"executions": [{"node": "0}]}',  # unterminated string
+                '{"name": "toto'):
+        fid, pth = mkstemp(suffix=".json")
+        with os.fdopen(fid, 'w') as f:
+            f.write(txt)
+
+        try:
+            with ProvenanceReader(pth) as reader:
+                assert_raises(ValueError,
+                              lambda: list(reader.iter_executions()))
+        finally:
+            os.remove(pth)
+
+
+def test_index_fetch_values_on_demand():
+    pth = dump(ldef, indent=2)
+    try:
+        with ProvenanceReader(pth) as reader:
+            index = reader.build_index()
+            for ddescr in index.data.values():
+                assert "value" not in ddescr
+
+            for node, port in ((0, "ret"), (1, "out")):
+                assert (data_produced_by(index, node, port) ==
+                        data_produced_by(ldef, node, port))
+
+            assert data_used_by(index, 0, "a") == data_used_by(ldef, 0, "a")
+    finally:
+        os.remove(pth)
+
+
+def test_index_resolve_externalized_values():
+    store = MemoryValueStore()
+    pth = dump(externalize(ldef, store))
+    try:
+        with ProvenanceReader(pth) as reader:
+            index = reader.build_index(values=store)
+            assert isinstance(index, ProvenanceFileIndex)
+            assert index.values is store
+            assert index.spans == {}
+            for node, port in ((0, "ret"), (1, "out")):
+                assert (data_produced_by(index, node, port) ==
+                        data_produced_by(ldef, node, port))
+
+            index = reader.build_index()
+            assert_raises(UserWarning,
+                          lambda: data_produced_by(index, 1, "out"))
+    finally:
+        os.remove(pth)
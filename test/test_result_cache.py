@@ -0,0 +1,208 @@
+from nose.tools import assert_raises
+import json
+
+from openalea.wlformat.executor import execute
+from openalea.wlformat.prov_exe import data_produced_by, data_used_by
+from openalea.wlformat.result_cache import (execution_key, pickle,
+                                            ResultCache)
+
+from .executor_defs import link, ndef, workflow
+
+calls = []
+
+
+def add(a, b):
+    calls.append((a, b))
+    return a + b
+
+
+def pair(a, b):
+    calls.append((a, b))
+    return (a, b)
+
+
+def mapping(a, b):
+    calls.append((a, b))
+    return {a: b}
+
+
+def triple(a, b):
+    calls.append((a, b))
+    return a, b, a + b
+
+
+def cache_ndef(func, nb_inputs=2):
+    return ndef(func, "py:test.test_result_cache#%s" % func,
+                ["in%d" % i for i in range(nb_inputs)], ["ret"], default=0)
+
+
+nadd = cache_ndef("add")
+store = {nadd['id']: nadd}
+
+# n2 = n0 + n1, n3 = n1 + n1
+wdef = workflow([dict(id=nadd['id']) for i in range(4)],
+                [link(0, "ret", 2, "in0"), link(1, "ret", 2, "in1"),
+                 link(1, "ret", 3, "in0"), link(1, "ret", 3, "in1")])
+
+
+def test_execution_key():
+    key = execution_key("py:operator#add", [1, 2])
+    assert key == execution_key("py:operator#add", [1, 2])
+    assert key != execution_key("py:operator#add", [2, 1])
+    assert key != execution_key("py:operator#mul", [1, 2])
+    assert execution_key("py:operator#add", [object()]) is None
+
+
+def test_execution_key_depends_on_input_types():
+    uri = "py:operator#add"
+    assert execution_key(uri, [(1, 2)]) != execution_key(uri, [[1, 2]])
+    assert execution_key(uri, [{1: 2}]) != execution_key(uri, [{"1": 2}])
+    assert execution_key(uri, [1]) != execution_key(uri, [1.])
+    assert execution_key(uri, [1]) != execution_key(uri, [True])
+    assert (execution_key(uri, [{"a": 1, "b": [2, set([3, 4])]}]) ==
+            execution_key(uri, [{"b": [2, set([4, 3])], "a": 1}]))
+
+
+def test_cache_get_set():
+    cache = ResultCache()
+    assert cache.get("toto") == (False, None)
+    assert cache.set("toto", [1, 2])
+    assert "toto" in cache
+    assert cache.get("toto") == (True, [1, 2])
+    assert cache.hits == 1
+    assert cache.misses == 1
+    assert not cache.set("titi", lambda: None)
+    assert len(cache) == 1
+
+    cache.set("titi", ((1, 2), {1: 2}))
+    assert cache.get("titi") == (True, ((1, 2), {1: 2}))
+
+
+def test_cache_evict_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+    size = len(pickle.dumps("1234", pickle.HIGHEST_PROTOCOL))
+    cache = ResultCache(max_size=size + 1)
+    cache.set("a", "1234")
+    assert cache.size == size
+    cache.set("b", "1234")
+    assert cache.size == size
+    assert "a" not in cache
+    assert "b" in cache
+    assert not cache.set("c", "12345678")
+    assert cache.size == size
+
+
+def test_rerun_only_dirty_nodes():
+    cache = ResultCache()
+    params = {(0, "in0"): 1, (0, "in1"): 2, (1, "in0"): 3, (1, "in1"): 4}
+    del calls[:]
+    execute(wdef, store, params, cache=cache)
+    assert len(calls) == 4
+
+    del calls[:]
+    prov = execute(wdef, store, params, cache=cache)
+    assert len(calls) == 0
+    assert data_produced_by(prov, 2, "ret")[1] == 10
+
+    # only n0 and n2 depend on this parameter
+    params[(0, "in1")] = 5
+    del calls[:]
+    prov = execute(wdef, store, params, cache=cache, max_workers=2)
+    assert sorted(calls) == [(1, 5), (6, 7)]
+    assert data_produced_by(prov, 2, "ret")[1] == 13
+    assert data_produced_by(prov, 3, "ret")[1] == 14
+
+
+def test_cached_results_keep_their_type():
+    npair = cache_ndef("pair")
+    nmap = cache_ndef("mapping")
+    tstore = {npair['id']: npair, nmap['id']: nmap}
+    wkf = dict(wdef,
+               nodes=[dict(id=npair['id']), dict(id=nmap['id']),
+                      dict(id=npair['id'])],
+               links=[link(0, "ret", 2, "in0"), link(1, "ret", 2, "in1")])
+    params = {(0, "in0"): 1, (0, "in1"): 2, (1, "in0"): 3, (1, "in1"): 4}
+    cache = ResultCache()
+    provs = [execute(wkf, tstore, params, cache=cache) for i in range(2)]
+    assert cache.hits == 3
+
+    # (1, 2) != [1, 2] and {3: 4} != {"3": 4}
+    for prov in provs:
+        assert data_produced_by(prov, 0, "ret")[1] == (1, 2)
+        assert data_produced_by(prov, 1, "ret")[1] == {3: 4}
+        assert data_used_by(prov, 2, "in0")[1] == (1, 2)
+        assert data_produced_by(prov, 2, "ret")[1] == ((1, 2), {3: 4})
+
+
+def test_non_lazy_nodes_always_run():
+    wkf = dict(wdef, nodes=[dict(id=nadd['id'], lazy=False)] * 4)
+    cache = ResultCache()
+    execute(wkf, store, cache=cache)
+    del calls[:]
+    execute(wkf, store, cache=cache)
+    assert len(calls) == 4
+
+
+def test_fill_cache_from_provenance():
+    params = {(0, "in0"): 1, (1, "in1"): 2}
+    prov = execute(wdef, store, params)
+    cache = ResultCache()
+    assert cache.add_provenance(prov, wdef, store) == 4
+
+    del calls[:]
+    execute(wdef, store, params, cache=cache)
+    assert len(calls) == 0
+
+
+def test_fill_cache_from_json_provenance():
+    npair = cache_ndef("pair")
+    tstore = {npair['id']: npair, nadd['id']: nadd}
+    wkf = workflow([dict(id=npair['id']), dict(id=nadd['id']),
+                    dict(id=npair['id'])],
+                   [link(0, "ret", 2, "in0")])
+    params = {(0, "in0"): [1, 2], (0, "in1"): [3, 4],
+              (1, "in0"): 1, (1, "in1"): 2, (2, "in1"): 1}
+    prov = execute(wkf, tstore, params)
+    prov = json.loads(json.dumps(prov))
+
+    # tuples read back as lists must not be reused
+    cache = ResultCache()
+    assert cache.add_provenance(prov, wkf, tstore) == 1
+
+    del calls[:]
+    prov = execute(wkf, tstore, params, cache=cache)
+    assert calls == [([1, 2], [3, 4]), (([1, 2], [3, 4]), 1)]
+    assert data_produced_by(prov, 0, "ret")[1] == ([1, 2], [3, 4])
+    assert data_produced_by(prov, 2, "ret")[1] == (([1, 2], [3, 4]), 1)
+
+
+def test_fill_cache_skip_external_values():
+    params = {(0, "in0"): 1, (1, "in1"): 2}
+    prov = execute(wdef, store, params)
+    did = data_produced_by(prov, 2, "ret")[0]
+    for data in prov['data']:
+        if data['id'] == did:
+            del data['value']
+            data['ref'] = "0" * 40
+
+    cache = ResultCache()
+    assert cache.add_provenance(prov, wdef, store) == 3
+
+
+def test_results_not_matching_outputs_are_not_cached():
+    nbad = cache_ndef("triple")
+    nbad['outputs'] = nbad['outputs'] * 2
+    tstore = {nbad['id']: nbad}
+    wkf = workflow([dict(id=nbad['id'])], [])
+    cache = ResultCache()
+    for i in range(2):
+        assert_raises(UserWarning, lambda: execute(wkf, tstore, cache=cache))
+        assert len(cache) == 0
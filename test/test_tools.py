@@ -0,0 +1,148 @@
+import threading
+
+from openalea.wlformat import tools
+
+ddef = {
+    "id": "url12345678912345678945612358794",
+    "name": "url",
+    "owner": "revesansparole",
+    "version": 0,
+    "description": "Url type of data",
+    "schema": {
+        "type": "string"
+    },
+    "ancestors": []
+}
+
+ndef = {
+    "id": "4675bc70dbdb11e5b310ace010ea24cf",
+    "name": "plus",
+    "description": "Add two numbers together",
+    "owner": "unknown",
+    "version": 0,
+    "function": "sample_project.nodes:plus",
+    "inputs": [dict(interface="int", default="0", description="operand",
+                    name=name) for name in "ab"],
+    "outputs": [dict(interface="int", description="result", name="ret")]
+}
+
+
+def test_get_validator_compile_schema_only_once():
+    tools.clear_validators()
+    val = tools.get_validator("data")
+    assert tools.get_validator("data") is val
+    assert tools.get_validator("node") is not val
+
+
+def test_clear_validators_invalidate_registry():
+    val = tools.get_validator("data")
+    tools.get_validator("node")
+    tools.clear_validators("data")
+    assert tools.get_validator("data") is not val
+
+    val = tools.get_validator("node")
+    tools.clear_validators()
+    assert tools.get_validator("node") is not val
+
+
+def test_validate_use_cached_validator():
+    tools.clear_validators()
+    assert tools.validate(ddef, "data")
+    val = tools.get_validator("data")
+    assert not tools.validate(dict(ddef, ancestors=["toto"]), "data")
+    assert tools.get_validator("data") is val
+
+
+def test_validate_is_thread_safe():
+    tools.clear_validators()
+    errors = []
+
+    def work():
+        try:
+            for i in range(150):
+                assert tools.validate(ndef, "node")
+                if i % 50 == 0:
+                    tools.clear_validators("node")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work) for i in range(8)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+    assert errors == []
+    assert tools.get_validator("node") is tools.get_validator("node")
+
+
+def test_validate_does_not_access_files_after_warm_up():
+    tools.clear_validators()
+    val = tools.get_validator("node")
+
+    def resolve_remote(uri):
+        raise AssertionError("remote access to %s" % uri)
+
+    val.resolver.resolve_remote = resolve_remote
+    here = tools.here
+    try:
+        tools.here = "/does/not/exist"
+        assert not tools.validate(ddef, "node")
+    finally:
+        tools.here = here
+        tools.clear_validators()
+
+
+def test_validate_many_stream_results():
+    descrs = (dict(ddef, version=i - 1) for i in range(5))
+    res = list(tools.validate_many(descrs, "data"))
+
+    assert [i for i, ok, errors in res] == list(range(5))
+    assert [ok for i, ok, errors in res] == [False] + [True] * 4
+    assert len(res[0][2]) == 1
+    assert all(len(errors) == 0 for i, ok, errors in res[1:])
+
+
+def test_validate_many_use_process_pool():
+    descrs = (dict(ddef, version=i % 3 - 1) for i in range(25))
+    res = list(tools.validate_many(descrs, "data", processes=2, batch_size=4))
+
+    assert [i for i, ok, errors in res] == list(range(25))
+    assert [ok for i, ok, errors in res] == [i % 3 > 0 for i in range(25)]
+    assert res == list(tools.validate_many((dict(ddef, version=i % 3 - 1)
+                                            for i in range(25)), "data"))
+
+
+def test_validate_many_handle_empty_input():
+    assert list(tools.validate_many([], "data")) == []
+    assert list(tools.validate_many([], "data", processes=2)) == []
+
+
+def test_validate_report_empty_for_valid_description():
+    assert tools.validate_report(ddef, "data") == []
+
+
+def test_validate_report_locate_errors():
+    bad = dict(ddef, name=3, ancestors=["toto", "x"])
+    diags = tools.validate_report(bad, "data")
+    assert len(diags) == 3
+    assert sorted(tuple(diag["path"]) for diag in diags) == [
+        ("ancestors", 0), ("ancestors", 1), ("name",)]
+    for diag in diags:
+        if diag["path"] == ["name"]:
+            assert diag["kind"] == "type"
+            assert "string" in diag["message"]
+
+
+def test_validate_report_bound_number_of_errors():
+    bad = dict(ddef, name=3, ancestors=["toto", "x"])
+    diags = tools.validate_report(bad, "data", max_errors=2)
+    assert len(diags) == 3
+    assert diags[-1]["kind"] == "too_many_errors"
+
+    assert len(tools.validate_report(bad, "data", max_errors=3)) == 3
+
+    diags = tools.validate_report(bad, "data", fail_fast=True)
+    assert len(diags) == 2
+    assert diags[0]["kind"] != "too_many_errors"
+    assert diags[1]["kind"] == "too_many_errors"
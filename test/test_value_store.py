@@ -0,0 +1,133 @@
+from nose.tools import assert_raises
+import os
+import shutil
+from tempfile import mkdtemp
+
+from openalea.wlformat.prov_exe import (data_produced_by, data_used_by,
+                                        ProvenanceIndex, validate)
+from openalea.wlformat.value_store import (DirectoryValueStore, externalize,
+                                           MemoryValueStore, PackValueStore,
+                                           value_key)
+
+from .test_prov_exe import pdef
+
+
+def test_value_key_independent_of_dict_order():
+    assert value_key({"a": 1, "b": [1, 2]}) == value_key({"b": [1, 2], "a": 1})
+    assert value_key({"a": 1}) != value_key({"a": 2})
+
+
+def test_memory_store_deduplicate_values():
+    store = MemoryValueStore()
+    k1 = store.put({"a": [1, 2, None]})
+    k2 = store.put({"a": [1, 2, None]})
+    assert k1 == k2
+    assert len(store) == 1
+    assert store.get(k1) == {"a": [1, 2, None]}
+    assert_raises(KeyError, lambda: store.get("unknown"))
+
+
+def test_directory_store_round_trip():
+    dname = mkdtemp()
+    try:
+        store = DirectoryValueStore(os.path.join(dname, "values"))
+        k1 = store.put("toto")
+        k2 = store.put([1.5, "toto"])
+        assert store.put("toto") == k1
+        assert len(store) == 2
+        assert k1 in store
+
+        store = DirectoryValueStore(os.path.join(dname, "values"))
+        assert store.get(k1) == "toto"
+        assert store.get(k2) == [1.5, "toto"]
+        assert_raises(KeyError, lambda: store.get(value_key("titi")))
+
+        # leftover of an interrupted put
+        tmp = store._path(value_key("titi")) + ".tmp"
+        if not os.path.exists(os.path.dirname(tmp)):
+            os.makedirs(os.path.dirname(tmp))
+        with open(tmp, 'w') as f:
+            f.write('"ti')
+        assert len(store) == 2
+    finally:
+        shutil.rmtree(dname)
+
+
+def test_pack_store_round_trip():
+    dname = mkdtemp()
+    pth = os.path.join(dname, "values.pack")
+    try:
+        with PackValueStore(pth) as store:
+            k1 = store.put("toto")
+            assert store.get(k1) == "toto"
+            k2 = store.put({"a": 1})  # pack grows after being mapped
+            assert store.put("toto") == k1
+            assert store.get(k2) == {"a": 1}
+            assert len(store) == 2
+
+        size = os.path.getsize(pth)
+        with PackValueStore(pth) as store:
+            assert len(store) == 2
+            assert store.get(k1) == "toto"
+            assert store.get(k2) == {"a": 1}
+            store.put("toto")
+
+        assert os.path.getsize(pth) == size
+    finally:
+        shutil.rmtree(dname)
+
+
+def test_pack_store_drop_partly_written_record():
+    dname = mkdtemp()
+    pth = os.path.join(dname, "values.pack")
+    try:
+        with PackValueStore(pth) as store:
+            k1 = store.put("toto")
+        size = os.path.getsize(pth)
+
+        for tail in (b"abc", PackValueStore._header.pack(b"0" * 40, 100)):
+            with open(pth, 'ab') as f:
+                f.write(tail)  # crash during put
+
+            with PackValueStore(pth) as store:
+                assert len(store) == 1
+                assert store.get(k1) == "toto"
+                assert os.path.getsize(pth) == size
+                k2 = store.put([1, 2])
+                assert store.get(k2) == [1, 2]
+
+            with PackValueStore(pth) as store:
+                assert store.get(k1) == "toto"
+                assert store.get(k2) == [1, 2]
+
+            with open(pth, 'r+b') as f:
+                f.truncate(size)
+    finally:
+        shutil.rmtree(dname)
+
+
+def test_externalize_produce_valid_provenance():
+    store = MemoryValueStore()
+    prov = externalize(pdef, store)
+    assert validate(prov)
+    assert all('value' in data for data in pdef['data'])
+    for data in prov['data']:
+        assert 'value' not in data
+        assert data['ref'] in store
+
+    prov['data'][0].pop('ref')
+    assert not validate(prov)
+
+
+def test_values_are_fetched_lazily():
+    store = MemoryValueStore()
+    prov = externalize(pdef, store)
+
+    did, val = data_produced_by(prov, 0, 'ret', store)
+    assert did == "46793ee1dbdb11e5bd1eace010ea24cf"
+    assert val == "toto"
+
+    index = ProvenanceIndex(prov, store)
+    assert index.data_used_by(0, 'a') == (did, "toto")
+
+    assert_raises(UserWarning, lambda: data_used_by(prov, 0, 'a'))
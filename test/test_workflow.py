@@ -0,0 +1,158 @@
+from nose.tools import assert_raises
+
+from openalea.wlformat.workflow import check_workflow, Workflow
+
+wdef = {
+    "id": "bb060be1da2c11e5a216ace010ea24cf",
+    "name": "Test Workflow",
+    "owner": "revesansparole",
+    "version": 0,
+    "description": "debug purpose only",
+    "nodes": [
+        {
+            "id": "46793ee1dbdb11e5bd1eace010ea24cf",
+            "x": -50,
+            "y": -140
+        },
+        {
+            "id": "467435d1dbdb11e599adace010ea24cf",
+            "label": "int"
+        },
+        {
+            "id": "467435d1dbdb11e599adace010ea24cf"
+        }
+    ],
+    "links": [
+        {
+            "source": 1,
+            "source_port": "ret",
+            "target": 0,
+            "target_port": "a"
+        },
+        {
+            "source": 1,
+            "source_port": "ret",
+            "target": 0,
+            "target_port": "b"
+        },
+        {
+            "source": 0,
+            "source_port": "ret",
+            "target": 2,
+            "target_port": "a"
+        }
+    ]
+}
+
+
+def test_workflow_round_trip():
+    wkf = Workflow.from_dict(wdef)
+    assert wkf.nb_nodes() == 3
+    assert wkf.nb_links() == 3
+    assert wkf.attributes['name'] == wdef['name']
+    assert wkf.to_dict() == wdef
+
+
+def test_workflow_add_link_check_nodes():
+    wkf = Workflow()
+    wkf.add_node(dict(id="46793ee1dbdb11e5bd1eace010ea24cf"))
+    assert_raises(IndexError, lambda: wkf.add_link(0, "ret", 1, "a"))
+    assert_raises(IndexError, lambda: wkf.add_link(-1, "ret", 0, "a"))
+    assert wkf.add_link(0, "ret", 0, "a") == 0
+
+
+def test_workflow_adjacency():
+    wkf = Workflow.from_dict(wdef)
+
+    assert wkf.in_links(0) == [0, 1]
+    assert wkf.out_links(0) == [2]
+    assert wkf.in_links(1) == []
+    assert wkf.out_links(1) == [0, 1]
+
+    assert wkf.predecessors(0) == [1]
+    assert wkf.successors(0) == [2]
+    assert wkf.successors(1) == [0]
+    assert wkf.predecessors(1) == []
+
+
+def test_workflow_port_connectivity():
+    wkf = Workflow.from_dict(wdef)
+
+    assert wkf.out_port_links(1, "ret") == [0, 1]
+    assert wkf.in_port_links(0, "b") == [1]
+    assert wkf.in_port_links(0, "ret") == []
+    assert wkf.is_connected(0, "a")
+    assert not wkf.is_connected(0, "a", output=True)
+    assert wkf.is_connected(0, "ret", output=True)
+    assert not wkf.is_connected(2, "b")
+
+
+def test_workflow_topological_order():
+    wkf = Workflow.from_dict(wdef)
+    assert wkf.topological_order() == [1, 0, 2]
+
+    wkf.add_link(2, "ret", 1, "a")
+    assert_raises(UserWarning, lambda: wkf.topological_order())
+
+
+store = {
+    "46793ee1dbdb11e5bd1eace010ea24cf": {
+        "id": "46793ee1dbdb11e5bd1eace010ea24cf",
+        "name": "plus",
+        "inputs": [
+            {"name": "a", "interface": "int", "description": ""},
+            {"name": "b", "interface": "int", "description": ""}
+        ],
+        "outputs": [
+            {"name": "ret", "interface": "int", "description": ""}
+        ]
+    },
+    "467435d1dbdb11e599adace010ea24cf": {
+        "id": "467435d1dbdb11e599adace010ea24cf",
+        "name": "int",
+        "inputs": [
+            {"name": "a", "interface": "int", "description": ""}
+        ],
+        "outputs": [
+            {"name": "ret", "interface": "int", "description": ""}
+        ]
+    }
+}
+
+
+def test_check_workflow_accept_correct_workflow():
+    assert check_workflow(wdef, store) == []
+
+
+def test_check_workflow_detect_unknown_nodes():
+    diags = check_workflow(wdef, {})
+    assert [diag['kind'] for diag in diags] == ["unknown_node"] * 3
+    assert diags[1]['path'] == ['nodes', 1, 'id']
+
+
+def test_check_workflow_detect_invalid_links():
+    wkf = dict(wdef, links=[
+        dict(source=3, source_port="ret", target=0, target_port="a"),
+        dict(source=1, source_port="ret", target=-1, target_port="a"),
+        dict(source=1, source_port="toto", target=0, target_port="a"),
+        dict(source=1, source_port="ret", target=0, target_port="ret"),
+        dict(source=1, source_port="ret", target=0, target_port="a"),
+    ])
+
+    diags = check_workflow(wkf, store)
+    assert [(diag['kind'], diag['path']) for diag in diags] == [
+        ("invalid_source", ['links', 0, 'source']),
+        ("invalid_target", ['links', 1, 'target']),
+        ("unknown_source_port", ['links', 2, 'source_port']),
+        ("unknown_target_port", ['links', 3, 'target_port']),
+        ("multiple_inputs", ['links', 4, 'target_port'])]
+
+
+def test_check_workflow_detect_cycles():
+    wkf = dict(wdef, links=wdef['links'] + [
+        dict(source=2, source_port="ret", target=1, target_port="a")])
+
+    diags = check_workflow(wkf, store)
+    assert len(diags) == 1
+    assert diags[0]['kind'] == "cycle"
+    assert "0, 1, 2" in diags[0]['message']